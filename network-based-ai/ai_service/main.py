@@ -10,10 +10,19 @@ Endpoints compatible with Node.js backend (usod/app/backend):
 - GET /api/model-stats - Get model statistics
 - POST /api/clear-threats - Clear detected threats
 - GET /health - Health check
+- GET /metrics - Prometheus metrics
+- GET /api/traffic/top-talkers - Heaviest sources in the live sliding window
+- GET /api/traffic/fan-out - Sources with the most distinct ports/destinations
+- GET /api/sessions - List monitoring sessions (several interfaces can be monitored at once)
+- GET /api/sessions/{session_id} - Session status
+- POST /api/sessions/{session_id}/stop - Stop one session
+- GET /api/sessions/{session_id}/threats - Threats of one session
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
 import uvicorn
@@ -21,8 +30,9 @@ import os
 import tempfile
 import uuid
 import json
-import threading
 import time
+import re
+import hashlib
 import requests
 from pathlib import Path
 from datetime import datetime
@@ -34,6 +44,25 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.analyzer import NetworkThreatAnalyzer
 from src.predictor import NetworkThreatPredictor
 from src.feature_extractor import NFSTREAM_ATTRIBUTES
+from src.flow_table import decode_flow_table
+from src.time_buckets import bucket_width
+from src.flow_index import FlowIndexStore
+from src.pcap_tail import PcapTailer
+from src.interfaces import InterfaceCache
+from src.traffic_policy import TrafficPolicy
+from src.threat_intel import ThreatIntel
+from src.severity import AlertThresholds, SeverityScorer
+from src.shadow import ShadowEvaluator
+from src.model_versions import artifact_paths, prepare_model_version, read_model_info
+from src.capture_profiles import (DEFAULT_LIVE_PROFILE, DEFAULT_PCAP_PROFILE, create_streamer,
+                                   get_profile, list_profiles)
+from src.broadcast import BroadcastBuffer, StatsDeltaPublisher
+from src.profiling import PipelineProfiler, profiling_enabled, stage
+from src.sessions import SessionManager, MonitoringSession
+from src.metrics import (
+    FLOWS_EXTRACTED, QUEUE_DEPTH, THREAT_STORE_SIZE, WEBHOOK_SECONDS, WEBHOOK_FAILURES,
+    PCAP_JOB_SECONDS, THREAT_ALERTS, render_metrics
+)
 
 app = FastAPI(
     title="Network Threat Detection API",
@@ -54,41 +83,84 @@ app.add_middleware(
 # Global State for Real-Time Monitoring
 # ============================================================================
 
-monitoring_state = {
-    "active": False,
-    "start_time": None,
-    "end_time": None,
-    "interface": None,
-    "duration": None,
-    "session_id": None,
-    "stats": {
-        "total_flows": 0,
-        "benign_flows": 0,
-        "attack_flows": 0,
-        "flows_per_second": 0.0
-    }
-}
+# Sliding window for per-source statistics and top-K summary capacity (per session)
+TRAFFIC_WINDOW_SECONDS = int(os.getenv("TRAFFIC_WINDOW_SECONDS", 300))
+HEAVY_HITTER_CAPACITY = int(os.getenv("HEAVY_HITTER_CAPACITY", 1000))
+
+# Overload control for live capture (shed/sample flows when inference falls behind)
+OVERLOAD_OPTIONS = {"sample_every": int(os.getenv("OVERLOAD_SAMPLE_EVERY", 10))}
+if os.getenv("LOAD_SHEDDING", "1").lower() in ("0", "false", "no", "off"):
+    OVERLOAD_OPTIONS["enabled"] = False
+
+# Concurrent capture sessions (one per interface) sharing an inference worker pool
+session_manager = SessionManager(
+    inference_workers=int(os.getenv("INFERENCE_WORKERS", 2)),
+    max_retained=int(os.getenv("MAX_RETAINED_SESSIONS", 20)),
+    traffic_window=TRAFFIC_WINDOW_SECONDS,
+    heavy_hitter_capacity=HEAVY_HITTER_CAPACITY,
+    overload_options=OVERLOAD_OPTIONS
+)
 
-detected_threats: List[Dict[str, Any]] = []
-monitoring_thread: Optional[threading.Thread] = None
-stop_monitoring_flag = threading.Event()
+THREAT_STORE_SIZE.set_function(session_manager.threat_count)
+QUEUE_DEPTH.labels(queue='inference_pool').set_function(session_manager.pending_inference)
 
 # Webhook configuration for Node.js backend
 NODEJS_BACKEND_URL = os.getenv("NODEJS_BACKEND_URL", "http://localhost:5000")
 WEBHOOK_ENDPOINT = f"{NODEJS_BACKEND_URL}/api/network/webhook"
 
+# Live threat severity model and the thresholds for sending webhooks
+severity_scorer = SeverityScorer()
+alert_thresholds = AlertThresholds(
+    min_severity=os.getenv("ALERT_MIN_SEVERITY", "low"),
+    min_confidence=float(os.getenv("ALERT_MIN_CONFIDENCE", 0.0))
+)
+
+# Shadow evaluation of a candidate model on live batches (started via /api/shadow/start)
+shadow_evaluator: Optional[ShadowEvaluator] = None
+last_shadow_report: Optional[Dict[str, Any]] = None
+
+# Live push of threats and stats deltas to WebSocket / SSE subscribers
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", 1000))
+STREAM_STATS_INTERVAL = float(os.getenv("STREAM_STATS_INTERVAL", 2.0))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15.0))
+threat_broadcast = BroadcastBuffer(capacity=STREAM_BUFFER_SIZE)
+stats_publisher = StatsDeltaPublisher(threat_broadcast, interval=STREAM_STATS_INTERVAL)
+
+# Allow/deny rules for traffic that is never scored (BPF + flow-stage CIDR filter)
+TRAFFIC_POLICY_FILE = os.getenv("TRAFFIC_POLICY_FILE")
+traffic_policy = TrafficPolicy.load(TRAFFIC_POLICY_FILE)
+
+# Local IP lists (internal ranges, known-bad feeds) that tag threats and adjust severity
+THREAT_INTEL_DIR = os.getenv("THREAT_INTEL_DIR", str(Path(__file__).parent.parent / "threat_intel"))
+threat_intel = ThreatIntel(THREAT_INTEL_DIR, check_interval=float(os.getenv("THREAT_INTEL_CHECK_SECONDS", 30)))
+threat_intel.reload()
+
+# Capture interface discovery, cached and refreshed in the background
+interface_cache = InterfaceCache(ttl=float(os.getenv("INTERFACE_CACHE_TTL", 60)))
+interface_cache.refresh()
+
 # Results storage directory
 RESULTS_DIR = Path(__file__).parent.parent / "monitoring_results"
 RESULTS_DIR.mkdir(exist_ok=True)
 
+# Offsets of capture directories followed by /api/start-ingest
+INGEST_CHECKPOINT_DIR = Path(os.getenv("INGEST_CHECKPOINT_DIR", RESULTS_DIR / "ingest_checkpoints"))
+# Failed reads of the same chunk before its file is skipped (until replaced)
+INGEST_MAX_CHUNK_ATTEMPTS = int(os.getenv("INGEST_MAX_CHUNK_ATTEMPTS", 3))
+
+# Persisted flow indexes for drill-down queries on analyzed PCAPs
+FLOW_INDEX_DIR = Path(os.getenv("FLOW_INDEX_DIR", Path(__file__).parent.parent / "results" / "flow_index"))
+flow_index_store = FlowIndexStore(FLOW_INDEX_DIR)
+
 # ============================================================================
 # Initialize AI Components
 # ============================================================================
 
 print("Loading AI analyzer...")
 try:
-    analyzer = NetworkThreatAnalyzer()
+    # One predictor shared by live scoring and PCAP jobs, so a model reload swaps both
     predictor = NetworkThreatPredictor()
+    analyzer = NetworkThreatAnalyzer(predictor=predictor)
     print("SUCCESS: AI analyzer loaded successfully")
     print(f"  - Model: {predictor.class_names_nfstream if hasattr(predictor, 'class_names_nfstream') else 'NFStream Binary'}")
 except Exception as e:
@@ -103,6 +175,18 @@ except Exception as e:
 class CaptureRequest(BaseModel):
     interface: str = "auto"
     duration: int = 300  # Default 5 minutes
+    profile: Optional[str] = None  # Capture profile (default: realtime)
+    bpf_filter: Optional[str] = None
+    apply_policy: bool = True  # Apply the traffic policy (TRAFFIC_POLICY_FILE)
+
+class IngestRequest(BaseModel):
+    directory: str
+    pattern: str = "*.pcap*"
+    duration: int = 0  # 0 = follow until stopped
+    poll_interval: float = 2.0
+    profile: Optional[str] = None  # Capture profile (default: forensic)
+    bpf_filter: Optional[str] = None
+    apply_policy: bool = True
 
 class AnalysisResponse(BaseModel):
     status: str
@@ -112,6 +196,9 @@ class AnalysisResponse(BaseModel):
     results_url: Optional[str] = None
     analysis_id: Optional[str] = None
     processing_time: Optional[float] = None
+    profile: Optional[Dict[str, Any]] = None
+    cascade: Optional[Dict[str, Any]] = None
+    index_id: Optional[str] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -136,6 +223,7 @@ class ThreatData(BaseModel):
 
 def send_webhook(threat_data: Dict[str, Any]):
     """Send threat data to Node.js backend via webhook."""
+    start = time.perf_counter()
     try:
         response = requests.post(
             WEBHOOK_ENDPOINT,
@@ -146,78 +234,38 @@ def send_webhook(threat_data: Dict[str, Any]):
         if response.status_code == 200:
             print(f"✅ Webhook sent: {threat_data.get('threat_id', 'unknown')}")
         else:
+            WEBHOOK_FAILURES.inc()
             print(f"⚠️ Webhook failed: {response.status_code}")
     except Exception as e:
+        WEBHOOK_FAILURES.inc()
         print(f"❌ Webhook error: {e}")
+    finally:
+        WEBHOOK_SECONDS.observe(time.perf_counter() - start)
 
 # ============================================================================
 # Real-Time Monitoring Functions
 # ============================================================================
 
-def get_network_interfaces():
-    """Get available network interfaces for capture."""
-    interfaces = []
-    
-    try:
-        # Try Windows NPF device format
-        import winreg
-        from nfstream import NFStreamer
-        
-        reg_path = r"SYSTEM\CurrentControlSet\Control\Network\{4D36E972-E325-11CE-BFC1-08002BE10318}"
-        reg_key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
-        i = 0
-        while True:
-            try:
-                guid = winreg.EnumKey(reg_key, i)
-                conn_path = f"{reg_path}\\{guid}\\Connection"
-                try:
-                    conn_key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, conn_path)
-                    name = winreg.QueryValueEx(conn_key, "Name")[0]
-                    npf_name = f"\\Device\\NPF_{guid}"
-                    
-                    # Test if interface works
-                    try:
-                        test = NFStreamer(source=npf_name, statistical_analysis=True)
-                        interfaces.append({'name': npf_name, 'display': name})
-                        del test
-                    except:
-                        pass
-                    winreg.CloseKey(conn_key)
-                except:
-                    pass
-                i += 1
-            except OSError:
-                break
-        winreg.CloseKey(reg_key)
-    except ImportError:
-        # Not on Windows, try psutil
-        try:
-            import psutil
-            net_if_addrs = psutil.net_if_addrs()
-            for iface_name, addrs in net_if_addrs.items():
-                has_ipv4 = any(addr.family == 2 for addr in addrs)
-                if has_ipv4:
-                    interfaces.append({'name': iface_name, 'display': iface_name})
-        except:
-            pass
-    except Exception as e:
-        print(f"Error getting interfaces: {e}")
-    
-    return interfaces
+def get_network_interfaces(refresh: bool = False):
+    """Get available network interfaces for capture (cached, see INTERFACE_CACHE_TTL)."""
+    return interface_cache.get(refresh=refresh)
 
 def select_interface(requested: str = "auto"):
     """Select network interface for capture."""
     interfaces = get_network_interfaces()
     
+    if requested != "auto":
+        # Try to find the requested interface (rediscover once in case it was just added)
+        for attempt in range(2):
+            for iface in interfaces:
+                if requested in iface['name'] or requested in iface['display']:
+                    return iface['name'], iface['display']
+            if attempt == 0:
+                interfaces = get_network_interfaces(refresh=True)
+    
     if not interfaces:
         return None, None
     
-    if requested != "auto":
-        # Try to find the requested interface
-        for iface in interfaces:
-            if requested in iface['name'] or requested in iface['display']:
-                return iface['name'], iface['display']
-    
     # Auto-select Wi-Fi or Ethernet
     for iface in interfaces:
         if 'Wi-Fi' in iface['display'] or 'WiFi' in iface['display']:
@@ -228,193 +276,354 @@ def select_interface(requested: str = "auto"):
     # Fallback to first interface
     return interfaces[0]['name'], interfaces[0]['display']
 
-def run_monitoring(interface: str, duration: int, session_id: str):
-    """Background thread for real-time network monitoring."""
-    global monitoring_state, detected_threats
+def build_flow_record(session: MonitoringSession, flow) -> Dict[str, Any]:
+    """Features, threat metadata and the overload decision for one NFStream flow."""
+    # Extract features from flow
+    flow_data = {}
+    for attr in NFSTREAM_ATTRIBUTES:
+        try:
+            val = getattr(flow, attr, 0)
+            flow_data[attr] = 0 if val is None else val
+        except:
+            flow_data[attr] = 0
     
-    try:
-        from nfstream import NFStreamer
-        import pandas as pd
-        import numpy as np
+    # Add metadata for threat details
+    flow_data['_src_ip'] = flow.src_ip
+    flow_data['_dst_ip'] = flow.dst_ip
+    flow_data['_src_port'] = flow.src_port
+    flow_data['_dst_port'] = flow.dst_port
+    flow_data['_protocol'] = flow.protocol
+    flow_data['_first_seen_ms'] = getattr(flow, 'bidirectional_first_seen_ms', 0) or 0
+    
+    # Overload control: shed flows are still counted and fed to traffic stats
+    flow_data['_classify'] = session.overload.admit(
+        flow.src_ip,
+        getattr(flow, 'bidirectional_duration_ms', 0) or 0,
+        getattr(flow, 'bidirectional_last_seen_ms', None),
+        getattr(flow, 'expiration_id', None)
+    )
+    return flow_data
+
+
+def process_flow_batch(session: MonitoringSession, batch: List[Dict[str, Any]],
+                       source: str = 'live', details: Optional[Dict[str, Any]] = None):
+    """
+    Classify a batch of flow records and record stats, threats and webhooks for a session.
+    
+    Args:
+        session: Session the flows belong to
+        batch: Records from build_flow_record()
+        source: 'live' (interface capture) or 'ingest' (capture directory)
+        details: Extra fields for each threat's details block
+    """
+    import pandas as pd
+    import numpy as np
+    
+    session_id = session.session_id
+    FLOWS_EXTRACTED.labels(source=source).inc(len(batch))
+    
+    df = pd.DataFrame(batch)
+    
+    # Separate metadata
+    metadata_cols = ['_src_ip', '_dst_ip', '_src_port', '_dst_port', '_protocol', '_first_seen_ms', '_classify']
+    metadata = df[metadata_cols].copy()
+    feature_df = df.drop(columns=metadata_cols)
+    feature_df = feature_df.replace([np.inf, -np.inf], np.nan).fillna(0)
+    
+    # Flow-stage traffic policy: excluded flows are counted but never scored
+    n_excluded = 0
+    policy = session.traffic_policy
+    if policy is not None and policy.flow_rules:
+        keep = policy.flow_mask(metadata['_src_ip'], metadata['_dst_ip'], metadata['_dst_port'],
+                                metadata['_protocol'], feature_df['bidirectional_bytes'], source=source)
+        n_excluded = int((~keep).sum())
+        if n_excluded:
+            metadata = metadata[keep]
+            feature_df = feature_df[keep]
+            if len(metadata) == 0:
+                session.counters.record_batch([], excluded=n_excluded)
+                return
+    
+    # Update per-source rolling statistics
+    session.traffic_stats.update(
+        metadata['_src_ip'], metadata['_dst_ip'], metadata['_dst_port'],
+        feature_df['bidirectional_bytes']
+    )
+    session.summary.add_flows(metadata['_src_ip'], metadata['_dst_ip'])
+    
+    # Account for shed flows before classifying the rest
+    classify_mask = metadata['_classify'].to_numpy(dtype=bool)
+    n_shed = int((~classify_mask).sum())
+    first_seen_ms = metadata['_first_seen_ms'].to_numpy()
+    flow_bytes = feature_df['bidirectional_bytes'].to_numpy()
+    metadata = metadata[classify_mask]
+    feature_df = feature_df[classify_mask]
+    
+    # Labels and probabilities from one pass on the shared inference pool,
+    # with one model version for the whole batch
+    model = predictor.nfstream_version
+    inference_start = time.perf_counter()
+    if len(feature_df):
+        predictions, probabilities = session_manager.infer(
+            predictor.predict_nfstream, feature_df, return_proba=True, model=model
+        )
+    else:
+        predictions, probabilities = [], np.zeros((0, len(model.classes)))
+    inference_seconds = time.perf_counter() - inference_start
+    session.overload.observe_batch(inference_seconds, session_manager.pending_inference())
+    
+    # Candidate model trial: hand the scored batch to the shadow worker (never blocks)
+    shadow = shadow_evaluator
+    if shadow is not None and len(feature_df):
+        shadow.submit(feature_df, predictions, probabilities, model.classes, metadata,
+                      production_seconds=inference_seconds, production_version=model.version)
+    
+    # Per-second timeline (shed flows count as unclassified)
+    is_attack = np.zeros(len(classify_mask), dtype=bool)
+    is_attack[classify_mask] = np.asarray(predictions) != 'BENIGN'
+    session.timeline.add(first_seen_ms, is_attack, flow_bytes, classify_mask)
+    
+    # Update stats (one vectorized update per batch)
+    first_flow_number = session.counters.record_batch(predictions, shed=n_shed, excluded=n_excluded)
+    
+    # Severity from attack probability, flow volume and the source's window history
+    attack_rows = np.flatnonzero(is_attack[classify_mask])
+    classes = model.classes
+    attack_proba = (1.0 - probabilities[attack_rows, classes.index('BENIGN')] if 'BENIGN' in classes
+                    else probabilities[attack_rows].max(axis=1))
+    scores = severity_scorer.score(
+        attack_proba,
+        feature_df['bidirectional_bytes'].to_numpy()[attack_rows],
+        feature_df['bidirectional_packets'].to_numpy()[attack_rows],
+        history=session.traffic_stats.estimate(metadata['_src_ip'].to_numpy()[attack_rows]),
+        labels=np.asarray(predictions)[attack_rows]
+    )
+    severities = severity_scorer.severity(scores)
+    
+    threats = []
+    for n, i in enumerate(attack_rows):
+        pred = predictions[i]
+        # Create threat entry
+        threat_id = f"rt_{session_id}_{session.next_threat_number():06d}"
+        threat_data = {
+            "threat_id": threat_id,
+            "threat_type": pred,
+            "severity": severities[n],
+            "source_ip": str(metadata.iloc[i]['_src_ip']),
+            "destination_ip": str(metadata.iloc[i]['_dst_ip']),
+            "source_port": int(metadata.iloc[i]['_src_port']),
+            "destination_port": int(metadata.iloc[i]['_dst_port']),
+            "protocol": int(metadata.iloc[i]['_protocol']),
+            "confidence": round(float(attack_proba[n]), 4),
+            "model_version": model.version,
+            "timestamp": datetime.now().isoformat(),
+            "details": {
+                "severity_score": round(float(scores[n]), 4),
+                "session_id": session_id,
+                "interface": session.display_name,
+                "flow_index": first_flow_number + int(i),
+                "detection_type": "real-time" if source == 'live' else "pcap_ingest",
+                **(details or {})
+            }
+        }
+        threats.append(threat_data)
+    
+    # Tags and severity from threat intel lists (one lookup per list for the batch)
+    threat_intel.enrich(threats, source=source)
+    
+    for threat_data in threats:
+        pred = threat_data['threat_type']
+        session.add_threat(threat_data)
+        session.summary.add_threat(pred, threat_data['source_ip'], threat_data['destination_ip'])
+        session.overload.mark_suspicious(threat_data['source_ip'])
         
-        print(f"🚀 Starting real-time monitoring on {interface}")
+        # Push to stream subscribers (never blocks on slow clients)
+        threat_broadcast.publish('threat', threat_data, session_id=session_id)
         
-        BATCH_SIZE = 10
-        IDLE_TIMEOUT = 15
-        ACTIVE_TIMEOUT = 30
+        # Send webhook to Node.js backend for threats above the alert thresholds
+        if alert_thresholds.should_alert(threat_data['severity'], threat_data['confidence']):
+            THREAT_ALERTS.labels(severity=threat_data['severity'], decision='sent').inc()
+            send_webhook(threat_data)
+        else:
+            THREAT_ALERTS.labels(severity=threat_data['severity'], decision='suppressed').inc()
         
-        streamer = NFStreamer(
-            source=interface,
-            statistical_analysis=True,
-            active_timeout=ACTIVE_TIMEOUT,
-            idle_timeout=IDLE_TIMEOUT,
-            splt_analysis=0,
-            n_dissections=0,
-        )
+        print(f"⚠️ [{session_id}] ATTACK: {pred} from {threat_data['source_ip']} → {threat_data['destination_ip']}")
+    
+    stats_publisher.maybe_publish(session_id, session.stats)
+
+
+def finish_session(session: MonitoringSession):
+    """Mark a capture thread's session finished and save it if it ended on its own."""
+    session.mark_finished()
+    stats_publisher.maybe_publish(session.session_id, session.stats, force=True,
+                                  extra={'finished': True})
+    stats_publisher.forget(session.session_id)
+    # Sessions that end on their own (duration reached) are saved here;
+    # user-stopped sessions are saved by the stop endpoint
+    if not session.stop_flag.is_set() and session.results_file is None:
+        try:
+            save_monitoring_session(session)
+        except Exception as e:
+            print(f"❌ [{session.session_id}] Failed to save session: {e}")
+
+
+def run_monitoring(session: MonitoringSession):
+    """Background thread for real-time network monitoring of one session."""
+    session_id = session.session_id
+    
+    try:
+        print(f"🚀 [{session_id}] Starting real-time monitoring on {session.display_name}")
+        
+        profile = session.capture_profile or get_profile(DEFAULT_LIVE_PROFILE)
+        BATCH_SIZE = profile.batch_size
+        session.overload.idle_timeout = profile.idle_timeout
+        
+        streamer = create_streamer(session.interface, profile)
         
         batch = []
         start_time = time.time()
-        monitoring_state["stats"]["flows_per_second"] = 0.0
         
         for flow in streamer:
             # Check stop conditions
-            if stop_monitoring_flag.is_set():
-                print("⏹️ Monitoring stopped by user")
+            if session.stop_flag.is_set():
+                print(f"⏹️ [{session_id}] Monitoring stopped by user")
                 break
             
-            if time.time() - start_time >= duration:
-                print("⏱️ Monitoring duration reached")
+            if time.time() - start_time >= session.duration:
+                print(f"⏱️ [{session_id}] Monitoring duration reached")
                 break
             
-            # Extract features from flow
-            flow_data = {}
-            for attr in NFSTREAM_ATTRIBUTES:
-                try:
-                    val = getattr(flow, attr, 0)
-                    flow_data[attr] = 0 if val is None else val
-                except:
-                    flow_data[attr] = 0
-            
-            # Add metadata for threat details
-            flow_data['_src_ip'] = flow.src_ip
-            flow_data['_dst_ip'] = flow.dst_ip
-            flow_data['_src_port'] = flow.src_port
-            flow_data['_dst_port'] = flow.dst_port
-            flow_data['_protocol'] = flow.protocol
-            
-            batch.append(flow_data)
+            batch.append(build_flow_record(session, flow))
             
             # Process batch
             if len(batch) >= BATCH_SIZE:
                 try:
-                    df = pd.DataFrame(batch)
-                    
-                    # Separate metadata
-                    metadata = df[['_src_ip', '_dst_ip', '_src_port', '_dst_port', '_protocol']].copy()
-                    feature_df = df.drop(columns=['_src_ip', '_dst_ip', '_src_port', '_dst_port', '_protocol'])
-                    feature_df = feature_df.replace([np.inf, -np.inf], np.nan).fillna(0)
-                    
-                    # Make predictions
-                    predictions = predictor.predict_nfstream(feature_df)
-                    
-                    # Update stats
-                    for i, pred in enumerate(predictions):
-                        monitoring_state["stats"]["total_flows"] += 1
-                        
-                        if pred == 'BENIGN':
-                            monitoring_state["stats"]["benign_flows"] += 1
-                        else:
-                            monitoring_state["stats"]["attack_flows"] += 1
-                            
-                            # Create threat entry
-                            threat_id = f"rt_{session_id}_{len(detected_threats)+1:06d}"
-                            threat_data = {
-                                "threat_id": threat_id,
-                                "threat_type": pred,
-                                "severity": "high" if "DDoS" in pred else "medium",
-                                "source_ip": str(metadata.iloc[i]['_src_ip']),
-                                "destination_ip": str(metadata.iloc[i]['_dst_ip']),
-                                "source_port": int(metadata.iloc[i]['_src_port']),
-                                "destination_port": int(metadata.iloc[i]['_dst_port']),
-                                "protocol": int(metadata.iloc[i]['_protocol']),
-                                "confidence": 0.85,  # NFStream model confidence
-                                "timestamp": datetime.now().isoformat(),
-                                "details": {
-                                    "session_id": session_id,
-                                    "flow_index": monitoring_state["stats"]["total_flows"],
-                                    "detection_type": "real-time"
-                                }
-                            }
-                            detected_threats.append(threat_data)
-                            
-                            # Send webhook to Node.js backend
-                            send_webhook(threat_data)
-                            
-                            print(f"⚠️ ATTACK: {pred} from {threat_data['source_ip']} → {threat_data['destination_ip']}")
-                    
-                    # Update flows per second
-                    elapsed = time.time() - start_time
-                    if elapsed > 0:
-                        monitoring_state["stats"]["flows_per_second"] = round(
-                            monitoring_state["stats"]["total_flows"] / elapsed, 2
-                        )
-                    
-                    batch = []
-                    
+                    process_flow_batch(session, batch)
+                except Exception as e:
+                    print(f"❌ [{session_id}] Batch processing error: {e}")
+                batch = []
+        
+        print(f"✅ [{session_id}] Monitoring complete. Analyzed {session.stats['total_flows']} flows")
+        
+    except Exception as e:
+        print(f"❌ [{session_id}] Monitoring error: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    finally:
+        finish_session(session)
+
+
+def run_ingest(session: MonitoringSession):
+    """Background thread that follows a capture directory (new files and appended packets)."""
+    session_id = session.session_id
+    tailer = session.ingest
+    
+    try:
+        print(f"🚀 [{session_id}] Following capture directory {tailer.directory} ({tailer.pattern})")
+        
+        profile = session.capture_profile or get_profile(DEFAULT_PCAP_PROFILE)
+        BATCH_SIZE = profile.batch_size
+        session.overload.idle_timeout = profile.idle_timeout
+        start_time = time.time()
+        chunk_attempts: Dict[tuple, int] = {}
+        
+        while not session.stop_flag.is_set():
+            if session.duration and time.time() - start_time >= session.duration:
+                print(f"⏱️ [{session_id}] Ingest duration reached")
+                break
+            
+            chunks = tailer.poll()
+            for i, chunk in enumerate(chunks):
+                if session.stop_flag.is_set():
+                    tailer.discard(chunk)
+                    continue
+                
+                details = {"pcap_file": Path(chunk.source).name, "capture_offset": chunk.start_offset}
+                attempt_key = (chunk.source, chunk.start_offset)
+                try:
+                    # Read the whole chunk before recording anything, so a failed
+                    # read can be retried without analyzing any flow twice
+                    records = [build_flow_record(session, flow) for flow in create_streamer(chunk.path, profile)]
                 except Exception as e:
-                    print(f"❌ Batch processing error: {e}")
-                    batch = []
+                    attempts = chunk_attempts[attempt_key] = chunk_attempts.get(attempt_key, 0) + 1
+                    if attempts >= INGEST_MAX_CHUNK_ATTEMPTS:
+                        error = f"chunk at offset {chunk.start_offset} failed {attempts} times: {e}"
+                        print(f"❌ [{session_id}] Giving up on {details['pcap_file']}: {error}")
+                        tailer.fail(chunk, error)
+                        chunk_attempts.pop(attempt_key, None)
+                        continue
+                    # Leave this and later chunks uncommitted so the next poll retries them
+                    print(f"❌ [{session_id}] Chunk {chunk.path.name} failed (attempt {attempts}): {e}")
+                    for pending in chunks[i:]:
+                        tailer.discard(pending)
+                    session.stop_flag.wait(tailer.poll_interval)
+                    break
+                chunk_attempts.pop(attempt_key, None)
+                
+                for start in range(0, len(records), BATCH_SIZE):
+                    batch = records[start:start + BATCH_SIZE]
+                    try:
+                        process_flow_batch(session, batch, source='ingest', details=details)
+                    except Exception as e:
+                        # Not retried: the chunk's earlier batches are already recorded
+                        error = f"{len(batch)} flows at offset {chunk.start_offset} skipped: {e}"
+                        print(f"❌ [{session_id}] {details['pcap_file']}: {error}")
+                        tailer.record_error(chunk.source, error)
+                
+                tailer.commit(chunk)
+            
+            if not chunks:
+                session.stop_flag.wait(tailer.poll_interval)
         
-        print(f"✅ Monitoring complete. Analyzed {monitoring_state['stats']['total_flows']} flows")
+        print(f"✅ [{session_id}] Ingest stopped. Analyzed {session.stats['total_flows']} flows")
         
     except Exception as e:
-        print(f"❌ Monitoring error: {e}")
+        print(f"❌ [{session_id}] Ingest error: {e}")
         import traceback
         traceback.print_exc()
     
     finally:
-        monitoring_state["active"] = False
-        monitoring_state["end_time"] = datetime.now().isoformat()
+        finish_session(session)
 
-def save_monitoring_session(session_id: str) -> str:
+def save_monitoring_session(session: MonitoringSession) -> str:
     """Save monitoring session results to file."""
-    global monitoring_state, detected_threats
+    stats = session.stats
     
     session_data = {
-        "session_id": session_id,
-        "start_time": monitoring_state["start_time"],
-        "end_time": monitoring_state["end_time"],
-        "interface": monitoring_state["interface"],
-        "duration_requested": monitoring_state["duration"],
+        "session_id": session.session_id,
+        "start_time": session.start_time,
+        "end_time": session.end_time,
+        "interface": session.display_name,
+        "duration_requested": session.duration,
         "statistics": {
-            "total_flows": monitoring_state["stats"]["total_flows"],
-            "benign_flows": monitoring_state["stats"]["benign_flows"],
-            "attack_flows": monitoring_state["stats"]["attack_flows"],
+            "total_flows": stats["total_flows"],
+            "benign_flows": stats["benign_flows"],
+            "attack_flows": stats["attack_flows"],
             "attack_percentage": round(
-                monitoring_state["stats"]["attack_flows"] / max(monitoring_state["stats"]["total_flows"], 1) * 100, 2
+                stats["attack_flows"] / max(stats["total_flows"] - stats["shed_flows"], 1) * 100, 2
             ),
-            "flows_per_second": monitoring_state["stats"]["flows_per_second"]
+            "shed_flows": stats["shed_flows"],
+            "flows_per_second": stats["flows_per_second"],
+            "class_counts": stats["class_counts"]
         },
-        "threats": detected_threats,
-        "summary": {
-            "threat_types": {},
-            "top_source_ips": {},
-            "top_destination_ips": {}
-        }
+        "overload": session.overload.info(),
+        "ingest": session.ingest.info() if session.ingest is not None else None,
+        "capture_profile": session.capture_profile.to_dict() if session.capture_profile is not None else None,
+        "threats": list(session.threats),
+        # Maintained online by the heavy-hitter summaries during the session
+        "summary": session.summary.snapshot(10),
+        "timeline": session.timeline.breakdown('minute')
     }
     
-    # Generate summary
-    for threat in detected_threats:
-        # Count threat types
-        threat_type = threat.get("threat_type", "unknown")
-        session_data["summary"]["threat_types"][threat_type] = \
-            session_data["summary"]["threat_types"].get(threat_type, 0) + 1
-        
-        # Count source IPs
-        src_ip = threat.get("source_ip", "unknown")
-        session_data["summary"]["top_source_ips"][src_ip] = \
-            session_data["summary"]["top_source_ips"].get(src_ip, 0) + 1
-        
-        # Count destination IPs
-        dst_ip = threat.get("destination_ip", "unknown")
-        session_data["summary"]["top_destination_ips"][dst_ip] = \
-            session_data["summary"]["top_destination_ips"].get(dst_ip, 0) + 1
-    
-    # Sort and limit top IPs
-    session_data["summary"]["top_source_ips"] = dict(
-        sorted(session_data["summary"]["top_source_ips"].items(), key=lambda x: -x[1])[:10]
-    )
-    session_data["summary"]["top_destination_ips"] = dict(
-        sorted(session_data["summary"]["top_destination_ips"].items(), key=lambda x: -x[1])[:10]
-    )
-    
     # Save to file
-    filename = f"session_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    filename = f"session_{session.session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     filepath = RESULTS_DIR / filename
     
     with open(filepath, 'w') as f:
         json.dump(session_data, f, indent=2)
     
+    session.results_file = str(filepath)
     print(f"💾 Session saved: {filepath}")
     return str(filepath)
 
@@ -429,22 +638,30 @@ async def health_check():
         status="healthy",
         model_loaded=analyzer is not None and predictor is not None,
         extractor_available=analyzer is not None and analyzer.extractor.nfstream_available,
-        monitoring_active=monitoring_state["active"],
+        monitoring_active=session_manager.any_active(),
         timestamp=datetime.utcnow().isoformat()
     )
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/api/start-capture")
 async def start_capture(request: CaptureRequest):
-    """Start real-time network monitoring."""
-    global monitoring_state, monitoring_thread, detected_threats
-    
-    if monitoring_state["active"]:
-        raise HTTPException(status_code=400, detail="Monitoring is already active")
-    
+    """Start real-time network monitoring (one session per interface)."""
     if predictor is None:
         raise HTTPException(status_code=503, detail="AI model not loaded")
     
+    try:
+        profile = get_profile(request.profile, default=DEFAULT_LIVE_PROFILE, bpf_filter=request.bpf_filter)
+        policy = traffic_policy if request.apply_policy else None
+        profile = policy.apply_to_profile(profile) if policy is not None else profile
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     # Select interface
     interface, display_name = select_interface(request.interface)
     
@@ -455,96 +672,233 @@ async def start_capture(request: CaptureRequest):
         )
     
     # Initialize session
-    session_id = str(uuid.uuid4())[:8]
-    stop_monitoring_flag.clear()
-    detected_threats = []  # Clear previous threats
-    
-    monitoring_state.update({
-        "active": True,
-        "start_time": datetime.now().isoformat(),
-        "end_time": None,
-        "interface": display_name,
-        "duration": request.duration,
-        "session_id": session_id,
-        "stats": {
-            "total_flows": 0,
-            "benign_flows": 0,
-            "attack_flows": 0,
-            "flows_per_second": 0.0
-        }
-    })
+    try:
+        session = session_manager.create(interface, display_name, request.duration)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Start monitoring thread
-    monitoring_thread = threading.Thread(
-        target=run_monitoring,
-        args=(interface, request.duration, session_id),
-        daemon=True
-    )
-    monitoring_thread.start()
+    session.capture_profile = profile
+    session.traffic_policy = policy
+    session.start(run_monitoring)
     
     return {
         "status": "started",
         "message": f"Real-time monitoring started on {display_name}",
-        "session_id": session_id,
+        "session_id": session.session_id,
         "interface": display_name,
-        "duration": request.duration
+        "duration": request.duration,
+        "capture_profile": profile.to_dict(),
+        "active_sessions": len(session_manager.active_sessions())
     }
 
 
-@app.post("/api/stop-capture")
-async def stop_capture():
-    """Stop real-time network monitoring and save results."""
-    global monitoring_state
+@app.post("/api/start-ingest")
+async def start_ingest(request: IngestRequest):
+    """
+    Follow a directory of rolling capture files (tcpdump -C / -G).
     
-    if not monitoring_state["active"]:
-        raise HTTPException(status_code=400, detail="Monitoring is not active")
+    New files and packets appended to the active file are analyzed as they
+    appear; threats go to the same store and webhook as live monitoring.
+    Per-file offsets are checkpointed, so restarting an ingest of the same
+    directory resumes without re-analyzing data.
+    """
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="AI model not loaded")
     
-    # Signal thread to stop
-    stop_monitoring_flag.set()
+    try:
+        profile = get_profile(request.profile, default=DEFAULT_PCAP_PROFILE, bpf_filter=request.bpf_filter)
+        policy = traffic_policy if request.apply_policy else None
+        profile = policy.apply_to_profile(profile) if policy is not None else profile
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Wait a moment for thread to finish
-    if monitoring_thread and monitoring_thread.is_alive():
-        monitoring_thread.join(timeout=5.0)
+    directory = Path(request.directory).expanduser().resolve()
+    checkpoint = INGEST_CHECKPOINT_DIR / f"{hashlib.sha1(str(directory).encode()).hexdigest()[:12]}.json"
+    try:
+        tailer = PcapTailer(directory, pattern=request.pattern, checkpoint_path=checkpoint,
+                            poll_interval=max(0.2, request.poll_interval))
+    except NotADirectoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    monitoring_state["active"] = False
-    monitoring_state["end_time"] = datetime.now().isoformat()
+    try:
+        session = session_manager.create(str(directory), f"ingest:{directory.name}", request.duration, replay=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Save session results
-    session_id = monitoring_state.get("session_id", "unknown")
-    results_file = save_monitoring_session(session_id)
+    session.ingest = tailer
+    session.capture_profile = profile
+    session.traffic_policy = policy
+    session.start(run_ingest)
     
     return {
-        "status": "stopped",
-        "message": "Monitoring stopped successfully",
-        "session_id": session_id,
+        "status": "started",
+        "message": f"Following capture directory {directory}",
+        "session_id": session.session_id,
+        "directory": str(directory),
+        "pattern": request.pattern,
+        "checkpoint": str(checkpoint),
+        "capture_profile": profile.to_dict(),
+        "active_sessions": len(session_manager.active_sessions())
+    }
+
+
+def stop_session(session: MonitoringSession) -> Dict:
+    """Stop a session, save its results and build the stop response."""
+    session.stop(timeout=5.0)
+    results_file = session.results_file or save_monitoring_session(session)
+    
+    return {
+        "session_id": session.session_id,
+        "interface": session.display_name,
         "results_file": results_file,
-        "statistics": monitoring_state["stats"],
+        "statistics": dict(session.stats),
         "duration": {
-            "start": monitoring_state["start_time"],
-            "end": monitoring_state["end_time"]
+            "start": session.start_time,
+            "end": session.end_time
         }
     }
 
 
+@app.post("/api/stop-capture")
+async def stop_capture(session_id: Optional[str] = None):
+    """Stop real-time network monitoring and save results (all sessions unless session_id is given)."""
+    if session_id is not None:
+        session = session_manager.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+        sessions = [session] if session.active else []
+    else:
+        sessions = session_manager.active_sessions()
+    
+    if not sessions:
+        raise HTTPException(status_code=400, detail="Monitoring is not active")
+    
+    stopped = [stop_session(session) for session in sessions]
+    
+    # Top-level fields keep the single-session response shape
+    response = {
+        "status": "stopped",
+        "message": "Monitoring stopped successfully",
+        **stopped[-1],
+        "sessions": stopped
+    }
+    if len(stopped) > 1:
+        response["statistics"] = session_manager.aggregate_stats()
+        response["message"] = f"Stopped {len(stopped)} monitoring sessions"
+    return response
+
+
 @app.get("/api/get-threats")
-async def get_threats(limit: int = 50):
-    """Get detected threats from current/recent monitoring session."""
-    threats = detected_threats[-limit:] if limit > 0 else detected_threats
+async def get_threats(limit: int = 50, session_id: Optional[str] = None):
+    """Get detected threats from current/recent monitoring sessions."""
+    if session_id is not None:
+        session = session_manager.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+        all_threats = list(session.threats)
+        active = session.active
+    else:
+        all_threats = session_manager.all_threats()
+        active = session_manager.any_active()
+    
+    threats = all_threats[-limit:] if limit > 0 else all_threats
     
     return {
         "threats": threats,
         "count": len(threats),
-        "total": len(detected_threats),
-        "monitoring_active": monitoring_state["active"],
+        "total": len(all_threats),
+        "monitoring_active": active,
         "timestamp": datetime.now().isoformat()
     }
 
 
+def _check_stream_session(session_id: Optional[str]):
+    if session_id is not None and session_manager.get(session_id) is None:
+        raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+
+
+@app.websocket("/ws/threats")
+async def stream_threats_ws(websocket: WebSocket, session_id: Optional[str] = None,
+                            since: Optional[int] = None):
+    """
+    Push new threats and stats deltas as JSON messages.
+    
+    Messages: {"seq", "type": "threat"|"stats"|"lagged"|"heartbeat", "session_id", "timestamp", "data"}.
+    Reconnect with ?since=<last seq> to resume without gaps (while still buffered).
+    """
+    if session_id is not None and session_manager.get(session_id) is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    subscription = threat_broadcast.subscribe(since=since, session_id=session_id, transport='ws')
+    try:
+        while True:
+            events, missed = await threat_broadcast.next_batch(subscription, timeout=STREAM_HEARTBEAT_SECONDS)
+            if missed:
+                await websocket.send_json({"type": "lagged", "missed": missed})
+            for event in events:
+                await websocket.send_json(event)
+            if not events and not missed:
+                await websocket.send_json({"type": "heartbeat", "seq": subscription.cursor - 1,
+                                           "timestamp": time.time()})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        threat_broadcast.unsubscribe(subscription)
+
+
+@app.get("/api/stream/threats")
+async def stream_threats_sse(request: Request, session_id: Optional[str] = None,
+                             since: Optional[int] = None):
+    """
+    Server-Sent Events version of /ws/threats.
+    
+    Each event carries `id: <seq>`; browsers resume via Last-Event-ID on reconnect.
+    """
+    _check_stream_session(session_id)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    async def event_stream():
+        subscription = threat_broadcast.subscribe(since=since, session_id=session_id, transport='sse')
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                events, missed = await threat_broadcast.next_batch(subscription, timeout=STREAM_HEARTBEAT_SECONDS)
+                if missed:
+                    yield f"event: lagged\ndata: {json.dumps({'missed': missed})}\n\n"
+                for event in events:
+                    yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if not events and not missed:
+                    yield ": heartbeat\n\n"
+        finally:
+            threat_broadcast.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/stream/status")
+async def stream_status():
+    """Broadcast buffer occupancy and subscriber count."""
+    return threat_broadcast.info()
+
+
 @app.post("/api/analyze-pcap")
-async def analyze_pcap_legacy(request: dict):
+def analyze_pcap_legacy(request: dict):
     """
     Analyze PCAP file (legacy endpoint for Node.js backend).
-    Accepts {"file_path": "...", "batch_size": 5000} format.
+    Runs on the threadpool so a long job does not stall the threat streams.
+    Accepts {"file_path": "...", "batch_size": 5000, "model_type": "nfstream", "profile": false,
+    "time_resolution": "minute", "index": false, "capture_profile": "forensic", "bpf_filter": null,
+    "apply_policy": true} format.
+    With "index": true the flows are persisted for /api/flows/{index_id} queries.
+    model_type "cascade" adds attack typing for flows the binary model flags.
     """
     if analyzer is None:
         raise HTTPException(status_code=503, detail="AI analyzer not loaded")
@@ -561,82 +915,109 @@ async def analyze_pcap_legacy(request: dict):
     if not pcap_path.exists():
         raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
     
+    # Binary NFStream model by default; the cascade adds attack types for flagged flows
+    model_type = 'cascade' if request.get("model_type") == 'cascade' else 'nfstream'
+    
+    time_resolution = request.get("time_resolution", "minute")
+    try:
+        bucket_width(time_resolution)
+        capture_profile = get_profile(request.get("capture_profile"), bpf_filter=request.get("bpf_filter"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    profiler = PipelineProfiler() if profiling_enabled(request.get("profile")) else None
+    
     try:
         start_time = datetime.utcnow()
+        if profiler is not None:
+            profiler.start()
         
         print(f"\n📊 Batch size for breakdown: {batch_size}")
         
         # Analyze PCAP with batch size
         results = analyzer.analyze_pcap(
             pcap_path,
-            model_type='nfstream',
+            model_type=model_type,
             save_results=False,  # Keep in memory only
-            batch_size=batch_size
+            batch_size=batch_size,
+            time_resolution=time_resolution,
+            index_dir=FLOW_INDEX_DIR if request.get("index") else None,
+            retain='attacks',  # Only attack rows are turned into threats
+            capture_profile=capture_profile,
+            traffic_policy=traffic_policy if request.get("apply_policy", True) else None
         )
         
+        processing_time = (datetime.utcnow() - start_time).total_seconds()
         if results['status'] != 'success':
+            # Recorded here: the HTTPException skips the generic error handler below
+            PCAP_JOB_SECONDS.labels(
+                endpoint='analyze-pcap', status='no_flows' if results['status'] == 'no_flows' else 'error'
+            ).observe(processing_time)
             raise HTTPException(status_code=400, detail=results.get('message', 'Analysis failed'))
+        PCAP_JOB_SECONDS.labels(endpoint='analyze-pcap', status='success').observe(processing_time)
         
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
-        
-        # Extract threats from the dataframe
-        threats_list = []
-        if 'dataframe' in results and results.get('threat_detected', False):
-            df = results['dataframe']
-            attacks_df = df[df['Prediction'] != 'BENIGN'].copy()
+        with stage('response'):
+            # Extract threats from the dataframe
+            threats_list = []
+            if 'dataframe' in results and results.get('threat_detected', False):
+                df = results['dataframe']
+                # Decode packed IPs/labels for the attack rows only
+                attacks_df = decode_flow_table(df[df['Prediction'] != 'BENIGN'])
             
-            print(f"📊 Extracting {len(attacks_df)} threats from analysis...")
+                print(f"📊 Extracting {len(attacks_df)} threats from analysis...")
             
-            for idx, row in attacks_df.iterrows():
-                # Generate unique threat ID
-                threat_id = f"pcap_{datetime.now().strftime('%Y%m%d%H%M%S')}_{idx:06d}"
+                for idx, row in attacks_df.iterrows():
+                    # Generate unique threat ID
+                    threat_id = f"pcap_{datetime.now().strftime('%Y%m%d%H%M%S')}_{idx:06d}"
                 
-                # Determine severity based on attack type
-                attack_type = str(row.get('Prediction', 'UNKNOWN'))
-                if 'DDoS' in attack_type:
-                    severity = 'critical'
-                elif 'DoS' in attack_type or 'PortScan' in attack_type:
-                    severity = 'high'
-                elif 'Brute' in attack_type or 'Web' in attack_type:
-                    severity = 'high'
-                else:
-                    severity = 'medium'
+                    # Determine severity based on attack type
+                    attack_type = str(row.get('Prediction', 'UNKNOWN'))
+                    if 'DDoS' in attack_type:
+                        severity = 'critical'
+                    elif 'DoS' in attack_type or 'PortScan' in attack_type:
+                        severity = 'high'
+                    elif 'Brute' in attack_type or 'Web' in attack_type:
+                        severity = 'high'
+                    else:
+                        severity = 'medium'
                 
-                # Extract IP and port info if available
-                src_ip = str(row.get('src_ip', row.get('_src_ip', '0.0.0.0')))
-                dst_ip = str(row.get('dst_ip', row.get('_dst_ip', '0.0.0.0')))
-                src_port = int(row.get('src_port', row.get('_src_port', 0)))
-                dst_port = int(row.get('dst_port', row.get('_dst_port', 0)))
-                protocol = int(row.get('protocol', row.get('_protocol', 0)))
+                    # Extract IP and port info if available
+                    src_ip = str(row.get('src_ip', row.get('_src_ip', '0.0.0.0')))
+                    dst_ip = str(row.get('dst_ip', row.get('_dst_ip', '0.0.0.0')))
+                    src_port = int(row.get('src_port', row.get('_src_port', 0)))
+                    dst_port = int(row.get('dst_port', row.get('_dst_port', 0)))
+                    protocol = int(row.get('protocol', row.get('_protocol', 0)))
                 
-                # Get confidence
-                confidence = float(row.get('Confidence', 0.85))
+                    # Get confidence
+                    confidence = float(row.get('Confidence', 0.85))
                 
-                threat_data = {
-                    "threat_id": threat_id,
-                    "threat_type": attack_type,
-                    "predicted_class": attack_type,
-                    "severity": severity,
-                    "source_ip": src_ip,
-                    "destination_ip": dst_ip,
-                    "source_port": src_port,
-                    "destination_port": dst_port,
-                    "protocol": protocol,
-                    "confidence": confidence,
-                    "timestamp": datetime.now().isoformat(),
-                    "details": {
-                        "model_used": "NFStream Binary",
-                        "pcap_file": str(pcap_path.name),
-                        "flow_index": int(idx),
-                        "detection_type": "pcap_analysis"
+                    threat_data = {
+                        "threat_id": threat_id,
+                        "threat_type": attack_type,
+                        "predicted_class": attack_type,
+                        "severity": severity,
+                        "source_ip": src_ip,
+                        "destination_ip": dst_ip,
+                        "source_port": src_port,
+                        "destination_port": dst_port,
+                        "protocol": protocol,
+                        "confidence": confidence,
+                        "model_version": results.get('model_version'),
+                        "timestamp": datetime.now().isoformat(),
+                        "details": {
+                            "model_used": "Cascade" if model_type == 'cascade' else "NFStream Binary",
+                            "pcap_file": str(pcap_path.name),
+                            "flow_index": int(idx),
+                            "detection_type": "pcap_analysis"
+                        }
                     }
-                }
-                threats_list.append(threat_data)
+                    threats_list.append(threat_data)
             
-            print(f"✅ Extracted {len(threats_list)} threat objects")
+                matched = threat_intel.enrich(threats_list, source='pcap')
+                print(f"✅ Extracted {len(threats_list)} threat objects ({matched} matched threat intel)")
         
         # Format response for Node.js backend
-        return {
+        response = {
             "success": True,
             "status": "success",
             "threats": threats_list,
@@ -645,51 +1026,216 @@ async def analyze_pcap_legacy(request: dict):
             "analysis_timestamp": datetime.now().isoformat(),
             "processing_time": processing_time,
             "summary": results.get('summary', {}),
-            "threat_detected": results.get('threat_detected', False)
+            "threat_detected": results.get('threat_detected', False),
+            "capture_profile": capture_profile.name,
+            "model_version": results.get('model_version')
         }
+        if 'cascade' in results:
+            response["cascade"] = results['cascade']
+        if 'index_id' in results:
+            response["index_id"] = results['index_id']
+        if profiler is not None:
+            response["profile"] = profiler.report()
+        
+        return response
         
     except HTTPException:
         raise
     except Exception as e:
+        PCAP_JOB_SECONDS.labels(endpoint='analyze-pcap', status='error').observe(
+            (datetime.utcnow() - start_time).total_seconds()
+        )
         print(f"Error analyzing PCAP: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"PCAP analysis failed: {str(e)}")
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+MODEL_NAMES = {
+    "nfstream": "NFStream Robust Binary",
+    "multiclass": "Multiclass CICIDS2017",
+    "cicflowmeter": "CICFlowMeter",
+    "robust_binary": "Robust Binary",
+}
+
+
+def _offline_metric(offline: Optional[Dict[str, Any]], *keys: str) -> Optional[float]:
+    """First numeric value of `keys` in a model's offline info, or None."""
+    for key in keys:
+        value = (offline or {}).get(key)
+        if isinstance(value, (int, float)):
+            return value
+    return None
 
 
 @app.get("/api/model-stats")
 async def get_model_stats():
-    """Get model statistics (legacy endpoint)."""
-    stats = monitoring_state["stats"].copy()
+    """
+    Loaded models with measured live telemetry (calls, rows, latency, class mix,
+    confidence) per version, plus offline metrics from the training info files.
+    """
+    stats = session_manager.aggregate_stats()
+    models = []
+    for entry in (predictor.model_stats() if predictor is not None else []):
+        offline = entry["offline"]
+        current = entry["telemetry"].get(entry["version"])
+        models.append({
+            "name": (offline or {}).get("model") or MODEL_NAMES.get(entry["key"], entry["key"]),
+            "key": entry["key"],
+            "version": entry["version"],
+            "artifact": entry["artifact"],
+            # Offline (training-time) metrics; None when the info file does not report them
+            "accuracy": _offline_metric(offline, "accuracy"),
+            "precision": _offline_metric(offline, "precision"),
+            "recall": _offline_metric(offline, "recall"),
+            "f1_score": _offline_metric(offline, "f1_score", "f1"),
+            "false_positive_rate": _offline_metric(offline, "fpr", "false_positive_rate"),
+            "last_updated": entry["loaded_at"],
+            "offline": offline,
+            "live": current,
+            "previous_versions": {version: counters for version, counters in entry["telemetry"].items()
+                                  if version != entry["version"]},
+        })
     
     return {
-        "models": [
-            {
-                "name": "NFStream Robust Binary",
-                "accuracy": 0.7710,  # 77.10% accuracy
-                "precision": 0.85,
-                "recall": 0.78,
-                "f1_score": 0.81,
-                "last_updated": datetime.now().isoformat()
-            }
-        ],
+        "models": models,
+        "model_reload": predictor.reload_status if predictor is not None else None,
         "detection_status": {
-            "is_running": monitoring_state["active"],
+            "is_running": session_manager.any_active(),
+            "active_sessions": len(session_manager.active_sessions()),
             "stats": stats,
-            "threats_detected": len(detected_threats),
-            "models_loaded": predictor is not None
+            "threats_detected": session_manager.threat_count(),
+            "models_loaded": predictor is not None,
+            "prefilter": predictor.prefilter.stats() if predictor is not None else None,
+            "early_exit": predictor.early_exit_stats() if predictor is not None else None
         },
         "timestamp": datetime.now().isoformat()
     }
 
 
-@app.post("/api/clear-threats")
-async def clear_threats():
-    """Clear detected threats from memory."""
-    global detected_threats
+def _confined_models_dir(models_dir: Optional[str]) -> Path:
+    """
+    Resolve a models directory from a request, confined to the predictor's models/ tree.
+    
+    Model artifacts are unpickled, so an API caller must never choose an arbitrary file.
+    """
+    root = predictor.models_dir.resolve()
+    directory = (root / models_dir).resolve() if models_dir else root
+    if not directory.is_relative_to(root):
+        raise HTTPException(status_code=403, detail=f"Model directory must be inside {root}")
+    if not directory.is_dir():
+        raise HTTPException(status_code=404, detail=f"Directory not found: {models_dir}")
+    return directory
+
+
+class ModelReloadRequest(BaseModel):
+    models_dir: Optional[str] = None  # models/ or a directory under it with the new artifact (default: models/)
+    wait: bool = False
+
+
+@app.get("/api/models")
+async def get_models():
+    """Current NFStream model version, the last reload and previously served versions."""
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="AI predictor not loaded")
+    return {
+        "nfstream": predictor.nfstream_version.info(),
+        "reload": predictor.reload_status,
+        "history": list(predictor.model_history)
+    }
+
+
+@app.post("/api/models/reload")
+def reload_models(request: ModelReloadRequest):
+    """
+    Load, validate and warm up a new NFStream model in the background and swap it in.
+    Capture keeps running on the current model until the swap; a failed candidate is discarded.
+    """
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="AI predictor not loaded")
+    status = predictor.reload_nfstream(_confined_models_dir(request.models_dir), wait=request.wait)
+    if status["state"] == "failed":
+        raise HTTPException(status_code=400, detail=f"Model reload failed: {status.get('error')}")
+    return status
+
+
+MODEL_NAME_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+
+
+class ShadowRequest(BaseModel):
+    models_dir: str  # models/ or a directory under it
+    model_name: str = "nfstream_robust_binary"  # random_forest_<model_name>.joblib etc.
+    sample_rate: float = 1.0  # Fraction of live batches also scored by the candidate
+    max_pending: int = 2  # Batches queued for the shadow worker before new ones are dropped
+
+
+@app.post("/api/shadow/start")
+def start_shadow(request: ShadowRequest):
+    """
+    Score live batches with a candidate model alongside production, for comparison only.
+    Replaces a running shadow trial; alerts and threats always come from production.
+    """
+    global shadow_evaluator, last_shadow_report
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="AI predictor not loaded")
+    if not MODEL_NAME_PATTERN.fullmatch(request.model_name):
+        raise HTTPException(status_code=400, detail="model_name may only contain letters, digits and underscores")
+    model_path, features_path, class_names_path = artifact_paths(_confined_models_dir(request.models_dir),
+                                                                 request.model_name)
+    try:
+        candidate = prepare_model_version(
+            request.model_name, model_path, features_path, class_names_path,
+            available_features=NFSTREAM_ATTRIBUTES
+        )
+        evaluator = ShadowEvaluator(candidate, sample_rate=request.sample_rate,
+                                    max_pending=max(1, request.max_pending))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid shadow model: {e}")
     
-    count = len(detected_threats)
-    detected_threats = []
+    previous, shadow_evaluator = shadow_evaluator, evaluator
+    if previous is not None:
+        last_shadow_report = previous.stop()
+    print(f"🌓 Shadow trial started: {request.model_name} ({candidate.version}), sample rate {request.sample_rate}")
+    return evaluator.report()
+
+
+@app.get("/api/shadow/report")
+async def get_shadow_report():
+    """Agreement, disagreement and latency of the running (or last) shadow trial."""
+    if shadow_evaluator is not None:
+        return shadow_evaluator.report()
+    if last_shadow_report is not None:
+        return last_shadow_report
+    raise HTTPException(status_code=404, detail="No shadow trial has run")
+
+
+@app.post("/api/shadow/stop")
+def stop_shadow():
+    """Stop the shadow trial and return its final report."""
+    global shadow_evaluator, last_shadow_report
+    evaluator, shadow_evaluator = shadow_evaluator, None
+    if evaluator is None:
+        raise HTTPException(status_code=404, detail="No shadow trial is running")
+    last_shadow_report = evaluator.stop()
+    print(f"🌓 Shadow trial stopped: agreement {last_shadow_report['agreement_rate']}")
+    return last_shadow_report
+
+
+@app.post("/api/clear-threats")
+async def clear_threats(session_id: Optional[str] = None):
+    """Clear detected threats from memory (all sessions unless session_id is given)."""
+    if session_id is not None:
+        session = session_manager.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+        count = session.clear_threats()
+    else:
+        count = session_manager.clear_threats()
     
     return {
         "success": True,
@@ -698,17 +1244,221 @@ async def clear_threats():
     }
 
 
+def get_session_or_latest(session_id: Optional[str]) -> MonitoringSession:
+    """Resolve a session_id query parameter, defaulting to the most recent session."""
+    session = session_manager.get(session_id) if session_id else session_manager.latest()
+    if session is None:
+        detail = f"Session not found: {session_id}" if session_id else "No monitoring sessions"
+        raise HTTPException(status_code=404, detail=detail)
+    return session
+
+
 @app.get("/api/monitoring-status")
-async def get_monitoring_status():
-    """Get current monitoring status."""
+async def get_monitoring_status(top: int = 10, session_id: Optional[str] = None):
+    """Get current monitoring status, including live top-K summaries."""
+    session = session_manager.get(session_id) if session_id else session_manager.latest()
+    if session_id and session is None:
+        raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+    
+    sessions = session_manager.sessions()
+    return {
+        "active": session_manager.any_active() if session_id is None else session.active,
+        "session_id": session.session_id if session else None,
+        "interface": session.display_name if session else None,
+        "start_time": session.start_time if session else None,
+        "duration": session.duration if session else None,
+        "stats": dict(session.stats) if session else session_manager.aggregate_stats(),
+        "threats_count": len(session.threats) if session else 0,
+        "summary": session.summary.snapshot(top) if session else None,
+        "overload": session.overload.info() if session else None,
+        "active_sessions": len([s for s in sessions if s.active]),
+        "sessions": [
+            {"session_id": s.session_id, "interface": s.display_name, "active": s.active}
+            for s in sessions
+        ]
+    }
+
+
+@app.get("/api/sessions")
+async def list_sessions(top: int = 5):
+    """List monitoring sessions (active and recently finished)."""
+    sessions = session_manager.sessions()
+    return {
+        "sessions": [s.status(top) for s in sessions],
+        "count": len(sessions),
+        "active": len([s for s in sessions if s.active]),
+        "aggregate_stats": session_manager.aggregate_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str, top: int = 10):
+    """Status, statistics and top-K summaries of one session."""
+    return get_session_or_latest(session_id).status(top)
+
+
+@app.post("/api/sessions/{session_id}/stop")
+async def stop_session_endpoint(session_id: str):
+    """Stop one monitoring session and save its results."""
+    session = get_session_or_latest(session_id)
+    if not session.active:
+        raise HTTPException(status_code=400, detail=f"Session {session_id} is not active")
+    
+    return {
+        "status": "stopped",
+        "message": "Monitoring stopped successfully",
+        **stop_session(session)
+    }
+
+
+@app.get("/api/sessions/{session_id}/threats")
+async def get_session_threats(session_id: str, limit: int = 50):
+    """Threats detected by one session."""
+    return await get_threats(limit=limit, session_id=session_id)
+
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a finished session (active sessions must be stopped first)."""
+    session = get_session_or_latest(session_id)
+    if session.active:
+        raise HTTPException(status_code=400, detail=f"Session {session_id} is still active")
+    session_manager.remove(session_id)
+    
+    return {
+        "success": True,
+        "message": f"Session {session_id} removed",
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/traffic/top-talkers")
+async def get_top_talkers(limit: int = 10, by: str = "flows", session_id: Optional[str] = None):
+    """Heaviest sources in the sliding window, by 'flows' or 'bytes'."""
+    traffic_stats = get_session_or_latest(session_id).traffic_stats
+    try:
+        talkers = traffic_stats.top_talkers(limit, by=by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "top_talkers": talkers,
+        "by": by,
+        "window": traffic_stats.info(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/traffic/fan-out")
+async def get_fan_out(limit: int = 10, by: str = "ports", session_id: Optional[str] = None):
+    """Sources contacting the most distinct 'ports' or 'destinations' (scan context)."""
+    traffic_stats = get_session_or_latest(session_id).traffic_stats
+    try:
+        sources = traffic_stats.fan_out(limit, by=by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "fan_out": sources,
+        "by": by,
+        "window": traffic_stats.info(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/traffic/timeline")
+async def get_traffic_timeline(resolution: str = "minute", limit: Optional[int] = None,
+                               session_id: Optional[str] = None):
+    """Flow, attack and byte counts per 'second', 'minute' or 'hour' (by flow start time)."""
+    session = get_session_or_latest(session_id)
+    try:
+        timeline = session.timeline.breakdown(resolution, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "session_id": session.session_id,
+        "resolution": resolution,
+        "timeline": timeline,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/traffic/hosts/{ip}")
+async def get_host_traffic(ip: str, session_id: Optional[str] = None):
+    """Sliding-window statistics for one source IP."""
+    return get_session_or_latest(session_id).traffic_stats.host_stats(ip)
+
+
+# ============================================================================
+# API Endpoints - Flow index (drill-down on analyzed PCAPs)
+# ============================================================================
+
+def get_flow_index(index_id: str):
+    try:
+        return flow_index_store.get(index_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Flow index not found: {index_id}")
+
+
+@app.get("/api/flows")
+async def list_flow_indexes():
+    """Flow indexes written by analyses run with index enabled."""
+    return {"indexes": flow_index_store.list(), "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/api/flows/{index_id}")
+async def get_flow_index_info(index_id: str):
+    """Manifest of one flow index (source PCAP, classes, summary)."""
+    return get_flow_index(index_id).info()
+
+
+@app.get("/api/flows/{index_id}/query")
+async def query_flow_index(
+    index_id: str,
+    src_ip: Optional[str] = None,
+    dst_ip: Optional[str] = None,
+    ip: Optional[str] = None,
+    src_port: Optional[int] = None,
+    dst_port: Optional[int] = None,
+    port: Optional[int] = None,
+    protocol: Optional[int] = None,
+    prediction: Optional[str] = None,
+    attacks_only: bool = False,
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+    limit: int = 100,
+    offset: int = 0,
+    features: bool = False
+):
+    """Filtered lookup of a previously analyzed PCAP's flows (filters are ANDed)."""
+    index = get_flow_index(index_id)
+    start = time.perf_counter()
+    result = index.query(
+        src_ip=src_ip, dst_ip=dst_ip, ip=ip, src_port=src_port, dst_port=dst_port,
+        port=port, protocol=protocol, prediction=prediction, attacks_only=attacks_only,
+        start_ms=start_ms, end_ms=end_ms, limit=max(0, min(limit, 10000)),
+        offset=max(0, offset), include_features=features
+    )
+    result["index_id"] = index_id
+    result["query_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+@app.delete("/api/flows/{index_id}")
+async def delete_flow_index(index_id: str):
+    """Remove a flow index from disk."""
+    try:
+        removed = flow_index_store.delete(index_id)
+    except KeyError:
+        removed = False
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Flow index not found: {index_id}")
     return {
-        "active": monitoring_state["active"],
-        "session_id": monitoring_state.get("session_id"),
-        "interface": monitoring_state.get("interface"),
-        "start_time": monitoring_state.get("start_time"),
-        "duration": monitoring_state.get("duration"),
-        "stats": monitoring_state["stats"],
-        "threats_count": len(detected_threats)
+        "success": True,
+        "message": f"Flow index {index_id} removed",
+        "timestamp": datetime.now().isoformat()
     }
 
 
@@ -722,11 +1472,22 @@ async def analyze_pcap_v1(
     model_type: str = "nfstream",
     max_flows: Optional[int] = None,
     batch_size: int = 5000,
+    profile: Optional[bool] = None,
+    time_resolution: str = "minute",
+    index: bool = False,
+    capture_profile: Optional[str] = None,
+    bpf_filter: Optional[str] = None,
+    apply_policy: bool = True,
     background_tasks: BackgroundTasks = None
 ):
     """Analyze PCAP file (v1 endpoint with file upload)."""
     if analyzer is None:
         raise HTTPException(status_code=503, detail="AI analyzer not loaded")
+    try:
+        bucket_width(time_resolution)
+        capture_profile = get_profile(capture_profile, bpf_filter=bpf_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     start_time = datetime.utcnow()
     analysis_id = str(uuid.uuid4())
@@ -756,18 +1517,30 @@ async def analyze_pcap_v1(
         file_size_mb = file_size / (1024**2)
         print(f"Processing PCAP: {file.filename} ({file_size_mb:.2f} MB)")
         
-        results = analyzer.analyze_pcap(
+        # Off the event loop, so WebSocket/SSE subscribers keep receiving threats
+        results = await run_in_threadpool(
+            analyzer.analyze_pcap,
             tmp_path,
-            model_type='nfstream',
+            model_type='cascade' if model_type == 'cascade' else 'nfstream',
             max_flows=max_flows,
             batch_size=batch_size,
-            save_results=False
+            save_results=False,
+            profile=profile,
+            time_resolution=time_resolution,
+            index_dir=FLOW_INDEX_DIR if index else None,
+            retain='summary',  # Response carries counts only
+            capture_profile=capture_profile,
+            traffic_policy=traffic_policy if apply_policy else None
         )
         
+        processing_time = (datetime.utcnow() - start_time).total_seconds()
         if results['status'] != 'success':
+            # Recorded here: the HTTPException skips the generic error handler below
+            PCAP_JOB_SECONDS.labels(
+                endpoint='v1/analyze-pcap', status='no_flows' if results['status'] == 'no_flows' else 'error'
+            ).observe(processing_time)
             raise HTTPException(status_code=400, detail=results.get('message', 'Analysis failed'))
-        
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
+        PCAP_JOB_SECONDS.labels(endpoint='v1/analyze-pcap', status='success').observe(processing_time)
         
         if tmp_path and tmp_path.exists():
             background_tasks.add_task(lambda: tmp_path.unlink() if tmp_path.exists() else None)
@@ -778,7 +1551,10 @@ async def analyze_pcap_v1(
             threats_detected=results['threat_detected'],
             summary=results['summary'],
             analysis_id=analysis_id,
-            processing_time=processing_time
+            processing_time=processing_time,
+            profile=results.get('profile'),
+            cascade=results.get('cascade'),
+            index_id=results.get('index_id')
         )
         
     except HTTPException:
@@ -790,6 +1566,9 @@ async def analyze_pcap_v1(
             except:
                 pass
         
+        PCAP_JOB_SECONDS.labels(endpoint='v1/analyze-pcap', status='error').observe(
+            (datetime.utcnow() - start_time).total_seconds()
+        )
         print(f"Error analyzing PCAP: {e}")
         import traceback
         traceback.print_exc()
@@ -799,29 +1578,106 @@ async def analyze_pcap_v1(
 @app.get("/api/v1/stats")
 async def get_stats_v1():
     """Get service statistics (v1 endpoint)."""
+    model = predictor.nfstream_version if predictor is not None else None
+    accuracy = _offline_metric(read_model_info(Path(model.artifact)), "accuracy") if model is not None else None
     return {
         "analyzer_loaded": analyzer is not None,
         "model_loaded": predictor is not None,
         "extractor_available": analyzer is not None and analyzer.extractor.nfstream_available,
         "supported_formats": [".pcap", ".pcapng", ".cap"],
         "model_type": "NFStream Robust Binary (BENIGN vs ATTACK)",
-        "model_accuracy": "77.10%",
-        "monitoring_active": monitoring_state["active"]
+        "model_accuracy": f"{accuracy:.2%}" if accuracy is not None else None,
+        "monitoring_active": session_manager.any_active()
+    }
+
+
+class PolicyRequest(BaseModel):
+    rules: List[Dict[str, Any]] = []
+
+
+@app.get("/api/traffic-policy")
+async def get_traffic_policy():
+    """Traffic policy rules, the compiled BPF filter and flow-stage exclusion counters."""
+    return dict(traffic_policy.info(), source=TRAFFIC_POLICY_FILE)
+
+
+@app.put("/api/traffic-policy")
+async def set_traffic_policy(request: PolicyRequest):
+    """Replace the traffic policy (applies to sessions and PCAP jobs started afterwards)."""
+    global traffic_policy
+    try:
+        new_policy = TrafficPolicy(request.rules)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid traffic policy: {e}")
+    traffic_policy = new_policy
+    return dict(traffic_policy.info(), source="api")
+
+
+class AlertThresholdsRequest(BaseModel):
+    min_severity: Optional[str] = None
+    min_confidence: Optional[float] = None
+
+
+@app.get("/api/alert-thresholds")
+async def get_alert_thresholds():
+    """Webhook alert thresholds and the live severity model."""
+    return {"thresholds": alert_thresholds.to_dict(), "severity_model": severity_scorer.to_dict()}
+
+
+@app.put("/api/alert-thresholds")
+async def set_alert_thresholds(request: AlertThresholdsRequest):
+    """Change which live threats are sent to the webhook (all threats are still stored and streamed)."""
+    global alert_thresholds
+    values = alert_thresholds.to_dict()
+    if request.min_severity is not None:
+        values["min_severity"] = request.min_severity
+    if request.min_confidence is not None:
+        values["min_confidence"] = request.min_confidence
+    try:
+        alert_thresholds = AlertThresholds.from_dict(values)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"thresholds": alert_thresholds.to_dict(), "severity_model": severity_scorer.to_dict()}
+
+
+@app.get("/api/threat-intel")
+async def get_threat_intel():
+    """Loaded threat intel lists, their sizes and reload status."""
+    return threat_intel.info()
+
+
+@app.post("/api/threat-intel/reload")
+def reload_threat_intel(wait: bool = True):
+    """Rebuild the threat intel lists now (detection keeps using the old lists until done)."""
+    threat_intel.reload(wait=wait)
+    if wait and threat_intel.last_error:
+        raise HTTPException(status_code=400, detail=f"Threat intel reload failed: {threat_intel.last_error}")
+    return threat_intel.info()
+
+
+@app.get("/api/v1/capture-profiles")
+async def get_capture_profiles():
+    """Named capture profiles (flow expiry and NFStreamer settings)."""
+    return {
+        "profiles": list_profiles(),
+        "default_live": DEFAULT_LIVE_PROFILE,
+        "default_pcap": DEFAULT_PCAP_PROFILE
     }
 
 
 @app.get("/api/v1/interfaces")
-async def get_interfaces_v1():
-    """Get available network interfaces."""
+async def get_interfaces_v1(refresh: bool = False):
+    """Get available network interfaces (refresh=true rediscovers instead of using the cache)."""
     try:
-        interfaces = get_network_interfaces()
+        interfaces = get_network_interfaces(refresh=refresh)
         
         return {
             "interfaces": [
                 {"name": iface['display'], "device": iface['name'], "status": "active"}
                 for iface in interfaces
             ],
-            "count": len(interfaces)
+            "count": len(interfaces),
+            "cache": interface_cache.info()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get interfaces: {str(e)}")
@@ -29,6 +29,7 @@ if __name__ == '__main__':
     
     from src.predictor import NetworkThreatPredictor
     from src.feature_extractor import NFSTREAM_ATTRIBUTES
+    from src.capture_profiles import get_profile, create_streamer
     import pandas as pd
     import numpy as np
     
@@ -123,13 +124,14 @@ if __name__ == '__main__':
     
     # Configuration
     print("\n[3/3] Configuration:")
-    BATCH_SIZE = 10          # Analyze every 10 flows
+    # Capture profile from CAPTURE_PROFILE (low_latency, realtime, forensic, bulk)
+    PROFILE = get_profile(os.getenv("CAPTURE_PROFILE"), default='realtime')
+    BATCH_SIZE = PROFILE.batch_size
     STATS_INTERVAL = 10      # Print stats every 10 seconds
-    IDLE_TIMEOUT = 15        # Faster flow expiration
-    ACTIVE_TIMEOUT = 30      # Faster active timeout
     
+    print(f"  Profile: {PROFILE.name}")
     print(f"  Batch size: {BATCH_SIZE} flows")
-    print(f"  Flow timeout: {ACTIVE_TIMEOUT}s active, {IDLE_TIMEOUT}s idle")
+    print(f"  Flow timeout: {PROFILE.active_timeout}s active, {PROFILE.idle_timeout}s idle")
     print()
     
     # Statistics
@@ -184,14 +186,7 @@ if __name__ == '__main__':
     print("Press Ctrl+C to stop\n")
     
     try:
-        streamer = NFStreamer(
-            source=selected,
-            statistical_analysis=True,
-            active_timeout=ACTIVE_TIMEOUT,
-            idle_timeout=IDLE_TIMEOUT,
-            splt_analysis=0,
-            n_dissections=0,
-        )
+        streamer = create_streamer(selected, PROFILE)
         print("✓ Capture started. Waiting for traffic...\n")
         
         batch = []
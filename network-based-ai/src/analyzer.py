@@ -16,14 +16,30 @@ import json
 # Use relative imports for package structure, fallback to absolute
 try:
     from .predictor import NetworkThreatPredictor
-    from .feature_extractor import PCAPFeatureExtractor, CICIDS2017_FEATURES
+    from .feature_extractor import PCAPFeatureExtractor, CICIDS2017_FEATURES, NFSTREAM_ATTRIBUTES
+    from .profiling import PipelineProfiler, active_profiler, profiling_enabled, stage
+    from .flow_table import METADATA_COLUMNS, TIMELINE_COLUMNS, compact_labels, decode_flow_table, memory_mb
+    from .time_buckets import batch_breakdown, time_breakdown, bucket_width
+    from .flow_index import FlowIndexStore
+    from .capture_profiles import CaptureProfile, get_profile
+    from .traffic_policy import TrafficPolicy
 except ImportError:
     import sys
     parent_dir = Path(__file__).parent.parent
     if str(parent_dir) not in sys.path:
         sys.path.insert(0, str(parent_dir))
     from src.predictor import NetworkThreatPredictor
-    from src.feature_extractor import PCAPFeatureExtractor, CICIDS2017_FEATURES
+    from src.feature_extractor import PCAPFeatureExtractor, CICIDS2017_FEATURES, NFSTREAM_ATTRIBUTES
+    from src.profiling import PipelineProfiler, active_profiler, profiling_enabled, stage
+    from src.flow_table import METADATA_COLUMNS, TIMELINE_COLUMNS, compact_labels, decode_flow_table, memory_mb
+    from src.time_buckets import batch_breakdown, time_breakdown, bucket_width
+    from src.flow_index import FlowIndexStore
+    from src.capture_profiles import CaptureProfile, get_profile
+    from src.traffic_policy import TrafficPolicy
+
+
+# Result retention modes for analyze_pcap
+RETAIN_MODES = ('full', 'attacks', 'summary')
 
 
 class NetworkThreatAnalyzer:
@@ -42,14 +58,17 @@ class NetworkThreatAnalyzer:
     - Other (Bot)
     """
     
-    def __init__(self, models_dir: Union[str, Path] = None):
+    def __init__(self, models_dir: Union[str, Path] = None,
+                 predictor: Optional[NetworkThreatPredictor] = None):
         """
         Initialize the analyzer.
         
         Args:
             models_dir: Path to directory containing trained models.
+            predictor: Shared predictor (e.g. the service's hot-swappable one);
+                       a new one is loaded from models_dir if omitted.
         """
-        self.predictor = NetworkThreatPredictor(models_dir)
+        self.predictor = predictor if predictor is not None else NetworkThreatPredictor(models_dir)
         self.extractor = PCAPFeatureExtractor()
         
         if not self.extractor.nfstream_available:
@@ -61,6 +80,13 @@ class NetworkThreatAnalyzer:
                      output_dir: Union[str, Path] = None,
                      model_type: str = 'nfstream',
                      batch_size: int = 5000,
+                     profile: Optional[bool] = None,
+                     cascade_threshold: float = 0.7,
+                     retain: str = 'full',
+                     time_resolution: str = 'minute',
+                     index_dir: Union[str, Path] = None,
+                     capture_profile: Union[str, CaptureProfile, None] = None,
+                     traffic_policy: Optional[TrafficPolicy] = None,
                      **kwargs) -> Dict:
         """
         Analyze a PCAP file for network threats.
@@ -70,12 +96,56 @@ class NetworkThreatAnalyzer:
             max_flows: Maximum number of flows to analyze
             save_results: Whether to save results to CSV
             output_dir: Directory to save results
-            model_type: 'robust_binary' (recommended), 'nfstream', 'cicflowmeter', or 'multiclass'
+            model_type: 'robust_binary' (recommended), 'nfstream', 'cicflowmeter', 'multiclass',
+                        or 'cascade' (binary screen, multiclass only for suspicious flows)
             batch_size: Number of flows per batch for breakdown (default 5000)
+            profile: Capture stage timings, a CPU sample profile and top allocations
+                     into results['profile'] (default: NETWORK_AI_PROFILE env var)
+            cascade_threshold: In cascade mode, screen-model confidence below which
+                               BENIGN flows are also escalated to the detail model
+            retain: What results['dataframe'] keeps - 'full' (every feature of every
+                    flow), 'attacks' (metadata, prediction and confidence of attack
+                    flows only) or 'summary' (no dataframe). Unneeded columns are
+                    dropped during extraction and right after inference.
+            time_resolution: Bucket width of summary['time_breakdown'] -
+                             'second', 'minute' or 'hour' (by flow first-seen time)
+            index_dir: If set, persist a queryable flow index there (see flow_index.py)
+                       and return its id as results['index_id']
+            capture_profile: Flow expiry / NFStreamer settings by name or
+                             CaptureProfile (default: 'forensic', see capture_profiles.py)
+            traffic_policy: Allow/deny rules; BPF-stage rules are added to the
+                            capture filter, flow-stage rules drop flows before inference
         
         Returns:
             Dictionary containing analysis results with attack details.
         """
+        # Profile this run unless a caller (e.g. an API endpoint) already is
+        if profiling_enabled(profile) and active_profiler() is None:
+            with PipelineProfiler() as profiler:
+                results = self.analyze_pcap(pcap_path, max_flows=max_flows, save_results=save_results,
+                                            output_dir=output_dir, model_type=model_type,
+                                            batch_size=batch_size, profile=False,
+                                            cascade_threshold=cascade_threshold, retain=retain,
+                                            time_resolution=time_resolution, index_dir=index_dir,
+                                            capture_profile=capture_profile,
+                                            traffic_policy=traffic_policy, **kwargs)
+            results['profile'] = profiler.report()
+            if results.get('summary_path'):
+                profile_path = Path(results['summary_path']).with_name(
+                    Path(results['summary_path']).name.replace('summary_', 'profile_', 1)
+                )
+                results['profile_path'] = profiler.save(profile_path)
+                print(f"[SAVED] Profile saved to: {profile_path}")
+            return results
+        
+        if retain not in RETAIN_MODES:
+            raise ValueError(f"retain must be one of {RETAIN_MODES}")
+        bucket_width(time_resolution)
+        capture_profile = get_profile(capture_profile)
+        if traffic_policy is not None:
+            capture_profile = traffic_policy.apply_to_profile(capture_profile)
+        flow_policy = traffic_policy is not None and bool(traffic_policy.flow_rules)
+        
         pcap_path = Path(pcap_path)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -89,8 +159,14 @@ class NetworkThreatAnalyzer:
         use_robust_binary = model_type == 'robust_binary' and self.predictor.robust_binary_model is not None
         use_cicflowmeter = model_type == 'cicflowmeter' and self.predictor.cicflowmeter_model is not None
         use_nfstream_model = model_type == 'nfstream' and self.predictor.nfstream_model is not None
-        
-        if use_robust_binary:
+        # One NFStream model version for the whole job, even if a reload swaps it meanwhile
+        nfstream_version = self.predictor.nfstream_version
+        use_cascade = model_type == 'cascade'
+        
+        if use_cascade:
+            screen_key, detail_key = self._cascade_models()
+            model_name = f"Cascade ({screen_key} screen → {detail_key or 'no detail model'})"
+        elif use_robust_binary:
             model_name = "Robust Binary (99.76% accuracy, 0.23% FPR)"
         elif use_cicflowmeter:
             model_name = "CICFlowMeter (4-class, 99.89% accuracy)"
@@ -108,23 +184,47 @@ class NetworkThreatAnalyzer:
         # Step 1: Extract features
         print(f"\n[1/3] Extracting features from PCAP...")
         
-        if use_robust_binary or use_nfstream_model:
-            # Use raw NFStream features for binary models
-            features_df = self.extractor.extract_nfstream_features(pcap_path, max_flows)
-            print(f"      Extracted {len(features_df)} flows (NFStream features)")
-        elif use_cicflowmeter:
-            # Use CICFlowMeterPlugin for full 78-feature extraction
-            features_df = self.extractor.extract_cicids_full_features(pcap_path, max_flows, include_metadata=True)
-            print(f"      Extracted {len(features_df)} flows (CICFlowMeter features)")
-        else:
-            # Use CICIDS2017-mapped features for multiclass model
-            features_df = self.extractor.extract_features(pcap_path, max_flows, include_metadata=True)
-            print(f"      Extracted {len(features_df)} flows")
+        # Metadata is only needed if flows are kept in the results, indexed or policy-filtered
+        include_metadata = retain != 'summary' or index_dir is not None or flow_policy
+        
+        with stage('extraction'):
+            if use_robust_binary or use_nfstream_model or use_cascade:
+                # Use raw NFStream features for binary models (and the cascade screen)
+                model_key = 'robust_binary' if use_robust_binary else 'nfstream'
+                features_df = self.extractor.extract_nfstream_features(
+                    pcap_path, max_flows, include_metadata=include_metadata,
+                    attributes=None if (use_cascade or retain == 'full') else self._model_attributes(model_key, nfstream_version),
+                    capture_profile=capture_profile
+                )
+                print(f"      Extracted {len(features_df)} flows (NFStream features)")
+            elif use_cicflowmeter:
+                # Use CICFlowMeterPlugin for full 78-feature extraction
+                features_df = self.extractor.extract_cicids_full_features(
+                    pcap_path, max_flows, include_metadata=include_metadata, capture_profile=capture_profile
+                )
+                print(f"      Extracted {len(features_df)} flows (CICFlowMeter features)")
+            else:
+                # Use CICIDS2017-mapped features for multiclass model
+                features_df = self.extractor.extract_features(
+                    pcap_path, max_flows, include_metadata=include_metadata, capture_profile=capture_profile
+                )
+                print(f"      Extracted {len(features_df)} flows")
+        
+        # Drop flows excluded by flow-stage policy rules before inference
+        excluded_flows = 0
+        if flow_policy and len(features_df):
+            with stage('policy'):
+                keep = traffic_policy.frame_mask(features_df, source='pcap')
+                excluded_flows = int((~keep).sum())
+                if excluded_flows:
+                    features_df = features_df[keep].reset_index(drop=True)
+                    print(f"      Excluded {excluded_flows} flows by traffic policy")
         
         if len(features_df) == 0:
             return {
                 'status': 'no_flows',
                 'message': 'No flows found in PCAP file',
+                'excluded_flows': excluded_flows,
                 'pcap_file': str(pcap_path),
                 'timestamp': timestamp
             }
@@ -132,19 +232,28 @@ class NetworkThreatAnalyzer:
         # Step 2: Make predictions
         print(f"\n[2/3] Running threat detection...")
         
-        if use_robust_binary:
-            # Use Robust Binary model (BENIGN/ATTACK, 99.76% accuracy)
-            predictions, probabilities = self.predictor.predict_robust_binary(features_df, return_proba=True)
-        elif use_cicflowmeter:
-            # Use CICFlowMeter model (4-class)
-            predictions, probabilities = self.predictor.predict_cicflowmeter(features_df, return_proba=True)
-        elif use_nfstream_model:
-            # Use NFStream model (binary: BENIGN/DDoS)
-            predictions, probabilities = self.predictor.predict_nfstream(features_df, return_proba=True)
-        else:
-            # Use multiclass CICIDS model
-            feature_cols = [c for c in features_df.columns if c in CICIDS2017_FEATURES]
-            predictions, probabilities = self.predictor.predict(features_df[feature_cols], return_proba=True)
+        cascade_info = None
+        with stage('inference'):
+            if use_cascade:
+                # Binary screen on every flow, detail model only on escalated flows
+                predictions, probabilities, cascade_info = self._predict_cascade(
+                    features_df, screen_key, detail_key, cascade_threshold, nfstream_version
+                )
+            elif use_robust_binary:
+                # Use Robust Binary model (BENIGN/ATTACK, 99.76% accuracy)
+                predictions, probabilities = self.predictor.predict_robust_binary(features_df, return_proba=True)
+            elif use_cicflowmeter:
+                # Use CICFlowMeter model (4-class)
+                predictions, probabilities = self.predictor.predict_cicflowmeter(features_df, return_proba=True)
+            elif use_nfstream_model:
+                # Use NFStream model (binary: BENIGN/DDoS)
+                predictions, probabilities = self.predictor.predict_nfstream(
+                    features_df, return_proba=True, model=nfstream_version
+                )
+            else:
+                # Use multiclass CICIDS model
+                feature_cols = [c for c in features_df.columns if c in CICIDS2017_FEATURES]
+                predictions, probabilities = self.predictor.predict(features_df[feature_cols], return_proba=True)
         
         print(f"      Analyzed {len(predictions)} flows")
 
@@ -153,52 +262,238 @@ class NetworkThreatAnalyzer:
         # Step 3: Generate results
         print(f"\n[3/3] Generating report...")
         
-        features_df['Prediction'] = predictions
-        
-        # Add confidence (max probability)
-        if isinstance(probabilities, np.ndarray) and len(probabilities.shape) == 2:
-            features_df['Confidence'] = probabilities.max(axis=1)
-        
-        # Generate summary with batch breakdown
-        summary = self._generate_summary(predictions, batch_size)
+        with stage('summary'):
+            # Add confidence (max probability)
+            confidence = None
+            if isinstance(probabilities, np.ndarray) and len(probabilities.shape) == 2:
+                confidence = probabilities.max(axis=1).astype(np.float32)
+            elif isinstance(probabilities, np.ndarray):
+                # Cascade already resolves per-flow confidence across its stages
+                confidence = probabilities.astype(np.float32)
+            del probabilities
+            
+            # Generate summary with batch and time breakdowns (before features are released)
+            summary = self._generate_summary(predictions, batch_size)
+            summary['time_resolution'] = time_resolution
+            summary['excluded_flows'] = excluded_flows
+            summary['time_breakdown'] = time_breakdown(
+                features_df.get('first_seen_ms'),
+                np.asarray(predictions) != 'BENIGN',
+                features_df.get('total_bytes'),
+                time_resolution
+            )
+            
+        # Persist the full flow table for drill-down queries
+        index_id = None
+        if index_dir is not None:
+            with stage('indexing'):
+                index_id = FlowIndexStore(index_dir).create(
+                    features_df, predictions, confidence,
+                    screen_predictions=cascade_info['screen_predictions'] if cascade_info else None,
+                    pcap_file=str(pcap_path), summary=summary
+                )
+                print(f"      Flow index {index_id} written to {index_dir}")
+        
+        with stage('summary'):
+            # Keep only what the retention mode needs, releasing the feature matrix
+            features_df = self._retain_frame(features_df, predictions, confidence, cascade_info, retain)
         
         results = {
             'status': 'success',
             'pcap_file': str(pcap_path),
             'pcap_size_mb': pcap_size_mb,
             'timestamp': timestamp,
-            'model_type': 'robust_binary' if use_robust_binary else ('cicflowmeter' if use_cicflowmeter else ('nfstream_binary' if use_nfstream_model else 'multiclass_cicids')),
+            'model_type': 'cascade' if use_cascade else ('robust_binary' if use_robust_binary else ('cicflowmeter' if use_cicflowmeter else ('nfstream_binary' if use_nfstream_model else 'multiclass_cicids'))),
+            'model_version': (cascade_info['model_version'] if use_cascade
+                              else nfstream_version.version if use_nfstream_model
+                              else self.predictor.model_version('robust_binary' if use_robust_binary
+                                                                else 'cicflowmeter' if use_cicflowmeter
+                                                                else 'multiclass')),
 
             'total_flows': len(predictions),
             'summary': summary,
+            'retain': retain,
+            'capture_profile': capture_profile.name,
+            'bpf_filter': capture_profile.bpf_filter,
+            'memory_mb': memory_mb(features_df),
 
             'threat_detected': summary.get('attack_count', 0) > 0,
         }
+        if cascade_info is not None:
+            results['cascade'] = cascade_info
+        if index_id is not None:
+            results['index_id'] = index_id
         
         self._print_summary(results)
         
         if save_results:
-            if output_dir is None:
-                output_dir = Path(__file__).parent.parent / 'results'
-            output_dir = Path(output_dir)
-            output_dir.mkdir(exist_ok=True)
+            with stage('serialization'):
+                if output_dir is None:
+                    output_dir = Path(__file__).parent.parent / 'results'
+                output_dir = Path(output_dir)
+                output_dir.mkdir(exist_ok=True)
             
-            csv_path = output_dir / f"analysis_{pcap_path.stem}_{timestamp}.csv"
-            features_df.to_csv(csv_path, index=False)
-            print(f"\n[SAVED] Detailed results saved to: {csv_path}")
+                if features_df is not None:
+                    csv_path = output_dir / f"analysis_{pcap_path.stem}_{timestamp}.csv"
+                    decode_flow_table(features_df).to_csv(csv_path, index=False)
+                    print(f"\n[SAVED] Detailed results saved to: {csv_path}")
+                    results['csv_path'] = str(csv_path)
 
-            summary_path = output_dir / f"summary_{pcap_path.stem}_{timestamp}.json"
-            with open(summary_path, 'w') as f:
-                json.dump(results, f, indent=2)
-            print(f"[SAVED] Summary saved to: {summary_path}")
+                summary_path = output_dir / f"summary_{pcap_path.stem}_{timestamp}.json"
+                with open(summary_path, 'w') as f:
+                    json.dump(results, f, indent=2)
+                print(f"[SAVED] Summary saved to: {summary_path}")
             
-            results['csv_path'] = str(csv_path)
-            results['summary_path'] = str(summary_path)
+                results['summary_path'] = str(summary_path)
         
-        results['dataframe'] = features_df
+        if features_df is not None:
+            results['dataframe'] = features_df
         
         return results
     
+    def _model_attributes(self, model_key: str, nfstream_version=None) -> Optional[list]:
+        """NFStream attributes a binary model (and the pre-filter, if active) reads; None = all."""
+        predictor = self.predictor
+        if model_key == 'nfstream' and predictor.prefilter is not None and predictor.prefilter.enabled:
+            return None
+        nfstream_version = nfstream_version or predictor.nfstream_version
+        features = (predictor.feature_names_robust_binary if model_key == 'robust_binary'
+                    else nfstream_version.feature_names)
+        return list(features) if features else None
+    
+    def _retain_frame(self, features_df: pd.DataFrame, predictions: np.ndarray,
+                      confidence: Optional[np.ndarray], cascade_info: Optional[Dict],
+                      retain: str) -> Optional[pd.DataFrame]:
+        """
+        Build the results dataframe for a retention mode.
+        
+        Args:
+            features_df: Extracted flows (features and metadata)
+            predictions: Predicted label per flow
+            confidence: Max class probability per flow (if available)
+            cascade_info: Cascade details (per-flow arrays are popped from it)
+            retain: 'full', 'attacks' or 'summary'
+        
+        Returns:
+            DataFrame for results['dataframe'], or None in summary mode.
+        """
+        columns = {'Prediction': predictions}
+        if confidence is not None:
+            columns['Confidence'] = confidence
+        if cascade_info is not None:
+            columns['Screen_Prediction'] = cascade_info.pop('screen_predictions')
+            columns['Cascade_Stage'] = cascade_info.pop('stages')
+        
+        if retain == 'summary':
+            return None
+        
+        if retain == 'attacks':
+            rows = np.flatnonzero(np.asarray(predictions) != 'BENIGN')
+            metadata_cols = [c for c in METADATA_COLUMNS + TIMELINE_COLUMNS if c in features_df.columns]
+            frame = features_df.iloc[rows][metadata_cols].copy()
+            columns = {name: np.asarray(values)[rows] for name, values in columns.items()}
+        else:
+            frame = features_df
+        
+        # Compact flow table: categorical labels, float32 confidence
+        for name, values in columns.items():
+            frame[name] = compact_labels(values) if name.endswith('Prediction') else values
+        return frame
+    
+    def _cascade_models(self):
+        """Pick the cascade screen model (cheap binary) and detail model (attack typing)."""
+        predictor = self.predictor
+        screen_key = 'robust_binary' if predictor.robust_binary_model is not None else 'nfstream'
+        if predictor.model is not None:
+            detail_key = 'multiclass'
+        elif predictor.cicflowmeter_model is not None:
+            detail_key = 'cicflowmeter'
+        else:
+            detail_key = None
+        return screen_key, detail_key
+    
+    def _predict_cascade(self, features_df: pd.DataFrame, screen_key: str,
+                         detail_key: Optional[str], threshold: float, nfstream_version=None):
+        """
+        Two-stage cascade: screen every flow with a binary model, then classify
+        flagged or low-confidence flows with the multiclass/CICFlowMeter model.
+        
+        Detail features are the CICIDS2017 mapping of the escalated NFStream rows
+        only, so the expensive stage scales with suspicious traffic, not capture size.
+        
+        Args:
+            features_df: Raw NFStream features for all flows
+            screen_key: 'robust_binary' or 'nfstream'
+            detail_key: 'multiclass', 'cicflowmeter', or None (screen labels only)
+            threshold: Screen confidence below which BENIGN flows are escalated
+            nfstream_version: NFStream bundle pinned for the job (default: current)
+        
+        Returns:
+            (predictions, per-flow confidence, cascade info dict)
+        """
+        nfstream_version = nfstream_version or self.predictor.nfstream_version
+        with stage('screen'):
+            if screen_key == 'robust_binary':
+                screen_predictions, screen_proba = self.predictor.predict_robust_binary(features_df, return_proba=True)
+            else:
+                # Pinned bundle: a hot swap during the job does not mix models
+                screen_predictions, screen_proba = self.predictor.predict_nfstream(
+                    features_df, return_proba=True, model=nfstream_version
+                )
+        screen_version = (nfstream_version.version if screen_key == 'nfstream'
+                          else self.predictor.model_version(screen_key))
+        detail_version = self.predictor.model_version(detail_key) if detail_key else None
+        
+        predictions = np.asarray(screen_predictions, dtype=object).copy()
+        confidence = screen_proba.max(axis=1)
+        stages = np.ones(len(predictions), dtype=np.int8)
+        
+        flagged = predictions != 'BENIGN'
+        uncertain = ~flagged & (confidence < threshold)
+        escalated = np.flatnonzero(flagged | uncertain)
+        
+        info = {
+            'screen_model': screen_key,
+            'detail_model': detail_key,
+            'screen_version': screen_version,
+            'detail_version': detail_version,
+            # Both artifacts, so every cascade threat names the models that produced it
+            'model_version': '+'.join(v for v in (screen_version, detail_version) if v) or None,
+            'confidence_threshold': threshold,
+            'escalated': int(len(escalated)),
+            'escalated_flagged': int(flagged.sum()),
+            'escalated_low_confidence': int(uncertain.sum()),
+            'escalation_rate': round(len(escalated) / len(predictions), 4) if len(predictions) else 0.0,
+        }
+        
+        if detail_key is not None and len(escalated):
+            with stage('mapping'):
+                # Map the NFStream feature columns in float64 like the multiclass
+                # extraction path does (src_ip/dst_ip may be categorical)
+                feature_cols = [c for c in NFSTREAM_ATTRIBUTES if c in features_df.columns]
+                escalated_rows = features_df[feature_cols].iloc[escalated].reset_index(drop=True)
+                detail_df = self.extractor._map_to_cicids(escalated_rows.astype(np.float64))
+            with stage('detail'):
+                if detail_key == 'multiclass':
+                    feature_cols = [c for c in detail_df.columns if c in CICIDS2017_FEATURES]
+                    detail_predictions, detail_proba = self.predictor.predict(detail_df[feature_cols], return_proba=True)
+                else:
+                    detail_predictions, detail_proba = self.predictor.predict_cicflowmeter(detail_df, return_proba=True)
+            
+            detail_predictions = np.asarray(detail_predictions, dtype=object)
+            info['detail_cleared'] = int(np.sum(flagged[escalated] & (detail_predictions == 'BENIGN')))
+            info['detail_flagged_uncertain'] = int(np.sum(uncertain[escalated] & (detail_predictions != 'BENIGN')))
+            predictions[escalated] = detail_predictions
+            confidence[escalated] = detail_proba.max(axis=1)
+            stages[escalated] = 2
+        elif detail_key is None:
+            print("      No multiclass/CICFlowMeter model loaded - keeping screen labels")
+        
+        print(f"      Cascade: {info['escalated']:,} of {len(predictions):,} flows escalated to {detail_key or 'no detail model'}")
+        info['screen_predictions'] = np.asarray(screen_predictions)
+        info['stages'] = stages
+        return predictions, confidence, info
+    
     def _generate_summary(self, predictions: np.ndarray, batch_size: int = 5000) -> Dict:
         """Generate clean summary statistics for predictions with batch breakdown."""
         unique, counts = np.unique(predictions, return_counts=True)
@@ -242,28 +537,7 @@ class NetworkThreatAnalyzer:
     
     def _generate_batch_breakdown(self, predictions: np.ndarray, batch_size: int) -> list:
         """Generate per-batch breakdown of benign/attack flows."""
-        total = len(predictions)
-        breakdown = []
-        
-        for start_idx in range(0, total, batch_size):
-            end_idx = min(start_idx + batch_size, total)
-            batch_predictions = predictions[start_idx:end_idx]
-            
-            # Count benign and attack in this batch
-            batch_benign = int(np.sum(batch_predictions == 'BENIGN'))
-            batch_attack = len(batch_predictions) - batch_benign
-            batch_total = len(batch_predictions)
-            
-            breakdown.append({
-                'range_start': start_idx + 1,  # 1-indexed for display
-                'range_end': end_idx,
-                'total': batch_total,
-                'benign': batch_benign,
-                'attack': batch_attack,
-                'attack_percentage': round(batch_attack / batch_total * 100, 2) if batch_total > 0 else 0.0
-            })
-        
-        return breakdown
+        return batch_breakdown(np.asarray(predictions) != 'BENIGN', batch_size)
 
     
     def _print_summary(self, results: Dict):
@@ -349,6 +623,7 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python analyzer.py <pcap_file> [max_flows]")
         print("Example: python analyzer.py traffic.pcap 1000")
+        print("For many captures: python batch.py <dir|glob> -o <output_dir>")
         sys.exit(1)
     
     pcap_file = sys.argv[1]
@@ -0,0 +1,429 @@
+"""
+Batch Analysis Module
+Analyze many PCAP files in one run.
+
+    python src/batch.py captures/ -o results/batch_2024_06 --workers 4
+    python src/batch.py "captures/**/*.pcap" -o results/batch --features
+
+- Models are loaded once: in the parent before the worker pool forks (or
+  once per worker where processes are spawned)
+- Files are scheduled largest-first so long jobs start early and small ones
+  fill the gaps at the end
+- Each finished file is written as a columnar part (parts/<file_id>/*.npy)
+  and recorded in summary_index.jsonl; a re-run skips files whose part is
+  already complete and unchanged, so a failed or interrupted batch resumes
+- When all files are done the parts are merged into one columnar table
+  (table/*.npy + table/manifest.json, read back with load_table())
+"""
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .analyzer import NetworkThreatAnalyzer
+    from .flow_table import IP_COLUMNS, METADATA_COLUMNS, TIMELINE_COLUMNS, decode_ips
+    from .capture_profiles import PROFILES
+    from .traffic_policy import TrafficPolicy
+except ImportError:
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.analyzer import NetworkThreatAnalyzer
+    from src.flow_table import IP_COLUMNS, METADATA_COLUMNS, TIMELINE_COLUMNS, decode_ips
+    from src.capture_profiles import PROFILES
+    from src.traffic_policy import TrafficPolicy
+
+
+CAPTURE_EXTENSIONS = ('.pcap', '.pcapng', '.cap')
+INDEX_NAME = 'summary_index.jsonl'
+
+# Analyzer shared by the tasks of one process (set by _init_worker)
+_ANALYZER: Optional[NetworkThreatAnalyzer] = None
+
+
+def find_captures(inputs: Iterable[str]) -> List[Path]:
+    """Expand directories (non-recursive) and glob patterns into capture files."""
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(p for p in path.iterdir() if p.suffix.lower() in CAPTURE_EXTENSIONS)
+        elif any(ch in item for ch in '*?['):
+            files.extend(Path(p) for p in glob.glob(item, recursive=True) if Path(p).is_file())
+        elif path.is_file():
+            files.append(path)
+        else:
+            print(f"⚠️ No capture found at {item}")
+    unique = {str(p.resolve()): p.resolve() for p in files}
+    return list(unique.values())
+
+
+def file_id(path: Path) -> str:
+    """Stable id of a capture (by absolute path)."""
+    return hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()[:12]
+
+
+def _init_worker(models_dir: Optional[str]):
+    """Load the models once per process (no-op if inherited from the parent via fork)."""
+    global _ANALYZER
+    if _ANALYZER is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _ANALYZER = NetworkThreatAnalyzer(models_dir)
+
+
+def _write_part(frame: pd.DataFrame, part_dir: Path, extra: Dict[str, Any]):
+    """Write one file's flows as columnar .npy files (atomically)."""
+    tmp_dir = part_dir.with_name(part_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    columns = {}
+    for name in frame.columns:
+        values = frame[name]
+        entry = {'file': f"c_{len(columns):03d}.npy"}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry['categories'] = [str(c) for c in values.cat.categories]
+            array = values.cat.codes.to_numpy()
+        else:
+            array = values.to_numpy()
+        np.save(tmp_dir / entry['file'], array)
+        columns[name] = entry
+
+    with open(tmp_dir / 'part.json', 'w') as f:
+        json.dump({'rows': int(len(frame)), 'columns': columns, **extra}, f, indent=2, default=str)
+
+    shutil.rmtree(part_dir, ignore_errors=True)
+    tmp_dir.rename(part_dir)
+
+
+def _analyze_one(path: str, part_dir: str, model_type: str, max_flows: Optional[int],
+                 include_features: bool, capture_profile: str,
+                 policy_file: Optional[str]) -> Dict[str, Any]:
+    """Worker task: analyze one capture and write its part."""
+    start = time.perf_counter()
+    record = {'path': path, 'file_id': Path(part_dir).name}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = _ANALYZER.analyze_pcap(
+                path, max_flows=max_flows, save_results=False, model_type=model_type, retain='full',
+                capture_profile=capture_profile,
+                traffic_policy=TrafficPolicy.load(policy_file) if policy_file else None
+            )
+        if results['status'] == 'success':
+            frame = results.pop('dataframe')
+            if not include_features:
+                keep = [c for c in METADATA_COLUMNS + TIMELINE_COLUMNS + ['Prediction', 'Confidence']
+                        if c in frame.columns]
+                frame = frame[keep]
+            _write_part(frame, Path(part_dir), {'path': path, 'model_type': results['model_type']})
+            record.update(status='success', flows=results['total_flows'], summary=results['summary'])
+        elif results['status'] == 'no_flows':
+            _write_part(pd.DataFrame(), Path(part_dir), {'path': path})
+            record.update(status='success', flows=0, summary=None)
+        else:
+            record.update(status='failed', error=results.get('message', results['status']))
+    except Exception as e:
+        record.update(status='failed', error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def _load_index(index_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Latest summary record per capture path."""
+    records = {}
+    if index_path.exists():
+        with open(index_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # line cut short by a crash
+                records[record['path']] = record
+    return records
+
+
+def _is_done(record: Optional[Dict[str, Any]], path: Path, parts_dir: Path) -> bool:
+    if not record or record.get('status') != 'success':
+        return False
+    stat = path.stat()
+    return (record.get('size') == stat.st_size and record.get('mtime') == stat.st_mtime
+            and (parts_dir / record['file_id'] / 'part.json').exists())
+
+
+def run_batch(inputs: Iterable[str], output_dir: Union[str, Path], workers: int = None,
+              model_type: str = 'nfstream', max_flows: Optional[int] = None,
+              include_features: bool = False, models_dir: Union[str, Path] = None,
+              retry_failed: bool = True, capture_profile: str = 'forensic',
+              policy_file: Union[str, Path, None] = None) -> Dict[str, Any]:
+    """
+    Analyze every capture in `inputs` and write a consolidated table.
+
+    Args:
+        inputs: Capture files, directories or glob patterns
+        output_dir: Batch output directory (re-use it to resume)
+        workers: Worker processes (default: CPU count - 1)
+        model_type: Model passed to analyze_pcap
+        max_flows: Per-file flow limit
+        include_features: Also store every feature column in the table
+        models_dir: Models directory (default: analyzer default)
+        retry_failed: Re-run files whose last attempt failed
+        capture_profile: Capture profile name (see capture_profiles.py)
+        policy_file: Traffic policy JSON applied to every file (see traffic_policy.py)
+
+    Returns:
+        Batch summary (counts, failures, table location).
+    """
+    output_dir = Path(output_dir)
+    parts_dir = output_dir / 'parts'
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    index_path = output_dir / INDEX_NAME
+
+    if policy_file:
+        TrafficPolicy.load(policy_file)  # fail fast on an invalid policy
+        policy_file = str(Path(policy_file).resolve())
+    files = find_captures(inputs)
+    previous = _load_index(index_path)
+    pending = [
+        path for path in files
+        if not _is_done(previous.get(str(path)), path, parts_dir)
+        and (retry_failed or previous.get(str(path), {}).get('status') != 'failed')
+    ]
+    # Largest first: long jobs start early, small ones pack the tail
+    pending.sort(key=lambda path: path.stat().st_size, reverse=True)
+    print(f"📦 {len(files)} captures, {len(files) - len(pending)} already done, {len(pending)} to analyze")
+
+    workers = max(1, workers or (os.cpu_count() or 2) - 1)
+    workers = min(workers, max(1, len(pending)))
+    models_dir = str(models_dir) if models_dir else None
+    batch_start = time.perf_counter()
+    failures = []
+
+    def record_result(path: Path, record: Dict[str, Any]):
+        stat = path.stat()
+        record.update(size=stat.st_size, mtime=stat.st_mtime, finished=datetime.now().isoformat())
+        with open(index_path, 'a') as f:
+            f.write(json.dumps({k: v for k, v in record.items() if k != 'traceback'}, default=str) + '\n')
+        if record['status'] == 'success':
+            print(f"  ✅ {path.name}: {record['flows']:,} flows in {record['seconds']:.1f}s")
+        else:
+            failures.append(record)
+            print(f"  ❌ {path.name}: {record['error']}")
+
+    if pending:
+        tasks = [(str(path), str(parts_dir / file_id(path)), model_type, max_flows, include_features,
+                  capture_profile, policy_file) for path in pending]
+        if workers == 1:
+            _init_worker(models_dir)
+            for path, task in zip(pending, tasks):
+                record_result(path, _analyze_one(*task))
+        else:
+            context = multiprocessing.get_context()
+            if context.get_start_method() == 'fork':
+                # Load once in the parent; forked workers share the models copy-on-write
+                _init_worker(models_dir)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(models_dir,)) as pool:
+                futures = {pool.submit(_analyze_one, *task): path for path, task in zip(pending, tasks)}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        record = future.result()
+                    except Exception as e:  # worker crashed
+                        record = {'path': str(path), 'file_id': file_id(path), 'status': 'failed',
+                                  'error': f"{type(e).__name__}: {e}", 'seconds': 0.0}
+                    record_result(path, record)
+
+    table = None
+    if not failures:
+        table = consolidate(output_dir, files)
+    else:
+        print(f"⚠️ {len(failures)} captures failed; re-run the same command to retry them")
+
+    return {
+        'files': len(files),
+        'analyzed': len(pending) - len(failures),
+        'skipped': len(files) - len(pending),
+        'failed': [{'path': r['path'], 'error': r['error']} for r in failures],
+        'seconds': round(time.perf_counter() - batch_start, 2),
+        'table': table,
+        'index': str(index_path),
+    }
+
+
+def consolidate(output_dir: Union[str, Path], files: Optional[List[Path]] = None) -> Dict[str, Any]:
+    """
+    Merge the per-file parts into one columnar table (output_dir/table).
+
+    Args:
+        output_dir: Batch output directory
+        files: Captures to include, in table order (default: every successful record)
+
+    Returns:
+        The table manifest.
+    """
+    output_dir = Path(output_dir)
+    records = _load_index(output_dir / INDEX_NAME)
+    paths = list(records) if files is None else [str(Path(p).resolve()) for p in files]
+    # Captures without a successful part (skipped failures) are left out
+    paths = [path for path in paths if records.get(path, {}).get('status') == 'success']
+
+    parts = []
+    for path in paths:
+        record = records[path]
+        part_dir = output_dir / 'parts' / record['file_id']
+        with open(part_dir / 'part.json') as f:
+            part = json.load(f)
+        if part['rows']:
+            parts.append((path, part_dir, part))
+
+    column_names = []
+    for _, _, part in parts:
+        column_names.extend(name for name in part['columns'] if name not in column_names)
+
+    # Labels and (non-IPv4) addresses become table-wide categorical codes
+    categories: Dict[str, List[str]] = {}
+    for _, _, part in parts:
+        for name, entry in part['columns'].items():
+            if 'categories' in entry:
+                known = categories.setdefault(name, [])
+                known.extend(c for c in entry['categories'] if c not in known)
+    for name in IP_COLUMNS:
+        if name in categories:
+            # Mixed captures: store every address as a code into one list
+            known = categories[name]
+            for _, part_dir, part in parts:
+                entry = part['columns'].get(name)
+                if entry and 'categories' not in entry:
+                    values = decode_ips(pd.Series(np.load(part_dir / entry['file'])))
+                    known.extend(v for v in pd.unique(values) if v not in known)
+
+    tmp_dir = output_dir / 'table.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    def part_column(part_dir: Path, part: Dict[str, Any], name: str) -> np.ndarray:
+        entry = part['columns'].get(name)
+        if entry is None:
+            return np.full(part['rows'], -1 if name in categories else 0,
+                           dtype=np.int32 if name in categories else np.float32)
+        values = np.load(part_dir / entry['file'])
+        if name not in categories:
+            return values
+        lookup = {c: i for i, c in enumerate(categories[name])}
+        if 'categories' in entry:
+            mapping = np.array([lookup[c] for c in entry['categories']] + [-1], dtype=np.int32)
+            return mapping[values]  # code -1 (missing) maps to the trailing -1
+        decoded = decode_ips(pd.Series(values))
+        return decoded.map(lookup).to_numpy(dtype=np.int32)
+
+    columns = {}
+    for i, name in enumerate(column_names):
+        array = np.concatenate([part_column(part_dir, part, name) for _, part_dir, part in parts])
+        entry = {'file': f"c_{i:03d}.npy", 'dtype': str(array.dtype)}
+        if name in categories:
+            entry['categories'] = categories[name]
+        np.save(tmp_dir / entry['file'], array)
+        columns[name] = entry
+
+    file_index = np.concatenate(
+        [np.full(part['rows'], i, dtype=np.uint32) for i, (_, _, part) in enumerate(parts)]
+    ) if parts else np.zeros(0, dtype=np.uint32)
+    np.save(tmp_dir / 'file_index.npy', file_index)
+
+    manifest = {
+        'created': datetime.now().isoformat(),
+        'rows': int(len(file_index)),
+        'files': [path for path, _, _ in parts],
+        'columns': columns,
+    }
+    with open(tmp_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    table_dir = output_dir / 'table'
+    shutil.rmtree(table_dir, ignore_errors=True)
+    tmp_dir.rename(table_dir)
+    print(f"📊 Table: {manifest['rows']:,} flows from {len(parts)} captures → {table_dir}")
+    return {'path': str(table_dir), 'rows': manifest['rows'], 'files': len(parts)}
+
+
+def load_table(output_dir: Union[str, Path], columns: Optional[List[str]] = None,
+               decode: bool = True) -> pd.DataFrame:
+    """
+    Read the consolidated table (memory-mapped) as a DataFrame.
+
+    Args:
+        output_dir: Batch output directory
+        columns: Subset of columns to load (default: all)
+        decode: Return labels/addresses as text (otherwise categorical/packed)
+    """
+    table_dir = Path(output_dir) / 'table'
+    with open(table_dir / 'manifest.json') as f:
+        manifest = json.load(f)
+
+    data = {'pcap_file': pd.Categorical.from_codes(
+        np.load(table_dir / 'file_index.npy', mmap_mode='r'), categories=manifest['files']
+    ) if manifest['files'] else pd.Categorical([])}
+    for name, entry in manifest['columns'].items():
+        if columns is not None and name not in columns:
+            continue
+        values = np.load(table_dir / entry['file'], mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        data[name] = values
+    df = pd.DataFrame(data)
+
+    if decode:
+        for name in IP_COLUMNS:
+            if name in df.columns and df[name].dtype == np.uint32:
+                df[name] = decode_ips(df[name])
+    return df
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze many PCAP files into one columnar table")
+    parser.add_argument('inputs', nargs='+', help="Capture files, directories or glob patterns")
+    parser.add_argument('-o', '--output', required=True, help="Batch output directory (re-use to resume)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPUs - 1)")
+    parser.add_argument('--model-type', default='nfstream',
+                        choices=['nfstream', 'robust_binary', 'cicflowmeter', 'multiclass', 'cascade'])
+    parser.add_argument('--max-flows', type=int, default=None, help="Per-file flow limit")
+    parser.add_argument('--features', action='store_true', help="Store feature columns in the table")
+    parser.add_argument('--models-dir', default=None)
+    parser.add_argument('--skip-failed', action='store_true', help="Do not retry previously failed files")
+    parser.add_argument('--capture-profile', default='forensic', choices=list(PROFILES),
+                        help="Flow expiry / NFStreamer settings (bulk = fastest)")
+    parser.add_argument('--policy', default=None, help="Traffic policy JSON (excluded traffic is not scored)")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.inputs, args.output, workers=args.workers, model_type=args.model_type,
+        max_flows=args.max_flows, include_features=args.features, models_dir=args.models_dir,
+        retry_failed=not args.skip_failed, capture_profile=args.capture_profile,
+        policy_file=args.policy
+    )
+    print(json.dumps(summary, indent=2))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Broadcast Module
+Push channel from the monitoring pipeline to WebSocket / SSE subscribers.
+
+Monitoring threads publish events (new threats, stats deltas) into a bounded
+ring buffer; publishing is an append under a lock plus a wake-up for each
+subscriber, so it never waits on a client. Every subscriber reads the buffer
+through its own cursor:
+
+- a slow client only delays itself; the ring keeps moving
+- a client that falls more than `capacity` events behind skips ahead and is
+  told how many events it missed (a "lagged" event)
+- clients can resume from a sequence number (SSE Last-Event-ID / ?since=)
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .metrics import BROADCAST_SUBSCRIBERS, BROADCAST_MISSED
+except ImportError:
+    import sys
+    from pathlib import Path
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import BROADCAST_SUBSCRIBERS, BROADCAST_MISSED
+
+
+class Subscription:
+    """One client's cursor into a BroadcastBuffer."""
+
+    def __init__(self, cursor: int, loop: asyncio.AbstractEventLoop,
+                 session_id: Optional[str] = None, transport: str = 'ws'):
+        self.cursor = cursor
+        self.loop = loop
+        self.session_id = session_id
+        self.transport = transport
+        self.missed = 0
+        self.delivered = 0
+        self._wakeup = asyncio.Event()
+
+    def notify(self):
+        """Wake the subscriber's coroutine (safe to call from any thread)."""
+        try:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        return self.session_id is None or event.get('session_id') in (None, self.session_id)
+
+
+class BroadcastBuffer:
+    """
+    Bounded, sequence-numbered event ring with per-subscriber cursors.
+
+    Usage:
+        buffer = BroadcastBuffer(capacity=1000)
+        buffer.publish('threat', threat_data, session_id=...)   # any thread
+
+        subscription = buffer.subscribe(since=None)              # event loop
+        events, missed = await buffer.next_batch(subscription, timeout=15)
+        buffer.unsubscribe(subscription)
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._events: "deque[Dict[str, Any]]" = deque(maxlen=capacity)
+        self._next_seq = 1
+        self._subscribers: set = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    def publish(self, event_type: str, data: Any, session_id: Optional[str] = None) -> int:
+        """
+        Append an event and wake subscribers; never blocks on clients.
+
+        Returns:
+            The event's sequence number.
+        """
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._events.append({
+                'seq': seq,
+                'type': event_type,
+                'session_id': session_id,
+                'timestamp': time.time(),
+                'data': data,
+            })
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.notify()
+        return seq
+
+    def read(self, cursor: int, limit: int = 100) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        Events from sequence number `cursor` on.
+
+        Returns:
+            (events, next cursor, events missed because they left the ring)
+        """
+        with self._lock:
+            oldest = self._events[0]['seq'] if self._events else self._next_seq
+            missed = 0
+            if cursor < oldest:
+                missed = oldest - cursor
+                cursor = oldest
+            start = cursor - oldest
+            events = list(islice(self._events, start, start + limit))
+        return events, cursor + len(events), missed
+
+    def subscribe(self, since: Optional[int] = None, session_id: Optional[str] = None,
+                  transport: str = 'ws') -> Subscription:
+        """
+        Register a subscriber (call from the event loop that will consume it).
+
+        Args:
+            since: Last sequence number the client has seen (None = only new events)
+            session_id: Only deliver events for this monitoring session
+            transport: 'ws' or 'sse' (metrics label)
+        """
+        cursor = self.last_seq + 1 if since is None else max(1, since + 1)
+        subscription = Subscription(cursor, asyncio.get_running_loop(), session_id, transport)
+        with self._lock:
+            self._subscribers.add(subscription)
+        BROADCAST_SUBSCRIBERS.labels(transport=transport).inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.discard(subscription)
+        BROADCAST_SUBSCRIBERS.labels(transport=subscription.transport).dec()
+
+    async def next_batch(self, subscription: Subscription, timeout: float = 15.0,
+                         limit: int = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Wait for the subscriber's next events.
+
+        Returns:
+            (events for this subscriber, events it missed) - both empty/0 on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            subscription._wakeup.clear()
+            events, subscription.cursor, missed = self.read(subscription.cursor, limit)
+            if missed:
+                subscription.missed += missed
+                BROADCAST_MISSED.labels(transport=subscription.transport).inc(missed)
+            events = [event for event in events if subscription.wants(event)]
+            if events or missed:
+                subscription.delivered += len(events)
+                return events, missed
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return [], 0
+            try:
+                await asyncio.wait_for(subscription._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return [], 0
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+            return {
+                'capacity': self.capacity,
+                'buffered': len(self._events),
+                'last_seq': self.last_seq,
+                'published': self.published,
+                'subscribers': len(subscribers),
+                'lagging_subscribers': sum(1 for s in subscribers if self._next_seq - s.cursor > self.capacity // 2),
+            }
+
+
+class StatsDeltaPublisher:
+    """
+    Publishes per-session stats changes at most every `interval` seconds.
+
+    Usage:
+        publisher = StatsDeltaPublisher(buffer, interval=2.0)
+        publisher.maybe_publish(session_id, stats_dict)      # after each batch
+        publisher.maybe_publish(session_id, stats_dict, force=True)  # session end
+    """
+
+    def __init__(self, buffer: BroadcastBuffer, interval: float = 2.0):
+        self.buffer = buffer
+        self.interval = interval
+        self._last: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def maybe_publish(self, session_id: str, stats: Dict[str, Any], force: bool = False,
+                      extra: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """Publish the fields that changed since the last publish for this session."""
+        now = time.monotonic()
+        with self._lock:
+            last_time, last_stats = self._last.get(session_id, (0.0, {}))
+            if not force and now - last_time < self.interval:
+                return None
+            delta = {key: value for key, value in stats.items() if last_stats.get(key) != value}
+            if not delta and not force:
+                return None
+            self._last[session_id] = (now, dict(stats))
+        return self.buffer.publish('stats', {'stats': dict(stats), 'delta': delta, **(extra or {})},
+                                   session_id=session_id)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._last.pop(session_id, None)
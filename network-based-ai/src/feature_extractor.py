@@ -5,11 +5,29 @@ Extracts features from PCAP files using NFStream and maps them to CICIDS2017 for
 Updated to extract CICIDS2017-compatible features for the multiclass model.
 """
 
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from typing import Union, List, Optional
 
+try:
+    from .metrics import FLOWS_EXTRACTED, EXTRACTION_SECONDS
+    from .profiling import stage
+    from .flow_table import (METADATA_COLUMNS, IP_COLUMNS, TIMELINE_COLUMNS, TIMELINE_SOURCES,
+                             build_metadata_frame, compact_features)
+    from .capture_profiles import CaptureProfile, create_streamer
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import FLOWS_EXTRACTED, EXTRACTION_SECONDS
+    from src.profiling import stage
+    from src.flow_table import (METADATA_COLUMNS, IP_COLUMNS, TIMELINE_COLUMNS, TIMELINE_SOURCES,
+                                build_metadata_frame, compact_features)
+    from src.capture_profiles import CaptureProfile, create_streamer
+
 
 # CICIDS2017 Feature Names (78 features used by our model)
 CICIDS2017_FEATURES = [
@@ -54,6 +72,20 @@ NFSTREAM_ATTRIBUTES = [
 FLOW_METADATA = ['src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol']
 
 
+def _metadata_columns(include_metadata: bool) -> dict:
+    """Empty per-column lists for the flow metadata to collect (timeline columns always)."""
+    columns = (METADATA_COLUMNS if include_metadata else []) + TIMELINE_COLUMNS
+    return {col: [] for col in columns}
+
+
+def _append_metadata(flow, metadata_columns: dict):
+    """Append one flow's metadata/timeline values to the per-column lists."""
+    for col, values in metadata_columns.items():
+        default = '' if col in IP_COLUMNS else 0
+        value = getattr(flow, TIMELINE_SOURCES.get(col, col), default)
+        values.append(default if value is None else value)
+
+
 class PCAPFeatureExtractor:
     """
     Extract features from PCAP files using NFStream.
@@ -96,7 +128,8 @@ class PCAPFeatureExtractor:
     
     def extract_features(self, pcap_path: Union[str, Path],
                          max_flows: Optional[int] = None,
-                         include_metadata: bool = True) -> pd.DataFrame:
+                         include_metadata: bool = True,
+                         capture_profile: Union[str, CaptureProfile, None] = None) -> pd.DataFrame:
         """
         Extract CICIDS2017-compatible features from PCAP file.
         
@@ -104,6 +137,7 @@ class PCAPFeatureExtractor:
             pcap_path: Path to PCAP file
             max_flows: Maximum number of flows to extract
             include_metadata: Include flow metadata (IPs, ports) for display
+            capture_profile: Flow expiry / NFStreamer settings (default: 'forensic')
         
         Returns:
             DataFrame with CICIDS2017 features ready for prediction.
@@ -111,8 +145,6 @@ class PCAPFeatureExtractor:
         if not self.nfstream_available:
             raise RuntimeError("NFStream not installed. Run: pip install nfstream")
         
-        from nfstream import NFStreamer
-        
         pcap_path = Path(pcap_path)
         if not pcap_path.exists():
             raise FileNotFoundError(f"PCAP file not found: {pcap_path}")
@@ -125,16 +157,12 @@ class PCAPFeatureExtractor:
             print(f"Processing PCAP file: {pcap_path.name} ({file_size_mb:.2f} MB)")
         
         # Create NFStreamer with statistical features
-        streamer = NFStreamer(
-            source=str(pcap_path),
-            statistical_analysis=True,
-            splt_analysis=0,
-            n_dissections=0,
-        )
+        streamer = create_streamer(pcap_path, capture_profile)
         
         flows_list = []
-        metadata_list = []
+        metadata_columns = _metadata_columns(include_metadata)
         flow_count = 0
+        extraction_start = time.perf_counter()
         
         for flow in streamer:
             # Extract NFStream attributes
@@ -148,16 +176,8 @@ class PCAPFeatureExtractor:
             
             flows_list.append(flow_dict)
             
-            # Extract metadata for display
-            if include_metadata:
-                meta = {
-                    'src_ip': getattr(flow, 'src_ip', ''),
-                    'dst_ip': getattr(flow, 'dst_ip', ''),
-                    'src_port': getattr(flow, 'src_port', 0),
-                    'dst_port': getattr(flow, 'dst_port', 0),
-                    'protocol': getattr(flow, 'protocol', 0),
-                }
-                metadata_list.append(meta)
+            # Extract metadata for display (and timestamps for the timeline)
+            _append_metadata(flow, metadata_columns)
             
             flow_count += 1
             
@@ -168,6 +188,9 @@ class PCAPFeatureExtractor:
                 print(f"  Reached max_flows limit: {max_flows:,}")
                 break
         
+        FLOWS_EXTRACTED.labels(source='pcap').inc(flow_count)
+        EXTRACTION_SECONDS.labels(method='cicids_mapped').observe(time.perf_counter() - extraction_start)
+        
         if flow_count > 0:
             print(f"  SUCCESS: Extracted {flow_count:,} flows")
         
@@ -177,11 +200,14 @@ class PCAPFeatureExtractor:
         
         # Convert to DataFrame and map to CICIDS2017 features
         df_raw = pd.DataFrame(flows_list)
-        df_cicids = self._map_to_cicids(df_raw)
-        
-        # Add metadata columns if requested
-        if include_metadata and metadata_list:
-            df_meta = pd.DataFrame(metadata_list)
+        with stage('mapping'):
+            # Map in float64, then store compactly (models evaluate in float32)
+            df_cicids = compact_features(self._map_to_cicids(df_raw))
+            del df_raw
+        
+        # Add metadata (if requested) and timeline columns
+        if flow_count:
+            df_meta = build_metadata_frame(metadata_columns)
             df_cicids = pd.concat([df_meta, df_cicids], axis=1)
         
         return df_cicids
@@ -325,7 +351,9 @@ class PCAPFeatureExtractor:
     
     def extract_nfstream_features(self, pcap_path: Union[str, Path],
                                   max_flows: Optional[int] = None,
-                                  include_metadata: bool = False) -> pd.DataFrame:
+                                  include_metadata: bool = False,
+                                  attributes: Optional[List[str]] = None,
+                                  capture_profile: Union[str, CaptureProfile, None] = None) -> pd.DataFrame:
         """
         Extract raw NFStream features (legacy method for backward compatibility).
         
@@ -333,6 +361,9 @@ class PCAPFeatureExtractor:
             pcap_path: Path to PCAP file
             max_flows: Maximum number of flows to extract
             include_metadata: Include flow metadata (IPs, ports) for display
+            attributes: Only collect these NFStream attributes (default: all of
+                        NFSTREAM_ATTRIBUTES); lets callers skip unused columns
+            capture_profile: Flow expiry / NFStreamer settings (default: 'forensic')
         
         Returns:
             DataFrame with raw NFStream features.
@@ -340,26 +371,22 @@ class PCAPFeatureExtractor:
         if not self.nfstream_available:
             raise RuntimeError("NFStream not installed. Run: pip install nfstream")
         
-        from nfstream import NFStreamer
-        
         pcap_path = Path(pcap_path)
         if not pcap_path.exists():
             raise FileNotFoundError(f"PCAP file not found: {pcap_path}")
         
-        streamer = NFStreamer(
-            source=str(pcap_path),
-            statistical_analysis=True,
-            splt_analysis=0,
-            n_dissections=0,
-        )
+        streamer = create_streamer(pcap_path, capture_profile)
         
         flows_list = []
-        metadata_list = []
+        metadata_columns = _metadata_columns(include_metadata)
         flow_count = 0
+        extraction_start = time.perf_counter()
+        
+        wanted = NFSTREAM_ATTRIBUTES if attributes is None else [a for a in NFSTREAM_ATTRIBUTES if a in set(attributes)]
         
         for flow in streamer:
             flow_dict = {}
-            for attr in NFSTREAM_ATTRIBUTES:
+            for attr in wanted:
                 try:
                     value = getattr(flow, attr, 0)
                     flow_dict[attr] = 0 if value is None else value
@@ -368,16 +395,8 @@ class PCAPFeatureExtractor:
             
             flows_list.append(flow_dict)
             
-            # Extract metadata for display/threat details
-            if include_metadata:
-                meta = {
-                    'src_ip': getattr(flow, 'src_ip', ''),
-                    'dst_ip': getattr(flow, 'dst_ip', ''),
-                    'src_port': getattr(flow, 'src_port', 0),
-                    'dst_port': getattr(flow, 'dst_port', 0),
-                    'protocol': getattr(flow, 'protocol', 0),
-                }
-                metadata_list.append(meta)
+            # Extract metadata for display/threat details (and timestamps for the timeline)
+            _append_metadata(flow, metadata_columns)
             
             flow_count += 1
             
@@ -387,25 +406,32 @@ class PCAPFeatureExtractor:
             if max_flows and flow_count >= max_flows:
                 break
         
+        FLOWS_EXTRACTED.labels(source='pcap').inc(flow_count)
+        EXTRACTION_SECONDS.labels(method='nfstream').observe(time.perf_counter() - extraction_start)
+        
         if not flows_list:
-            cols = NFSTREAM_ATTRIBUTES.copy()
+            cols = list(wanted)
             if include_metadata:
-                cols = ['src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol'] + cols
+                cols = [c for c in METADATA_COLUMNS if c not in cols] + cols
             return pd.DataFrame(columns=cols)
         
         df = pd.DataFrame(flows_list)
-        df = df.replace([np.inf, -np.inf], np.nan).fillna(0)
-        
-        # Add metadata columns if requested
-        if include_metadata and metadata_list:
-            df_meta = pd.DataFrame(metadata_list)
+        del flows_list
+        df = compact_features(df.replace([np.inf, -np.inf], np.nan).fillna(0))
+        
+        # Add metadata (if requested) and timeline columns; dst_port is already a feature column
+        if flow_count:
+            df_meta = build_metadata_frame(
+                {col: values for col, values in metadata_columns.items() if col not in df.columns}
+            )
             df = pd.concat([df_meta, df], axis=1)
         
         return df
     
     def extract_cicids_full_features(self, pcap_path: Union[str, Path],
                                       max_flows: Optional[int] = None,
-                                      include_metadata: bool = True) -> pd.DataFrame:
+                                      include_metadata: bool = True,
+                                      capture_profile: Union[str, CaptureProfile, None] = None) -> pd.DataFrame:
         """
         Extract complete CICIDS2017-compatible features using CICFlowMeterPlugin.
         
@@ -416,6 +442,7 @@ class PCAPFeatureExtractor:
             pcap_path: Path to PCAP file
             max_flows: Maximum number of flows to extract
             include_metadata: Include flow metadata (IPs, ports) for display
+            capture_profile: Flow expiry / NFStreamer settings (default: 'forensic')
         
         Returns:
             DataFrame with all 78 CICIDS2017 features ready for prediction.
@@ -426,8 +453,6 @@ class PCAPFeatureExtractor:
         if self.cicflowmeter_plugin is None:
             raise RuntimeError("CICFlowMeterPlugin not loaded. Check cicflowmeter_nfstream_plugin.py")
         
-        from nfstream import NFStreamer
-        
         pcap_path = Path(pcap_path)
         if not pcap_path.exists():
             raise FileNotFoundError(f"PCAP file not found: {pcap_path}")
@@ -440,33 +465,23 @@ class PCAPFeatureExtractor:
             print(f"Processing PCAP with CICFlowMeterPlugin: {pcap_path.name} ({file_size_mb:.2f} MB)")
         
         # Create NFStreamer with CICFlowMeterPlugin
-        streamer = NFStreamer(
-            source=str(pcap_path),
-            statistical_analysis=True,
-            splt_analysis=0,
-            n_dissections=0,
+        streamer = create_streamer(
+            pcap_path, capture_profile,
             udps=self.cicflowmeter_plugin()  # Use our custom plugin
         )
         
         features_list = []
-        metadata_list = []
+        metadata_columns = _metadata_columns(include_metadata)
         flow_count = 0
+        extraction_start = time.perf_counter()
         
         for flow in streamer:
             # Extract all 78 CICIDS features using plugin
             features = self.extract_cicids_features_func(flow)
             features_list.append(features)
             
-            # Extract metadata for display
-            if include_metadata:
-                meta = {
-                    'src_ip': getattr(flow, 'src_ip', ''),
-                    'dst_ip': getattr(flow, 'dst_ip', ''),
-                    'src_port': getattr(flow, 'src_port', 0),
-                    'dst_port': getattr(flow, 'dst_port', 0),
-                    'protocol': getattr(flow, 'protocol', 0),
-                }
-                metadata_list.append(meta)
+            # Extract metadata for display (and timestamps for the timeline)
+            _append_metadata(flow, metadata_columns)
             
             flow_count += 1
             
@@ -477,6 +492,9 @@ class PCAPFeatureExtractor:
                 print(f"  Reached max_flows limit: {max_flows:,}")
                 break
         
+        FLOWS_EXTRACTED.labels(source='pcap').inc(flow_count)
+        EXTRACTION_SECONDS.labels(method='cicflowmeter').observe(time.perf_counter() - extraction_start)
+        
         if flow_count > 0:
             print(f"  SUCCESS: Extracted {flow_count:,} flows with 78 CICIDS features")
         
@@ -484,17 +502,15 @@ class PCAPFeatureExtractor:
             print("WARNING: No flows found in PCAP file")
             return pd.DataFrame(columns=CICIDS2017_FEATURES)
         
-        # Convert to DataFrame
+        # Convert to DataFrame and clean up
         df = pd.DataFrame(features_list)
+        df = compact_features(df.replace([np.inf, -np.inf], np.nan).fillna(0))
         
-        # Add metadata columns if requested
-        if include_metadata and metadata_list:
-            df_meta = pd.DataFrame(metadata_list)
+        # Add metadata (if requested) and timeline columns
+        if flow_count:
+            df_meta = build_metadata_frame(metadata_columns)
             df = pd.concat([df_meta, df], axis=1)
         
-        # Clean up
-        df = df.replace([np.inf, -np.inf], np.nan).fillna(0)
-        
         return df
 
 
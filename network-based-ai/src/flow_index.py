@@ -0,0 +1,352 @@
+"""
+Flow Index Module
+On-disk index of an analyzed PCAP's flows for drill-down queries.
+
+Each index is a directory of columnar .npy files:
+- one file per metadata column (IPs, ports, protocol, first-seen time, bytes),
+  prediction codes and confidence
+- one file per feature column (features/f_000.npy, ...)
+- for every filterable column, the row order that sorts it plus the sorted
+  values, so equality and range filters are two np.searchsorted calls
+- manifest.json with column names, label classes and the analysis summary
+
+Indexes are opened with memory-mapped arrays, so a query reads only the
+matching slices of the sorted columns and the rows it returns; NFStream and
+the models are never involved.
+"""
+
+import json
+import re
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .flow_table import IP_COLUMNS, METADATA_COLUMNS, TIMELINE_COLUMNS, LABEL_COLUMNS, encode_ips, decode_ips
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.flow_table import IP_COLUMNS, METADATA_COLUMNS, TIMELINE_COLUMNS, LABEL_COLUMNS, encode_ips, decode_ips
+
+
+# Columns with a sorted index (equality filters; first_seen_ms also ranges)
+INDEXED_COLUMNS = ['src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol', 'prediction', 'first_seen_ms']
+INDEX_ID_PATTERN = re.compile(r'^[0-9a-f]{12}$')
+MANIFEST_NAME = 'manifest.json'
+
+
+class FlowIndex:
+    """
+    Read side of one persisted flow index.
+
+    Usage:
+        index = FlowIndex(path)
+        index.query(src_ip='10.0.0.5', dst_port=22, limit=100)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+        self.total_flows = self.manifest['total_flows']
+        self.classes = self.manifest['classes']
+        self._columns: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _array(self, name: str) -> np.ndarray:
+        """Memory-mapped column (loaded lazily, then cached)."""
+        array = self._columns.get(name)
+        if array is None:
+            with self._lock:
+                array = self._columns.get(name)
+                if array is None:
+                    array = np.load(self.path / f"{name}.npy", mmap_mode='r')
+                    self._columns[name] = array
+        return array
+
+    def _encode_ip(self, column: str, value: str) -> Optional[int]:
+        """Stored representation of an IP filter value (None = not present)."""
+        categories = self.manifest['ip_categories'].get(column)
+        if categories is None:
+            encoded = encode_ips([value])
+            return int(encoded.iloc[0]) if encoded.dtype == np.uint32 else None
+        try:
+            return categories.index(value)
+        except ValueError:
+            return None
+
+    def _range_rows(self, column: str, low, high) -> np.ndarray:
+        """Rows whose column value lies in [low, high] (inclusive), via the sorted index."""
+        sorted_values = self._array(f"sorted_{column}")
+        start = np.searchsorted(sorted_values, low, side='left') if low is not None else 0
+        stop = np.searchsorted(sorted_values, high, side='right') if high is not None else len(sorted_values)
+        return np.asarray(self._array(f"order_{column}")[start:stop])
+
+    def _equal_rows(self, column: str, value) -> np.ndarray:
+        return self._range_rows(column, value, value)
+
+    def query(self, src_ip: Optional[str] = None, dst_ip: Optional[str] = None,
+              ip: Optional[str] = None, src_port: Optional[int] = None,
+              dst_port: Optional[int] = None, port: Optional[int] = None,
+              protocol: Optional[int] = None, prediction: Optional[str] = None,
+              attacks_only: bool = False, start_ms: Optional[int] = None,
+              end_ms: Optional[int] = None, limit: int = 100, offset: int = 0,
+              include_features: bool = False) -> Dict[str, Any]:
+        """
+        Filtered lookup of indexed flows (all filters are ANDed).
+
+        Args:
+            src_ip / dst_ip: Exact source / destination address
+            ip: Address on either side of the flow
+            src_port / dst_port: Exact source / destination port
+            port: Port on either side of the flow
+            protocol: IP protocol number
+            prediction: Predicted label (e.g. 'BENIGN', 'DDoS')
+            attacks_only: Only flows not predicted BENIGN
+            start_ms / end_ms: First-seen time range (epoch ms, inclusive)
+            limit / offset: Page of matching flows, in capture order
+            include_features: Also return each flow's feature values
+
+        Returns:
+            {'total_matches': int, 'flows': [...]}
+        """
+        candidates: List[np.ndarray] = []
+
+        for column, value in (('src_ip', src_ip), ('dst_ip', dst_ip)):
+            if value is not None:
+                code = self._encode_ip(column, value)
+                candidates.append(np.empty(0, dtype=np.int64) if code is None else self._equal_rows(column, code))
+        if ip is not None:
+            either = [np.empty(0, dtype=np.int64)]
+            for column in IP_COLUMNS:
+                code = self._encode_ip(column, ip)
+                if code is not None:
+                    either.append(self._equal_rows(column, code))
+            candidates.append(np.unique(np.concatenate(either)))
+        for column, value in (('src_port', src_port), ('dst_port', dst_port), ('protocol', protocol)):
+            if value is not None:
+                candidates.append(self._equal_rows(column, value))
+        if port is not None:
+            candidates.append(np.union1d(self._equal_rows('src_port', port), self._equal_rows('dst_port', port)))
+        if prediction is not None:
+            code = self.classes.index(prediction) if prediction in self.classes else None
+            candidates.append(np.empty(0, dtype=np.int64) if code is None else self._equal_rows('prediction', code))
+        if start_ms is not None or end_ms is not None:
+            candidates.append(self._range_rows('first_seen_ms', start_ms, end_ms))
+
+        if candidates:
+            # Intersect from the most selective filter up
+            candidates.sort(key=len)
+            rows = np.sort(candidates[0])
+            for other in candidates[1:]:
+                if not len(rows):
+                    break
+                rows = rows[np.isin(rows, other, assume_unique=True)]
+        else:
+            rows = np.arange(self.total_flows)
+
+        if attacks_only and 'BENIGN' in self.classes and len(rows):
+            rows = rows[self._array('prediction')[rows] != self.classes.index('BENIGN')]
+
+        page = rows[offset:offset + limit] if limit else rows[offset:]
+        return {
+            'total_matches': int(len(rows)),
+            'offset': offset,
+            'limit': limit,
+            'flows': self._records(page, include_features),
+        }
+
+    def _records(self, rows: np.ndarray, include_features: bool) -> List[Dict[str, Any]]:
+        """Decode the given rows into JSON-ready dicts."""
+        frame = {'flow_index': rows}
+        for column in self.manifest['metadata_columns']:
+            values = self._array(column)[rows]
+            categories = self.manifest['ip_categories'].get(column)
+            if categories is not None:
+                frame[column] = np.asarray(categories, dtype=object)[values]
+            elif column in IP_COLUMNS:
+                frame[column] = decode_ips(pd.Series(values)).to_numpy()
+            else:
+                frame[column] = values
+        frame['prediction'] = np.asarray(self.classes, dtype=object)[self._array('prediction')[rows]]
+        if self.manifest['has_confidence']:
+            frame['confidence'] = np.round(self._array('confidence')[rows].astype(np.float64), 4)
+        if self.manifest.get('has_screen_prediction'):
+            screen_classes = np.asarray(self.manifest['screen_classes'], dtype=object)
+            frame['screen_prediction'] = screen_classes[self._array('screen_prediction')[rows]]
+
+        df = pd.DataFrame(frame)
+        if include_features:
+            for i, name in enumerate(self.manifest['feature_columns']):
+                df[name] = self._array(f"features/f_{i:03d}")[rows]
+        return json.loads(df.to_json(orient='records'))
+
+    def info(self) -> Dict[str, Any]:
+        """Manifest without internal bookkeeping."""
+        info = {
+            key: value for key, value in self.manifest.items()
+            if key not in ('ip_categories', 'feature_columns')
+        }
+        info['feature_count'] = len(self.manifest['feature_columns'])
+        return info
+
+
+class FlowIndexStore:
+    """
+    Directory of flow indexes, one subdirectory per analyzed PCAP.
+
+    Usage:
+        store = FlowIndexStore('results/flow_index')
+        index_id = store.create(features_df, predictions, confidence, pcap_file=..., summary=...)
+        store.get(index_id).query(ip='10.0.0.5')
+    """
+
+    def __init__(self, root: Union[str, Path], max_open: int = 8):
+        self.root = Path(root)
+        self.max_open = max_open
+        self._open: "OrderedDict[str, FlowIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, index_id: str) -> Path:
+        if not INDEX_ID_PATTERN.match(index_id or ''):
+            raise KeyError(index_id)
+        return self.root / index_id
+
+    def create(self, df: pd.DataFrame, predictions, confidence: Optional[np.ndarray] = None,
+               screen_predictions=None, pcap_file: str = '', summary: Optional[Dict] = None) -> str:
+        """
+        Persist a flow frame (metadata + features) and its predictions.
+
+        Args:
+            df: Extracted flows (compact flow table with metadata columns)
+            predictions: Predicted label per flow
+            confidence: Max class probability per flow
+            screen_predictions: Cascade screen labels per flow
+            pcap_file: Source capture (recorded in the manifest)
+            summary: Analysis summary (recorded in the manifest)
+
+        Returns:
+            New index id.
+        """
+        index_id = uuid.uuid4().hex[:12]
+        path = self.root / index_id
+        tmp_path = self.root / f".{index_id}.tmp"
+        (tmp_path / 'features').mkdir(parents=True)
+
+        try:
+            metadata_columns = [c for c in METADATA_COLUMNS + TIMELINE_COLUMNS if c in df.columns]
+            ip_categories = {}
+            arrays: Dict[str, np.ndarray] = {}
+            for column in metadata_columns:
+                values = df[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    ip_categories[column] = [str(c) for c in values.cat.categories]
+                    arrays[column] = values.cat.codes.to_numpy()
+                else:
+                    arrays[column] = values.to_numpy()
+
+            labels = pd.Categorical(np.asarray(predictions).astype(str))
+            arrays['prediction'] = labels.codes.astype(np.int16)
+            if confidence is not None:
+                arrays['confidence'] = np.asarray(confidence, dtype=np.float32)
+            screen_classes = None
+            if screen_predictions is not None:
+                screen = pd.Categorical(np.asarray(screen_predictions).astype(str))
+                screen_classes = [str(c) for c in screen.categories]
+                arrays['screen_prediction'] = screen.codes.astype(np.int16)
+
+            for name, values in arrays.items():
+                np.save(tmp_path / f"{name}.npy", values)
+                if name in INDEXED_COLUMNS:
+                    order = np.argsort(values, kind='stable')
+                    np.save(tmp_path / f"order_{name}.npy", order.astype(np.int64))
+                    np.save(tmp_path / f"sorted_{name}.npy", values[order])
+
+            skip = set(metadata_columns) | set(LABEL_COLUMNS) | {'Confidence', 'Cascade_Stage'}
+            feature_columns = [c for c in df.columns
+                               if c not in skip and pd.api.types.is_numeric_dtype(df[c].dtype)]
+            for i, name in enumerate(feature_columns):
+                np.save(tmp_path / 'features' / f"f_{i:03d}.npy", df[name].to_numpy())
+
+            manifest = {
+                'index_id': index_id,
+                'pcap_file': str(pcap_file),
+                'created': datetime.now().isoformat(),
+                'total_flows': int(len(df)),
+                'metadata_columns': metadata_columns,
+                'indexed_columns': [c for c in INDEXED_COLUMNS if c in arrays],
+                'ip_categories': ip_categories,
+                'classes': [str(c) for c in labels.categories],
+                'has_confidence': confidence is not None,
+                'has_screen_prediction': screen_classes is not None,
+                'screen_classes': screen_classes,
+                'feature_columns': feature_columns,
+                'summary': summary,
+            }
+            with open(tmp_path / MANIFEST_NAME, 'w') as f:
+                json.dump(manifest, f, indent=2, default=str)
+
+            # Publish atomically so readers never see a half-written index
+            tmp_path.rename(path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        return index_id
+
+    def get(self, index_id: str) -> FlowIndex:
+        """
+        Open (or reuse) an index.
+
+        Raises:
+            KeyError: If no such index exists.
+        """
+        path = self._path(index_id)
+        with self._lock:
+            index = self._open.get(index_id)
+            if index is not None:
+                self._open.move_to_end(index_id)
+                return index
+            if not (path / MANIFEST_NAME).exists():
+                raise KeyError(index_id)
+            index = FlowIndex(path)
+            self._open[index_id] = index
+            if len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+            return index
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summary of every index, newest first."""
+        indexes = []
+        if self.root.exists():
+            for path in self.root.iterdir():
+                manifest_path = path / MANIFEST_NAME
+                if INDEX_ID_PATTERN.match(path.name) and manifest_path.exists():
+                    with open(manifest_path) as f:
+                        manifest = json.load(f)
+                    indexes.append({
+                        'index_id': manifest['index_id'],
+                        'pcap_file': manifest['pcap_file'],
+                        'created': manifest['created'],
+                        'total_flows': manifest['total_flows'],
+                    })
+        return sorted(indexes, key=lambda item: item['created'], reverse=True)
+
+    def delete(self, index_id: str) -> bool:
+        """Remove an index; returns False if it did not exist."""
+        path = self._path(index_id)
+        with self._lock:
+            self._open.pop(index_id, None)
+        if not path.exists():
+            return False
+        shutil.rmtree(path)
+        return True
@@ -0,0 +1,151 @@
+"""
+Flow Table Module
+Compact in-memory representation of extracted flows.
+
+Flow frames built by the extractor and analyzer use:
+- float32 feature columns (the forests evaluate in float32 anyway, so
+  predictions are unchanged)
+- IPv4 addresses packed into uint32 (a categorical column when a capture
+  contains IPv6 or unparsable addresses)
+- uint16 ports and uint8 protocol numbers
+- categorical prediction labels
+- int64 first-seen timestamps and byte totals (always collected, they feed
+  the time-bucket breakdown)
+
+This cuts per-flow memory several-fold on large captures compared with
+float64 features and object-dtype metadata. Use decode_flow_table() (or
+decode_ips() for single columns) wherever flows leave the process as text:
+CSV exports and API responses.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+FEATURE_DTYPE = np.float32
+IP_COLUMNS = ('src_ip', 'dst_ip')
+METADATA_DTYPES = {
+    'src_port': np.uint16,
+    'dst_port': np.uint16,
+    'protocol': np.uint8,
+    'first_seen_ms': np.int64,
+    'total_bytes': np.int64,
+}
+METADATA_COLUMNS = ['src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol']
+# Timeline columns and the NFStream attribute each one is read from
+TIMELINE_SOURCES = {
+    'first_seen_ms': 'bidirectional_first_seen_ms',
+    'total_bytes': 'bidirectional_bytes',
+}
+TIMELINE_COLUMNS = list(TIMELINE_SOURCES)
+LABEL_COLUMNS = ('Prediction', 'Screen_Prediction')
+
+
+def encode_ips(values: Iterable) -> pd.Series:
+    """
+    Pack IP address strings.
+
+    Returns a uint32 series when every value is a dotted-quad IPv4 address,
+    otherwise a categorical series (one copy of each distinct address).
+    """
+    strings = pd.Series(values, dtype=object).astype(str)
+    if len(strings) == 0:
+        return pd.Series(np.zeros(0, dtype=np.uint32))
+
+    octets = strings.str.split('.', expand=True)
+    if octets.shape[1] == 4:
+        numeric = octets.apply(pd.to_numeric, errors='coerce')
+        if not numeric.isna().any().any() and ((numeric >= 0) & (numeric <= 255)).all().all():
+            parts = numeric.to_numpy(dtype=np.uint32)
+            packed = (parts[:, 0] << 24) | (parts[:, 1] << 16) | (parts[:, 2] << 8) | parts[:, 3]
+            return pd.Series(packed, index=strings.index)
+
+    return strings.astype('category')
+
+
+def decode_ips(column: pd.Series) -> pd.Series:
+    """Convert a packed IP column (uint32 or categorical) back to strings."""
+    if column.dtype == np.uint32:
+        values = column.to_numpy()
+        octets = [((values >> shift) & 0xFF).astype(str) for shift in (24, 16, 8, 0)]
+        return pd.Series(
+            np.char.add(np.char.add(np.char.add(np.char.add(octets[0], '.'), octets[1]), '.'),
+                        np.char.add(np.char.add(octets[2], '.'), octets[3])),
+            index=column.index,
+            dtype=object,
+        )
+    return column.astype(str)
+
+
+def format_ip(value) -> str:
+    """Single packed IP value to string (for per-row code paths)."""
+    if isinstance(value, (np.integer, int)) and not isinstance(value, bool):
+        value = int(value)
+        return f"{(value >> 24) & 255}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+    return str(value)
+
+
+def build_metadata_frame(columns: Dict[str, List]) -> pd.DataFrame:
+    """
+    Build a compact metadata frame from per-column lists.
+
+    Args:
+        columns: {'src_ip': [...], 'dst_ip': [...], 'src_port': [...], ...}
+    """
+    frame = {}
+    for name, values in columns.items():
+        if name in IP_COLUMNS:
+            frame[name] = encode_ips(values).reset_index(drop=True)
+        elif name in METADATA_DTYPES:
+            frame[name] = np.asarray(values, dtype=np.int64).astype(METADATA_DTYPES[name])
+        else:
+            frame[name] = values
+    return pd.DataFrame(frame)
+
+
+def compact_features(df: pd.DataFrame, exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Downcast numeric feature columns to float32 and port/protocol columns to small ints.
+
+    Args:
+        df: Flow frame
+        exclude: Columns to leave untouched (e.g. metadata)
+    """
+    skip = set(exclude) | set(IP_COLUMNS) | set(LABEL_COLUMNS)
+    cast = {}
+    for col, dtype in df.dtypes.items():
+        if col in skip or not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            continue
+        # Ports/protocol that double as model features (and timestamps) keep their int type
+        target = METADATA_DTYPES.get(col, FEATURE_DTYPE)
+        if dtype != target:
+            cast[col] = target
+    if not cast:
+        return df
+    return df.astype(cast, copy=False)
+
+
+def compact_labels(labels) -> pd.Categorical:
+    """Prediction labels as a categorical (one copy of each class name)."""
+    return pd.Categorical(np.asarray(labels).astype(str))
+
+
+def decode_flow_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of a flow frame with IPs as strings and labels as plain text (for export)."""
+    out = df.copy()
+    for col in IP_COLUMNS:
+        if col in out.columns:
+            out[col] = decode_ips(out[col])
+    for col in LABEL_COLUMNS:
+        if col in out.columns and isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(str)
+    return out
+
+
+def memory_mb(df: Optional[pd.DataFrame]) -> float:
+    """Deep memory footprint of a frame in MB."""
+    if df is None:
+        return 0.0
+    return round(df.memory_usage(deep=True).sum() / 1024**2, 3)
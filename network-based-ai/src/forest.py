@@ -0,0 +1,183 @@
+"""
+Early-Exit Forest Module
+Block-wise Random Forest evaluation that stops per row once the remaining
+trees can no longer change the decision.
+
+A forest's prediction is the argmax of the mean of its trees' class
+probabilities. After k of T trees, each remaining tree can add at most 1 to
+any single class total, so if the leading class is ahead of every other class
+by more than T - k the outcome is fixed ("exact" exit, identical predictions
+to the full forest). Optionally, rows also stop once a Hoeffding-Serfling
+bound says the leader is ahead with probability at least 1 - delta
+("bounded" exit, faster but no longer guaranteed identical).
+
+Rows that run through every tree get exactly the forest's probabilities;
+rows that exit early report the mean over the trees evaluated.
+"""
+
+import math
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .metrics import EARLY_EXIT_TREE_FRACTION
+except ImportError:
+    import sys
+    from pathlib import Path
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import EARLY_EXIT_TREE_FRACTION
+
+
+def supports_early_exit(model) -> bool:
+    """Whether a fitted model is a single-output tree ensemble we can evaluate tree by tree."""
+    estimators = getattr(model, 'estimators_', None)
+    return (
+        estimators is not None
+        and len(estimators) > 1
+        and getattr(model, 'n_outputs_', 1) == 1
+        and all(hasattr(tree, 'predict_proba') for tree in estimators[:1])
+        and hasattr(model, 'classes_')
+    )
+
+
+class EarlyExitForest:
+    """
+    Wraps a fitted RandomForestClassifier for early-exit inference.
+
+    Usage:
+        forest = EarlyExitForest(model, block_size=8)            # exact
+        forest = EarlyExitForest(model, block_size=8, delta=0.01)  # bounded
+        predictions, probabilities = forest.predict(X, return_proba=True)
+        forest.stats()
+    """
+
+    def __init__(self, model, block_size: int = 8, delta: Optional[float] = None,
+                 min_trees: int = 0, model_key: str = 'forest'):
+        """
+        Initialize the wrapper.
+
+        Args:
+            model: Fitted scikit-learn forest classifier
+            block_size: Trees evaluated between exit checks
+            delta: Allowed probability of a decision differing from the full forest
+                   (None = exact exit only)
+            min_trees: Trees always evaluated before any exit check
+            model_key: Model name used as the metrics label
+        """
+        if not supports_early_exit(model):
+            raise ValueError("Early exit requires a fitted single-output tree ensemble")
+        self.model = model
+        self.trees = list(model.estimators_)
+        self.classes_ = model.classes_
+        self.block_size = max(1, block_size)
+        self.delta = delta
+        self.min_trees = min_trees
+        self.model_key = model_key
+
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.trees_evaluated = 0
+        self.exact_exits = 0
+        self.bounded_exits = 0
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.trees)
+
+    def _bound(self, k: int) -> float:
+        """Hoeffding-Serfling deviation of a k-of-T sample mean (per-tree values in [0, 1])."""
+        T = self.n_trees
+        if self.delta is None or k >= T:
+            return 0.0
+        return math.sqrt((1 - (k - 1) / T) * math.log(2 / self.delta) / (2 * k))
+
+    def predict_proba(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Early-exit class probabilities.
+
+        Args:
+            X: Feature matrix in the model's training column order
+
+        Returns:
+            (probabilities, trees evaluated per row)
+        """
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+        n_rows, T = len(X), self.n_trees
+        totals = np.zeros((n_rows, len(self.classes_)), dtype=np.float64)
+        trees_used = np.full(n_rows, T, dtype=np.int32)
+        active = np.arange(n_rows)
+        exact_exits = bounded_exits = 0
+        evaluated = 0
+
+        k = 0
+        while k < T and len(active):
+            block = self.trees[k:k + self.block_size]
+            X_active = X[active]
+            block_totals = totals[active]
+            for tree in block:
+                # Same per-tree accumulation as RandomForestClassifier.predict_proba
+                block_totals += tree.predict_proba(X_active, check_input=False)
+            totals[active] = block_totals
+            evaluated += len(active) * len(block)
+            k += len(block)
+
+            if k >= T or k < self.min_trees:
+                continue
+
+            # Leader vs runner-up on the running totals
+            if block_totals.shape[1] > 1:
+                top2 = np.partition(block_totals, -2, axis=1)[:, -2:]
+                gap = top2[:, 1] - top2[:, 0]
+            else:
+                gap = np.full(len(active), np.inf)
+
+            # Exact: remaining T - k trees cannot close the gap (strict, so ties never exit)
+            done_exact = gap > (T - k) + 1e-9
+            done = done_exact
+            if self.delta is not None:
+                done_bounded = ~done_exact & (gap / k > 2 * self._bound(k))
+                done = done | done_bounded
+                bounded_exits += int(done_bounded.sum())
+            exact_exits += int(done_exact.sum())
+
+            if done.any():
+                trees_used[active[done]] = k
+                active = active[~done]
+
+        probabilities = totals / trees_used[:, None]
+
+        with self._lock:
+            self.rows += n_rows
+            self.trees_evaluated += evaluated
+            self.exact_exits += exact_exits
+            self.bounded_exits += bounded_exits
+        if n_rows:
+            EARLY_EXIT_TREE_FRACTION.labels(model=self.model_key).observe(evaluated / (n_rows * T))
+        return probabilities, trees_used
+
+    def predict(self, X, return_proba: bool = False):
+        """Early-exit class labels (and probabilities if requested)."""
+        probabilities, _ = self.predict_proba(X)
+        predictions = self.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+        if return_proba:
+            return predictions, probabilities
+        return predictions
+
+    def stats(self) -> Dict[str, Any]:
+        """Fraction of trees evaluated and exit counts since creation."""
+        with self._lock:
+            possible = self.rows * self.n_trees
+            return {
+                'mode': 'exact' if self.delta is None else 'bounded',
+                'delta': self.delta,
+                'block_size': self.block_size,
+                'n_trees': self.n_trees,
+                'rows': self.rows,
+                'tree_fraction': round(self.trees_evaluated / possible, 4) if possible else None,
+                'exact_exits': self.exact_exits,
+                'bounded_exits': self.bounded_exits,
+            }
@@ -0,0 +1,182 @@
+"""
+Network Interfaces Module
+Discovery of capture interfaces, cached with a TTL.
+
+On Windows, adapters are enumerated from the registry and each one is probed
+by opening an NFStreamer on its NPF device - slow, so probes run concurrently
+and any adapter whose probe does not finish within `probe_timeout` is left
+out. Elsewhere psutil lists interfaces with an IPv4 address.
+
+InterfaceCache serves the last discovered list and refreshes it on a
+background thread once it is older than `ttl`, so capture start and the
+interfaces endpoint never wait on discovery after the first run.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+
+WINDOWS_ADAPTERS_KEY = r"SYSTEM\CurrentControlSet\Control\Network\{4D36E972-E325-11CE-BFC1-08002BE10318}"
+
+
+def _windows_adapters() -> List[Dict[str, str]]:
+    """NPF device names and connection names from the registry (raises ImportError off Windows)."""
+    import winreg
+
+    adapters = []
+    reg_key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, WINDOWS_ADAPTERS_KEY)
+    try:
+        i = 0
+        while True:
+            try:
+                guid = winreg.EnumKey(reg_key, i)
+            except OSError:
+                break
+            i += 1
+            try:
+                conn_key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, f"{WINDOWS_ADAPTERS_KEY}\\{guid}\\Connection")
+                name = winreg.QueryValueEx(conn_key, "Name")[0]
+                winreg.CloseKey(conn_key)
+            except OSError:
+                continue
+            adapters.append({'name': f"\\Device\\NPF_{guid}", 'display': name})
+    finally:
+        winreg.CloseKey(reg_key)
+    return adapters
+
+
+def _probe(device: str) -> bool:
+    """Whether NFStream can open the device."""
+    from nfstream import NFStreamer
+    try:
+        streamer = NFStreamer(source=device, statistical_analysis=True)
+        del streamer
+        return True
+    except Exception:
+        return False
+
+
+def _psutil_interfaces() -> List[Dict[str, str]]:
+    import psutil
+    return [
+        {'name': iface_name, 'display': iface_name}
+        for iface_name, addrs in psutil.net_if_addrs().items()
+        if any(addr.family == 2 for addr in addrs)
+    ]
+
+
+def discover_interfaces(probe_timeout: float = 3.0, max_workers: int = 8) -> List[Dict[str, str]]:
+    """
+    Find capture interfaces.
+
+    Args:
+        probe_timeout: Seconds to wait for all Windows adapter probes together
+        max_workers: Concurrent probes
+
+    Returns:
+        [{'name': device, 'display': human-readable name}, ...]
+    """
+    try:
+        adapters = _windows_adapters()
+    except ImportError:
+        try:
+            return _psutil_interfaces()
+        except Exception as e:
+            print(f"Error getting interfaces: {e}")
+            return []
+    except Exception as e:
+        print(f"Error getting interfaces: {e}")
+        return []
+
+    if not adapters:
+        return []
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(adapters)), thread_name_prefix="iface-probe")
+    futures = {pool.submit(_probe, adapter['name']): adapter for adapter in adapters}
+    done, pending = wait(futures, timeout=probe_timeout)
+    # Hung probes are abandoned, not joined
+    pool.shutdown(wait=False, cancel_futures=True)
+    if pending:
+        print(f"⚠️ {len(pending)} interface probe(s) timed out after {probe_timeout}s")
+    return [futures[future] for future in futures if future in done and not future.exception() and future.result()]
+
+
+class InterfaceCache:
+    """
+    TTL cache over interface discovery with background refresh.
+
+    Usage:
+        cache = InterfaceCache(ttl=60)
+        cache.refresh()          # warm up in the background
+        cache.get()              # cached list; a stale one triggers a refresh
+        cache.get(refresh=True)  # rediscover now
+    """
+
+    def __init__(self, ttl: float = 60.0, discover: Optional[Callable[[], List[Dict[str, str]]]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds before the cached list is refreshed
+            discover: Discovery function (default: discover_interfaces)
+        """
+        self.ttl = ttl
+        self.discover = discover or discover_interfaces
+        self._interfaces: Optional[List[Dict[str, str]]] = None
+        self._updated = 0.0
+        self._duration = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[threading.Thread] = None
+
+    def _run_discovery(self):
+        start = time.perf_counter()
+        try:
+            interfaces = self.discover()
+        except Exception as e:
+            print(f"❌ Interface discovery failed: {e}")
+            interfaces = None
+        with self._lock:
+            if interfaces is not None:
+                self._interfaces = interfaces
+                self._updated = time.monotonic()
+                self._duration = time.perf_counter() - start
+            self._refreshing = None
+
+    def refresh(self, wait: bool = False):
+        """Start a refresh unless one is running; optionally wait for it."""
+        with self._lock:
+            thread = self._refreshing
+            if thread is None:
+                thread = threading.Thread(target=self._run_discovery, name="iface-refresh", daemon=True)
+                self._refreshing = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def get(self, refresh: bool = False) -> List[Dict[str, str]]:
+        """
+        Current interface list.
+
+        Args:
+            refresh: Rediscover before returning
+
+        Returns:
+            Cached list; blocks only on the first call or when refresh=True
+        """
+        if refresh or self._interfaces is None:
+            self.refresh(wait=True)
+        elif time.monotonic() - self._updated > self.ttl:
+            self.refresh()
+        return list(self._interfaces or [])
+
+    def info(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'cached': self._interfaces is not None,
+                'count': len(self._interfaces or []),
+                'age_seconds': round(time.monotonic() - self._updated, 1) if self._interfaces is not None else None,
+                'ttl_seconds': self.ttl,
+                'last_discovery_seconds': round(self._duration, 3),
+                'refreshing': self._refreshing is not None,
+            }
@@ -0,0 +1,501 @@
+"""
+Metrics Module
+Lightweight Prometheus-style metrics for the detection pipeline.
+
+Counters, gauges, histograms and summaries are kept in a process-wide registry
+and rendered in the Prometheus text exposition format by the /metrics endpoint.
+Every update is a lock plus a few float operations, so instrumentation can stay
+enabled in production on the extraction, inference and webhook hot paths.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Default buckets (seconds) for latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets for long-running jobs such as PCAP analysis (seconds)
+JOB_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# Buckets for batch / row counts
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the text exposition format."""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    """Format a label set as {name="value",...}."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """Base class for a metric family with optional labels."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *values, **kwargs) -> "_Metric":
+        """Get (or create) the child metric for a label set."""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        """Return (suffix, extra_labels, value) samples for this (child) metric."""
+        raise NotImplementedError
+
+    def _iter_children(self):
+        if self.labelnames:
+            with self._lock:
+                items = list(self._children.items())
+            return items
+        return [((), self)]
+
+    def render(self) -> str:
+        """Render this metric family in Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for label_values, child in self._iter_children():
+            for suffix, extra, value in child._samples():
+                labels = _format_labels(self.labelnames, label_values, extra)
+                lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        """Increment the counter."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self):
+        return [("_total", (), self._value)]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed on scrape."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float):
+        """Set the gauge value."""
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the gauge value lazily at scrape time."""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+    def _samples(self):
+        return [("", (), self.value)]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        """Record one observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        """Context manager observing the elapsed wall time in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the buckets."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return math.nan
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for i, upper in enumerate(self.buckets):
+            if cumulative + counts[i] >= rank:
+                if counts[i] == 0:
+                    return upper
+                return lower + (upper - lower) * (rank - cumulative) / counts[i]
+            cumulative += counts[i]
+            lower = upper
+        return self.buckets[-1]
+
+    def _samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total = self._count
+        samples = []
+        cumulative = 0
+        for upper, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append(("_bucket", (("le", _format_value(float(upper))),), cumulative))
+        samples.append(("_bucket", (("le", "+Inf"),), total))
+        samples.append(("_sum", (), total_sum))
+        samples.append(("_count", (), total))
+        return samples
+
+
+class Summary(_Metric):
+    """
+    Summary with quantiles over a sliding window of recent observations.
+
+    Quantiles are computed at scrape time from the last `window` observations,
+    so updates stay O(1).
+    """
+
+    metric_type = "summary"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 quantiles: Sequence[float] = (0.5, 0.9, 0.99), window: int = 2048):
+        super().__init__(name, documentation, labelnames)
+        self.quantiles = tuple(quantiles)
+        self.window = window
+        self._recent = deque(maxlen=window)
+        self._sum = 0.0
+        self._count = 0
+
+    def _new_child(self) -> "Summary":
+        return Summary(self.name, self.documentation, quantiles=self.quantiles, window=self.window)
+
+    def observe(self, value: float):
+        """Record one observation."""
+        with self._lock:
+            self._recent.append(value)
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        """Context manager observing the elapsed wall time in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, q: float) -> float:
+        """Quantile over the recent observation window."""
+        with self._lock:
+            recent = sorted(self._recent)
+        if not recent:
+            return math.nan
+        index = min(len(recent) - 1, max(0, int(math.ceil(q * len(recent))) - 1))
+        return recent[index]
+
+    def _samples(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            total_sum = self._sum
+            total = self._count
+        samples = []
+        for q in self.quantiles:
+            if recent:
+                index = min(len(recent) - 1, max(0, int(math.ceil(q * len(recent))) - 1))
+                value = recent[index]
+            else:
+                value = math.nan
+            samples.append(("", (("quantile", _format_value(q)),), value))
+        samples.append(("_sum", (), total_sum))
+        samples.append(("_count", (), total))
+        return samples
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def summary(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> Summary:
+        return self.register(Summary(name, documentation, labelnames, quantiles))
+
+    def render(self) -> str:
+        """Render all registered metrics in Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# ============================================================================
+# Process-wide registry and pipeline metrics
+# ============================================================================
+
+REGISTRY = MetricsRegistry()
+
+FLOWS_EXTRACTED = REGISTRY.counter(
+    "network_ai_flows_extracted",
+    "Flows extracted from NFStream",
+    ["source"],
+)
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "network_ai_extraction_seconds",
+    "Wall time of a feature extraction pass over a capture",
+    ["method"],
+    buckets=JOB_BUCKETS,
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "network_ai_batch_size_flows",
+    "Number of flows per inference batch",
+    ["model"],
+    buckets=SIZE_BUCKETS,
+)
+INFERENCE_SECONDS = REGISTRY.summary(
+    "network_ai_inference_seconds",
+    "Model inference latency per batch",
+    ["model"],
+)
+INFERENCE_ROWS = REGISTRY.counter(
+    "network_ai_inference_rows",
+    "Rows scored by each model",
+    ["model"],
+)
+ALIGNMENT_SECONDS = REGISTRY.histogram(
+    "network_ai_feature_alignment_seconds",
+    "Time spent aligning feature frames to the model feature order",
+    ["model"],
+)
+WEBHOOK_SECONDS = REGISTRY.histogram(
+    "network_ai_webhook_seconds",
+    "Latency of webhook deliveries to the Node.js backend",
+)
+WEBHOOK_FAILURES = REGISTRY.counter(
+    "network_ai_webhook_failures",
+    "Webhook deliveries that errored or returned a non-200 status",
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "network_ai_queue_depth",
+    "Items waiting in pipeline queues",
+    ["queue"],
+)
+THREAT_STORE_SIZE = REGISTRY.gauge(
+    "network_ai_threat_store_size",
+    "Threats currently held in memory",
+)
+PCAP_JOB_SECONDS = REGISTRY.histogram(
+    "network_ai_pcap_job_seconds",
+    "End-to-end duration of PCAP analysis jobs",
+    ["endpoint", "status"],
+    buckets=JOB_BUCKETS,
+)
+
+FLOWS_SHED = REGISTRY.counter(
+    "network_ai_flows_shed",
+    "Live flows not classified because of overload (by reason)",
+    ["reason"],
+)
+OVERLOAD_TRANSITIONS = REGISTRY.counter(
+    "network_ai_overload_transitions",
+    "Live monitoring overload mode changes (by new mode)",
+    ["mode"],
+)
+
+PREFILTER_FLOWS = REGISTRY.counter(
+    "network_ai_prefilter_flows",
+    "Flows resolved by each pre-filter stage ('model' = sent to the full model)",
+    ["stage"],
+)
+
+EARLY_EXIT_TREE_FRACTION = REGISTRY.histogram(
+    "network_ai_early_exit_tree_fraction",
+    "Fraction of forest trees evaluated per batch in early-exit mode",
+    ["model"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+
+
+BROADCAST_SUBSCRIBERS = REGISTRY.gauge(
+    "network_ai_broadcast_subscribers",
+    "Connected live threat stream subscribers (by transport)",
+    ["transport"],
+)
+BROADCAST_MISSED = REGISTRY.counter(
+    "network_ai_broadcast_missed_events",
+    "Events skipped by stream subscribers that fell behind the broadcast buffer",
+    ["transport"],
+)
+
+POLICY_EXCLUDED_FLOWS = REGISTRY.counter(
+    "network_ai_policy_excluded_flows",
+    "Flows excluded from scoring by flow-stage traffic policy rules",
+    ["rule", "source"],
+)
+POLICY_EXCLUDED_BYTES = REGISTRY.counter(
+    "network_ai_policy_excluded_bytes",
+    "Bytes of flows excluded from scoring by flow-stage traffic policy rules",
+    ["rule", "source"],
+)
+
+THREAT_INTEL_MATCHES = REGISTRY.counter(
+    "network_ai_threat_intel_matches",
+    "Threat intel list matches on detected threats",
+    ["list", "source"],
+)
+THREAT_INTEL_RELOADS = REGISTRY.counter(
+    "network_ai_threat_intel_reloads",
+    "Threat intel list reloads",
+    ["status"],
+)
+
+THREAT_ALERTS = REGISTRY.counter(
+    "network_ai_threat_alerts",
+    "Live threats sent to or held back from the webhook by the alert thresholds",
+    ["severity", "decision"],
+)
+
+SHADOW_BATCHES = REGISTRY.counter(
+    "network_ai_shadow_batches",
+    "Live batches offered to the shadow model (scored, sampled_out, dropped, failed)",
+    ["outcome"],
+)
+SHADOW_FLOWS = REGISTRY.counter(
+    "network_ai_shadow_flows",
+    "Flows scored by the shadow model, by attack/benign agreement with production",
+    ["result"],
+)
+SHADOW_INFERENCE_SECONDS = REGISTRY.histogram(
+    "network_ai_shadow_inference_seconds",
+    "Shadow model inference time per batch",
+)
+
+
+def render_metrics() -> str:
+    """Render the process-wide registry."""
+    return REGISTRY.render()
@@ -0,0 +1,161 @@
+"""
+Model Telemetry Module
+Operational statistics of each loaded model, measured on live traffic.
+
+Every inference call records, per model and artifact version:
+- calls, rows scored and a latency histogram
+- predicted class distribution
+- mean confidence (max class probability) and a confidence histogram
+
+Updates are a few vectorized numpy reductions per call under a per-model
+lock, so they stay on for every batch. The Prometheus metrics in metrics.py
+cover latency for dashboards; this module keeps the per-version breakdown
+that /api/model-stats reports, so a hot-swapped model starts from zero
+instead of inheriting its predecessor's numbers.
+"""
+
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .metrics import LATENCY_BUCKETS
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import LATENCY_BUCKETS
+
+
+# Confidence histogram bins: [0.0, 0.1), ..., [0.9, 1.0]
+CONFIDENCE_BINS = 10
+
+
+class _ModelCounters:
+    """Counters of one (model, version)."""
+
+    def __init__(self, model_key: str, version: Optional[str]):
+        self.model_key = model_key
+        self.version = version
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.latency_counts = np.zeros(len(LATENCY_BUCKETS) + 1, dtype=np.int64)  # last = +Inf
+        self.class_counts: Dict[str, int] = {}
+        self.confidence_sum = 0.0
+        self.confidence_rows = 0
+        self.confidence_counts = np.zeros(CONFIDENCE_BINS, dtype=np.int64)
+        self.first_call: Optional[float] = None
+        self.last_call: Optional[float] = None
+
+    def record(self, predictions, probabilities: Optional[np.ndarray], seconds: float):
+        classes, counts = np.unique(np.asarray(predictions).astype(str), return_counts=True)
+        confidence = None
+        if probabilities is not None and len(probabilities):
+            confidence = np.asarray(probabilities).max(axis=1)
+            bins = np.bincount(np.minimum((confidence * CONFIDENCE_BINS).astype(np.int64), CONFIDENCE_BINS - 1),
+                               minlength=CONFIDENCE_BINS)
+        bucket = int(np.searchsorted(LATENCY_BUCKETS, seconds, side='left'))
+        now = time.time()
+
+        with self.lock:
+            self.calls += 1
+            self.rows += len(predictions)
+            self.seconds += seconds
+            self.latency_counts[bucket] += 1
+            for label, count in zip(classes.tolist(), counts.tolist()):
+                self.class_counts[label] = self.class_counts.get(label, 0) + count
+            if confidence is not None:
+                self.confidence_sum += float(confidence.sum())
+                self.confidence_rows += len(confidence)
+                self.confidence_counts += bins
+            if self.first_call is None:
+                self.first_call = now
+            self.last_call = now
+
+    @staticmethod
+    def _percentile(counts: np.ndarray, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-th latency percentile."""
+        total = counts.sum()
+        if total == 0:
+            return None
+        index = int(np.searchsorted(np.cumsum(counts), q * total, side='left'))
+        return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            latency_counts = self.latency_counts.copy()
+            confidence_counts = self.confidence_counts.copy()
+            rows = self.rows
+            snapshot = {
+                'version': self.version,
+                'calls': self.calls,
+                'rows': rows,
+                'inference_seconds': round(self.seconds, 4),
+                'class_distribution': {
+                    label: {'count': count, 'share': round(count / rows, 4) if rows else 0.0}
+                    for label, count in sorted(self.class_counts.items())
+                },
+                'mean_confidence': (round(self.confidence_sum / self.confidence_rows, 4)
+                                    if self.confidence_rows else None),
+                'first_call': datetime.fromtimestamp(self.first_call).isoformat() if self.first_call else None,
+                'last_call': datetime.fromtimestamp(self.last_call).isoformat() if self.last_call else None,
+            }
+        bounds = [str(b) for b in LATENCY_BUCKETS] + ['+Inf']
+        snapshot['latency'] = {
+            'mean_ms': round(snapshot['inference_seconds'] / snapshot['calls'] * 1000, 3) if snapshot['calls'] else None,
+            'p50_le_seconds': self._percentile(latency_counts, 0.5),
+            'p95_le_seconds': self._percentile(latency_counts, 0.95),
+            'buckets': {le: int(count) for le, count in zip(bounds, latency_counts) if count},
+        }
+        snapshot['confidence_histogram'] = {
+            f"{i / CONFIDENCE_BINS:.1f}-{(i + 1) / CONFIDENCE_BINS:.1f}": int(count)
+            for i, count in enumerate(confidence_counts)
+        }
+        return snapshot
+
+
+class ModelTelemetry:
+    """
+    Per-model, per-version inference telemetry.
+
+    Usage:
+        telemetry = ModelTelemetry()
+        telemetry.record('nfstream', 'a1b2c3d4e5f6', predictions, probabilities, seconds)
+        telemetry.snapshot('nfstream')     # {version: counters}
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Optional[str]], _ModelCounters] = {}
+
+    def record(self, model_key: str, version: Optional[str], predictions: Sequence,
+               probabilities: Optional[np.ndarray], seconds: float):
+        """
+        Record one inference call.
+
+        Args:
+            model_key: Model name ('nfstream', 'robust_binary', ...)
+            version: Artifact version (hash) of the model that ran
+            predictions: Predicted label per row
+            probabilities: predict_proba rows (None if not computed)
+            seconds: Inference time
+        """
+        key = (model_key, version)
+        counters = self._counters.get(key)
+        if counters is None:
+            with self._lock:
+                counters = self._counters.setdefault(key, _ModelCounters(model_key, version))
+        counters.record(predictions, probabilities, seconds)
+
+    def snapshot(self, model_key: str) -> Dict[str, Dict[str, Any]]:
+        """Counters of every version of a model that has scored rows, by version."""
+        with self._lock:
+            counters = [c for (key, _), c in self._counters.items() if key == model_key]
+        return {str(c.version): c.snapshot() for c in counters}
@@ -0,0 +1,256 @@
+"""
+Model Versions Module
+Loading, validation and warm-up of model artifacts for hot swapping.
+
+A ModelVersion bundles a fitted model with the feature and class names it
+was trained with, and is never modified after loading. The predictor holds
+one reference per model slot and replaces it with a single assignment, so a
+caller that takes the reference once (see NetworkThreatPredictor.nfstream_version)
+scores a whole batch with one consistent model, features and classes even if
+a swap happens meanwhile.
+
+A candidate is only swapped in after:
+- validation: it has predict_proba/classes_, its feature and class name files
+  match the fitted estimator, it predicts BENIGN, and every feature it needs
+  is produced by the NFStream extractor
+- warm-up: a synthetic batch runs through predict_proba and must return one
+  finite probability row per flow summing to 1
+
+The version string is a prefix of the artifact's SHA-256, so the same file
+always reports the same version and a retrained model a new one.
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+
+WARMUP_ROWS = 256
+
+
+class ModelValidationError(ValueError):
+    """A candidate model failed validation or warm-up."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """A loaded model with its metadata (immutable)."""
+    key: str
+    model: Any
+    feature_names: Optional[List[str]]
+    class_names: Optional[List[str]]
+    version: str
+    artifact: str
+    loaded_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    warmup_seconds: Optional[float] = None
+
+    @property
+    def classes(self) -> List[str]:
+        """Class labels in predict_proba column order."""
+        return [str(c) for c in self.model.classes_]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'version': self.version,
+            'artifact': Path(self.artifact).name,
+            'estimator': type(self.model).__name__,
+            'features': len(self.feature_names) if self.feature_names else None,
+            'classes': self.classes if hasattr(self.model, 'classes_') else self.class_names,
+            'loaded_at': self.loaded_at,
+            'warmup_seconds': self.warmup_seconds,
+        }
+
+
+def artifact_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Short SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def artifact_paths(models_dir: Path, name: str) -> Tuple[Path, Path, Path]:
+    """Model, feature names and class names files of a model (random_forest_<name>.joblib, ...)."""
+    models_dir = Path(models_dir)
+    return (models_dir / f'random_forest_{name}.joblib',
+            models_dir / f'feature_names_{name}.joblib',
+            models_dir / f'class_names_{name}.joblib')
+
+
+def _info_value(text: str) -> Any:
+    """Number if the value is numeric ('0.7710', '77.10%'), otherwise the text."""
+    try:
+        if text.endswith('%'):
+            return round(float(text[:-1]) / 100, 6)
+        return float(text)
+    except ValueError:
+        return text
+
+
+def read_model_info(model_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Offline metadata written next to a model by the training scripts.
+
+    Reads `<stem>_info.txt` ("Key: value" lines, e.g. "Accuracy: 0.7710") and
+    `<stem>_metadata.json`, keys lower-cased with underscores.
+
+    Args:
+        model_path: joblib model file
+
+    Returns:
+        Metadata dict, or None if neither file exists
+    """
+    model_path = Path(model_path)
+    info: Dict[str, Any] = {}
+    found = False
+    text_path = model_path.with_name(f'{model_path.stem}_info.txt')
+    if text_path.exists():
+        found = True
+        for line in text_path.read_text(encoding='utf-8', errors='replace').splitlines():
+            key, sep, value = line.partition(':')
+            if sep and key.strip():
+                info[key.strip().lower().replace(' ', '_')] = _info_value(value.strip())
+    json_path = model_path.with_name(f'{model_path.stem}_metadata.json')
+    if json_path.exists():
+        found = True
+        try:
+            metadata = json.loads(json_path.read_text(encoding='utf-8'))
+        except ValueError as e:
+            metadata = {'error': f"invalid metadata file: {e}"}
+        if isinstance(metadata, dict):
+            info.update({str(k).lower().replace(' ', '_'): v for k, v in metadata.items()})
+    return info if found else None
+
+
+def load_model_version(key: str, model_path: Path, features_path: Optional[Path] = None,
+                       class_names_path: Optional[Path] = None) -> ModelVersion:
+    """
+    Load a model artifact and its metadata files.
+
+    Args:
+        key: Model slot name (e.g. 'nfstream')
+        model_path: joblib model file
+        features_path: joblib list of training feature names (optional)
+        class_names_path: joblib list of class names (optional)
+
+    Returns:
+        ModelVersion (not yet validated)
+    """
+    model = joblib.load(model_path)
+    # Silence verbose output from Random Forest (prevents [Parallel] spam)
+    if hasattr(model, 'verbose'):
+        model.verbose = 0
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+    feature_names = joblib.load(features_path) if features_path and Path(features_path).exists() else None
+    class_names = joblib.load(class_names_path) if class_names_path and Path(class_names_path).exists() else None
+    return ModelVersion(
+        key=key,
+        model=model,
+        feature_names=list(feature_names) if feature_names is not None else None,
+        class_names=[str(c) for c in class_names] if class_names is not None else None,
+        version=artifact_digest(Path(model_path)),
+        artifact=str(model_path),
+    )
+
+
+def validate_model_version(candidate: ModelVersion, available_features: Optional[Iterable[str]] = None):
+    """
+    Check a candidate against its metadata files.
+
+    Raises:
+        ModelValidationError: With every problem found
+    """
+    model = candidate.model
+    problems = []
+    if not hasattr(model, 'predict_proba') or not hasattr(model, 'classes_'):
+        raise ModelValidationError(["model has no predict_proba/classes_ (not a fitted classifier)"])
+
+    features = candidate.feature_names
+    if not features:
+        problems.append("feature names are missing")
+    else:
+        n_features = getattr(model, 'n_features_in_', None)
+        if n_features is not None and n_features != len(features):
+            problems.append(f"model expects {n_features} features, feature names list {len(features)}")
+        fitted_names = getattr(model, 'feature_names_in_', None)
+        if fitted_names is not None and list(fitted_names) != list(features):
+            problems.append("feature names differ from the names the model was fitted with")
+        if available_features is not None:
+            missing = [f for f in features if f not in set(available_features)]
+            if missing:
+                problems.append(f"features not produced by the extractor: {', '.join(missing[:10])}")
+
+    classes = candidate.classes
+    if candidate.class_names is not None and set(candidate.class_names) != set(classes):
+        problems.append(f"class names {candidate.class_names} differ from model classes {classes}")
+    if 'BENIGN' not in classes:
+        problems.append(f"model classes {classes} do not include BENIGN")
+
+    if problems:
+        raise ModelValidationError(problems)
+
+
+def warm_up(candidate: ModelVersion, rows: int = WARMUP_ROWS, seed: int = 0) -> float:
+    """
+    Run a synthetic batch through the candidate.
+
+    Loads tree arrays into cache and catches models that fail at predict time
+    before they serve traffic.
+
+    Returns:
+        Seconds taken by predict_proba
+
+    Raises:
+        ModelValidationError: The model failed or returned bad probabilities
+    """
+    rng = np.random.default_rng(seed)
+    values = np.vstack([
+        np.zeros((1, len(candidate.feature_names))),
+        rng.lognormal(mean=3.0, sigma=2.0, size=(rows - 1, len(candidate.feature_names))),
+    ])
+    X = pd.DataFrame(values, columns=candidate.feature_names)
+    start = time.perf_counter()
+    try:
+        probabilities = np.asarray(candidate.model.predict_proba(X))
+    except Exception as e:
+        raise ModelValidationError([f"warm-up prediction failed: {e}"])
+    elapsed = time.perf_counter() - start
+
+    if probabilities.shape != (rows, len(candidate.classes)):
+        raise ModelValidationError([f"warm-up returned shape {probabilities.shape}, "
+                                    f"expected {(rows, len(candidate.classes))}"])
+    if not np.isfinite(probabilities).all() or not np.allclose(probabilities.sum(axis=1), 1.0, atol=1e-6):
+        raise ModelValidationError(["warm-up probabilities are not finite or do not sum to 1"])
+    return elapsed
+
+
+def prepare_model_version(key: str, model_path: Path, features_path: Optional[Path] = None,
+                          class_names_path: Optional[Path] = None,
+                          available_features: Optional[Iterable[str]] = None) -> ModelVersion:
+    """
+    Load, validate and warm up a candidate.
+
+    Raises:
+        FileNotFoundError: The model file does not exist
+        ModelValidationError: Validation or warm-up failed
+    """
+    if not Path(model_path).exists():
+        raise FileNotFoundError(f"Model not found: {model_path}")
+    candidate = load_model_version(key, model_path, features_path, class_names_path)
+    validate_model_version(candidate, available_features=available_features)
+    return replace(candidate, warmup_seconds=round(warm_up(candidate), 4))
@@ -0,0 +1,278 @@
+"""
+Overload Module
+Load shedding and sampling for live capture when flows arrive faster than
+they can be classified.
+
+The OverloadController watches three pressure signals after every batch:
+- capture lag: how much later than expected flows reach the detector
+- inference utilization: share of loop time spent waiting on the model
+- inference queue depth: tasks waiting in the shared inference pool
+
+and moves between three modes (escalating immediately, relaxing one level
+after a run of calm batches):
+
+- FULL: every flow is classified
+- PRIORITIZED: flows from new or suspicious sources are always classified;
+  long-lived flows from known, clean sources are sampled
+- SAMPLING: only new/suspicious sources are always classified; everything
+  else is sampled
+
+A flow's expected export time is its last packet, plus `idle_timeout` when
+NFStream expired it for inactivity (expiration_id 0). Lag is the delay
+beyond that, relative to the smallest delay seen so far, so idle-timeout
+waits, quiet links and clock offsets between capture and wall time do not
+count as falling behind.
+
+Skipped flows are never dropped silently: each one is counted by reason, and
+still contributes to the traffic statistics.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    from .metrics import FLOWS_SHED, OVERLOAD_TRANSITIONS
+except ImportError:
+    import sys
+    from pathlib import Path
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import FLOWS_SHED, OVERLOAD_TRANSITIONS
+
+
+FULL = "full"
+PRIORITIZED = "prioritized"
+SAMPLING = "sampling"
+MODES = (FULL, PRIORITIZED, SAMPLING)
+
+
+class _LRUSet:
+    """Bounded set that forgets the least recently touched keys."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def touch(self, key) -> bool:
+        """Mark a key as recently seen; returns True if it was already present."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        self._keys[key] = None
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+        return False
+
+
+class OverloadController:
+    """
+    Decides per flow whether to classify it, based on the current load mode.
+
+    Usage:
+        controller = OverloadController(idle_timeout=profile.idle_timeout)
+        if controller.admit(src_ip, duration_ms, last_seen_ms, expiration_id):
+            ...  # classify
+        controller.observe_batch(inference_seconds, pending_tasks)
+    """
+
+    def __init__(self, enabled: bool = True,
+                 lag_high: float = 5.0, lag_critical: float = 15.0,
+                 utilization_high: float = 0.8, utilization_critical: float = 0.95,
+                 queue_high: int = 4, queue_critical: int = 8,
+                 cooldown_batches: int = 20, sample_every: int = 10,
+                 long_flow_ms: int = 10000, source_capacity: int = 50000,
+                 ewma_alpha: float = 0.2, idle_timeout: float = 0.0):
+        """
+        Initialize the controller.
+
+        Args:
+            enabled: If False the controller always stays in FULL mode
+            lag_high / lag_critical: Capture lag (seconds) that triggers
+                PRIORITIZED / SAMPLING mode
+            utilization_high / utilization_critical: Inference share of loop
+                time that triggers PRIORITIZED / SAMPLING mode
+            queue_high / queue_critical: Pending inference tasks that trigger
+                PRIORITIZED / SAMPLING mode
+            cooldown_batches: Calm batches required before relaxing one level
+            sample_every: Classify 1 in N sampled flows
+            long_flow_ms: Flows at least this long count as long-lived
+            source_capacity: Sources remembered for new/suspicious checks
+            ewma_alpha: Smoothing factor for the lag and utilization signals
+            idle_timeout: Streamer idle timeout (seconds); idle-expired flows
+                are expected this long after their last packet
+        """
+        self.enabled = enabled
+        self.lag_thresholds = (lag_high, lag_critical)
+        self.utilization_thresholds = (utilization_high, utilization_critical)
+        self.queue_thresholds = (queue_high, queue_critical)
+        self.cooldown_batches = cooldown_batches
+        self.sample_every = max(1, sample_every)
+        self.long_flow_ms = long_flow_ms
+        self.ewma_alpha = ewma_alpha
+        self.idle_timeout = idle_timeout
+
+        self.known_sources = _LRUSet(source_capacity)
+        self.suspicious_sources = _LRUSet(source_capacity)
+
+        self.level = 0
+        self.lag_ewma = 0.0
+        self.utilization_ewma = 0.0
+        self.pending = 0
+        self._calm_batches = 0
+        self._sample_counter = 0
+        self._min_delay: Optional[float] = None
+        self._last_lag = 0.0
+        self._last_batch_end = time.perf_counter()
+
+        self.classified = 0
+        self.shed: Dict[str, int] = {"sampled": 0, "long_lived_sampled": 0}
+        self.transitions: Dict[str, int] = {mode: 0 for mode in MODES}
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> str:
+        return MODES[self.level]
+
+    @property
+    def shed_total(self) -> int:
+        return sum(self.shed.values())
+
+    def _update_lag(self, last_seen_ms: Optional[float], expiration_id: Optional[int]):
+        """Lag = delay past the flow's expected export time, beyond the smallest delay seen."""
+        if not last_seen_ms:
+            return
+        expected = last_seen_ms / 1000.0
+        if expiration_id == 0:
+            expected += self.idle_timeout
+        delay = time.time() - expected
+        if self._min_delay is None or delay < self._min_delay:
+            self._min_delay = delay
+        self._last_lag = delay - self._min_delay
+
+    def admit(self, src_ip: str, duration_ms: float = 0, last_seen_ms: Optional[float] = None,
+              expiration_id: Optional[int] = None) -> bool:
+        """
+        Decide whether a flow should be classified.
+
+        Args:
+            src_ip: Flow source IP
+            duration_ms: Flow duration (bidirectional_duration_ms)
+            last_seen_ms: Flow end timestamp (bidirectional_last_seen_ms)
+            expiration_id: NFStream expiration trigger (0 = idle timeout)
+
+        Returns:
+            True to classify the flow, False if it is shed (and counted)
+        """
+        src_ip = str(src_ip)
+        with self._lock:
+            self._update_lag(last_seen_ms, expiration_id)
+            is_new = not self.known_sources.touch(src_ip)
+
+            if self.level == 0 or is_new or src_ip in self.suspicious_sources:
+                self.classified += 1
+                return True
+
+            long_lived = duration_ms >= self.long_flow_ms
+            if self.level == 1 and not long_lived:
+                self.classified += 1
+                return True
+
+            # Systematic 1-in-N sampling keeps shed volume predictable
+            self._sample_counter += 1
+            if self._sample_counter % self.sample_every == 0:
+                self.classified += 1
+                return True
+
+            reason = "long_lived_sampled" if long_lived else "sampled"
+            self.shed[reason] += 1
+        FLOWS_SHED.labels(reason=reason).inc()
+        return False
+
+    def mark_suspicious(self, src_ip: str):
+        """Always classify future flows from a source that produced a threat."""
+        with self._lock:
+            self.suspicious_sources.touch(str(src_ip))
+
+    def _pressure_level(self) -> int:
+        signals = (
+            (self.lag_ewma, self.lag_thresholds),
+            (self.utilization_ewma, self.utilization_thresholds),
+            (self.pending, self.queue_thresholds),
+        )
+        level = 0
+        for value, (high, critical) in signals:
+            if value >= critical:
+                return 2
+            if value >= high:
+                level = 1
+        return level
+
+    def observe_batch(self, inference_seconds: float, pending_tasks: int = 0) -> str:
+        """
+        Update the pressure signals after a batch and switch modes if needed.
+
+        Args:
+            inference_seconds: Time spent waiting on inference for the batch
+            pending_tasks: Tasks queued in the inference pool
+
+        Returns:
+            The (possibly new) mode
+        """
+        now = time.perf_counter()
+        with self._lock:
+            loop_seconds = max(now - self._last_batch_end, 1e-9)
+            self._last_batch_end = now
+            if not self.enabled:
+                return self.mode
+
+            a = self.ewma_alpha
+            utilization = min(1.0, inference_seconds / loop_seconds)
+            self.utilization_ewma = a * utilization + (1 - a) * self.utilization_ewma
+            self.lag_ewma = a * self._last_lag + (1 - a) * self.lag_ewma
+            self.pending = pending_tasks
+
+            target = self._pressure_level()
+            if target > self.level:
+                self._set_level(target)
+            elif target < self.level:
+                self._calm_batches += 1
+                if self._calm_batches >= self.cooldown_batches:
+                    self._set_level(self.level - 1)
+            else:
+                self._calm_batches = 0
+            return self.mode
+
+    def _set_level(self, level: int):
+        previous = self.mode
+        self.level = level
+        self._calm_batches = 0
+        self.transitions[self.mode] += 1
+        OVERLOAD_TRANSITIONS.labels(mode=self.mode).inc()
+        print(f"⚡ Overload mode: {previous} → {self.mode} "
+              f"(lag {self.lag_ewma:.1f}s, utilization {self.utilization_ewma:.0%}, queue {self.pending})")
+
+    def info(self) -> Dict[str, Any]:
+        """Current mode, pressure signals and shed accounting."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "mode": self.mode,
+                "lag_seconds": round(self.lag_ewma, 2),
+                "inference_utilization": round(self.utilization_ewma, 3),
+                "inference_queue": self.pending,
+                "classified_flows": self.classified,
+                "shed_flows": self.shed_total,
+                "shed_by_reason": dict(self.shed),
+                "transitions": dict(self.transitions),
+                "tracked_sources": len(self.known_sources),
+                "suspicious_sources": len(self.suspicious_sources),
+            }
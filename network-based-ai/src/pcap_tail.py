@@ -0,0 +1,387 @@
+"""
+PCAP Tail Module
+Incremental reading of rolling capture directories (tcpdump -C / -G output).
+
+PcapTailer polls a directory for capture files and turns whatever is new
+since the last poll - a new file, or packets appended to the active one - into
+a small, self-contained chunk file (the capture's header followed by complete
+packet records only). Chunks can be fed to NFStream like any other capture.
+
+Progress is kept per file as a byte offset in a JSON checkpoint, written after
+the caller commits each chunk, so a restarted ingest resumes where it stopped
+instead of re-analyzing data. A crash between analyzing a chunk and committing
+it re-analyzes only that chunk.
+
+The checkpoint also records each file's identity: inode, device and a hash of
+its header plus the first record header (which holds the first packet's
+timestamp). A file whose identity changes - a tcpdump -W ring buffer reusing
+a name, or a capture replaced by a different one - is read again from the
+start, even if it was finished or is larger than the stale offset.
+
+Both classic pcap (any byte order, micro/nanosecond) and pcapng are supported.
+A flow that straddles two chunks is reported as two flows.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import stat as stat_module
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+PCAP_MAGIC_BYTE_ORDER = {
+    b'\xd4\xc3\xb2\xa1': '<', b'\xa1\xb2\xc3\xd4': '>',  # microsecond
+    b'\x4d\x3c\xb2\xa1': '<', b'\xa1\xb2\x3c\x4d': '>',  # nanosecond
+}
+PCAP_GLOBAL_HEADER_LEN = 24
+PCAP_RECORD_HEADER_LEN = 16
+
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_PACKET_BLOCKS = (2, 3, 6)  # Packet, Simple Packet, Enhanced Packet
+
+# Bytes after the header included in the identity hash (covers the first record's timestamp)
+FINGERPRINT_RECORD_BYTES = 32
+
+# Larger records mean a corrupt or misidentified file
+MAX_RECORD_BYTES = 64 * 1024 * 1024
+
+
+class CaptureFormatError(ValueError):
+    """File is not a readable pcap/pcapng capture."""
+
+
+@dataclass
+class CaptureChunk:
+    """New complete packets from one capture file, written as a standalone capture."""
+    path: Path
+    source: str
+    start_offset: int
+    end_offset: int
+    packets: int
+    final: bool
+    identity: Optional[Dict[str, Any]] = None
+
+
+def _read_header(handle) -> Tuple[str, str, int]:
+    """
+    Identify a capture file.
+
+    Returns:
+        (format, byte order, header length) - for pcapng the header is every
+        block before the first packet block.
+    """
+    magic = handle.read(4)
+    if len(magic) < 4:
+        raise EOFError("capture header not written yet")
+
+    if magic in PCAP_MAGIC_BYTE_ORDER:
+        return 'pcap', PCAP_MAGIC_BYTE_ORDER[magic], PCAP_GLOBAL_HEADER_LEN
+
+    if struct.unpack('<I', magic)[0] == PCAPNG_SHB:
+        head = handle.read(8)
+        if len(head) < 8:
+            raise EOFError("pcapng section header not written yet")
+        endian = '<' if struct.unpack('<I', head[4:8])[0] == PCAPNG_BYTE_ORDER_MAGIC else '>'
+        position = 0
+        while True:
+            handle.seek(position)
+            block = handle.read(8)
+            if len(block) < 8:
+                raise EOFError("pcapng header blocks not written yet")
+            block_type, block_len = struct.unpack(endian + 'II', block)
+            if block_type in PCAPNG_PACKET_BLOCKS:
+                return 'pcapng', endian, position
+            if block_len < 12 or block_len % 4:
+                raise CaptureFormatError(f"invalid pcapng block length {block_len}")
+            position += block_len
+
+    raise CaptureFormatError(f"unknown capture magic {magic.hex()}")
+
+
+def _fingerprint(handle, header_len: int) -> Optional[str]:
+    """Hash of the header and first record header, or None if not written yet."""
+    handle.seek(0)
+    head = handle.read(header_len + FINGERPRINT_RECORD_BYTES)
+    if len(head) < header_len + FINGERPRINT_RECORD_BYTES:
+        return None
+    return hashlib.sha1(head).hexdigest()[:16]
+
+
+def _complete_records(data: bytes, fmt: str, endian: str) -> Tuple[int, int]:
+    """
+    Length of the prefix of `data` made of complete records, and their packet count.
+    """
+    position = packets = 0
+    if fmt == 'pcap':
+        while position + PCAP_RECORD_HEADER_LEN <= len(data):
+            incl_len = struct.unpack_from(endian + 'I', data, position + 8)[0]
+            if incl_len > MAX_RECORD_BYTES:
+                raise CaptureFormatError(f"record length {incl_len} at +{position}")
+            end = position + PCAP_RECORD_HEADER_LEN + incl_len
+            if end > len(data):
+                break
+            position = end
+            packets += 1
+    else:
+        while position + 8 <= len(data):
+            block_type, block_len = struct.unpack_from(endian + 'II', data, position)
+            if block_len < 12 or block_len % 4 or block_len > MAX_RECORD_BYTES:
+                raise CaptureFormatError(f"invalid pcapng block length {block_len} at +{position}")
+            if position + block_len > len(data):
+                break
+            position += block_len
+            packets += block_type in PCAPNG_PACKET_BLOCKS
+    return position, packets
+
+
+class PcapTailer:
+    """
+    Follows capture files in a directory.
+
+    Usage:
+        tailer = PcapTailer('/var/captures', pattern='*.pcap*')
+        for chunk in tailer.poll():
+            ...  # analyze chunk.path
+            tailer.commit(chunk)
+    """
+
+    def __init__(self, directory: Union[str, Path], pattern: str = '*.pcap*',
+                 checkpoint_path: Union[str, Path] = None, poll_interval: float = 2.0,
+                 settle_seconds: float = 10.0, max_chunk_bytes: int = 64 * 1024 * 1024,
+                 temp_dir: Union[str, Path] = None):
+        """
+        Initialize the tailer.
+
+        Args:
+            directory: Directory the sensor writes captures into
+            pattern: Filename glob for capture files
+            checkpoint_path: JSON file holding per-file offsets
+                             (default: .pcap_tail_checkpoint.json in directory)
+            poll_interval: Seconds between directory scans
+            settle_seconds: A file that is not the newest and has not changed
+                            for this long is treated as closed
+            max_chunk_bytes: Upper bound on capture data per chunk
+            temp_dir: Where chunk files are written (default: system temp)
+        """
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise NotADirectoryError(f"Capture directory not found: {self.directory}")
+        self.pattern = pattern
+        self.checkpoint_path = Path(checkpoint_path or self.directory / '.pcap_tail_checkpoint.json')
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.max_chunk_bytes = max_chunk_bytes
+        self.temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.gettempdir())
+
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = self._load_checkpoint()
+        self.chunks_committed = 0
+        self.packets_committed = 0
+        self.bytes_committed = 0
+        self.errors: Dict[str, str] = {}
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        if self.checkpoint_path.exists():
+            try:
+                with open(self.checkpoint_path) as f:
+                    return json.load(f).get('files', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+        return {}
+
+    def _save_checkpoint(self):
+        """Write the checkpoint atomically (caller holds the lock)."""
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'directory': str(self.directory), 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _capture_files(self) -> List[Tuple[Path, os.stat_result]]:
+        """Matching files with their stat, oldest first (files removed meanwhile are skipped)."""
+        files = []
+        for path in self.directory.iterdir():
+            if (not fnmatch.fnmatch(path.name, self.pattern) or path == self.checkpoint_path
+                    or path.name.endswith('.tmp')):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # rotated away or cleaned up since the listing
+            if stat_module.S_ISREG(stat.st_mode):
+                files.append((path, stat))
+        return sorted(files, key=lambda item: (item[1].st_mtime, item[0].name))
+
+    def poll(self) -> List[CaptureChunk]:
+        """
+        Scan the directory and return chunks of unprocessed packets (oldest first).
+
+        Chunks must be passed to commit() once analyzed; uncommitted data is
+        returned again by the next poll.
+        """
+        chunks = []
+        files = self._capture_files()
+        now = time.time()
+        for i, (path, stat) in enumerate(files):
+            key = str(path.resolve())
+            state = self.files.get(key, {})
+            if state.get('finished') and not self._changed(state, stat):
+                continue
+
+            closed = i < len(files) - 1 and now - stat.st_mtime >= self.settle_seconds
+            try:
+                chunk = self._read_chunk(path, key, state, stat, closed)
+            except (EOFError, FileNotFoundError):
+                continue  # header not complete yet, or the file is gone
+            except (CaptureFormatError, OSError) as e:
+                with self._lock:
+                    self.errors[key] = str(e)
+                    self.files[key] = dict(state, finished=True, error=str(e), inode=stat.st_ino,
+                                           device=stat.st_dev, size=stat.st_size, mtime=stat.st_mtime)
+                    self._save_checkpoint()
+                print(f"⚠️ Skipping capture {path.name}: {e}")
+                continue
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def _changed(state: Dict[str, Any], stat: os.stat_result) -> bool:
+        """Whether a finished file was modified or replaced since it was checkpointed."""
+        return (state.get('inode', stat.st_ino) != stat.st_ino
+                or state.get('device', stat.st_dev) != stat.st_dev
+                or state.get('size', stat.st_size) != stat.st_size
+                or state.get('mtime', stat.st_mtime) != stat.st_mtime)
+
+    @staticmethod
+    def _replaced(state: Dict[str, Any], stat: os.stat_result, fingerprint: Optional[str]) -> bool:
+        """Whether the file under a checkpointed name is a different capture."""
+        if state.get('inode', stat.st_ino) != stat.st_ino or state.get('device', stat.st_dev) != stat.st_dev:
+            return True
+        return bool(state.get('fingerprint') and fingerprint and state['fingerprint'] != fingerprint)
+
+    def _read_chunk(self, path: Path, key: str, state: Dict[str, Any],
+                    stat: os.stat_result, closed: bool) -> Optional[CaptureChunk]:
+        size = stat.st_size
+        with open(path, 'rb') as handle:
+            fmt, endian, header_len = _read_header(handle)
+            fingerprint = _fingerprint(handle, header_len)
+
+            if state.get('error') and not (self._replaced(state, stat, fingerprint)
+                                           or size < state.get('size', 0)):
+                # Still the capture that failed (perhaps grown): skip it until it is replaced
+                with self._lock:
+                    self.files[key] = dict(state, size=size, mtime=stat.st_mtime)
+                    self._save_checkpoint()
+                return None
+
+            offset = state.get('offset', 0)
+            if state and (state.get('error') or self._replaced(state, stat, fingerprint) or size < offset):
+                # Truncated, rotated or replaced under the same name: start over
+                print(f"⚠️ Capture {path.name} was replaced or truncated, re-reading from the start")
+                state, offset = {}, 0
+                with self._lock:
+                    self.files[key] = {}
+            offset = max(offset, header_len)
+            identity = {'inode': stat.st_ino, 'device': stat.st_dev, 'size': size,
+                        'mtime': stat.st_mtime, 'fingerprint': fingerprint}
+
+            handle.seek(offset)
+            data = handle.read(min(size - offset, self.max_chunk_bytes)) if size > offset else b''
+            length, packets = _complete_records(data, fmt, endian)
+
+            final = closed and offset + length >= size
+            if length == 0:
+                if closed:
+                    # Nothing more will arrive; a trailing partial record is dropped
+                    with self._lock:
+                        self.files[key] = dict(state, offset=offset, finished=True, **identity)
+                        self._save_checkpoint()
+                return None
+
+            handle.seek(0)
+            header = handle.read(header_len)
+
+        # Unique name: other ingest sessions may follow files with the same names
+        fd, chunk_path = tempfile.mkstemp(prefix=f"tail_{path.stem}_{offset}_{offset + length}_",
+                                          suffix='.pcapng' if fmt == 'pcapng' else '.pcap',
+                                          dir=self.temp_dir)
+        chunk_path = Path(chunk_path)
+        with os.fdopen(fd, 'wb') as out:
+            out.write(header)
+            out.write(data[:length])
+
+        return CaptureChunk(
+            path=chunk_path, source=key, start_offset=offset,
+            end_offset=offset + length, packets=packets, final=final, identity=identity
+        )
+
+    def commit(self, chunk: CaptureChunk):
+        """Record a chunk as analyzed and remove its temporary file."""
+        with self._lock:
+            state = self.files.get(chunk.source, {})
+            self.files[chunk.source] = dict(
+                state,
+                **(chunk.identity or {}),
+                offset=chunk.end_offset,
+                packets=state.get('packets', 0) + chunk.packets,
+                finished=chunk.final,
+                updated=time.time()
+            )
+            self.chunks_committed += 1
+            self.packets_committed += chunk.packets
+            self.bytes_committed += chunk.end_offset - chunk.start_offset
+            self._save_checkpoint()
+        self.discard(chunk)
+
+    def fail(self, chunk: CaptureChunk, error: str):
+        """
+        Give up on a chunk's file: mark it finished with the error (it is read
+        again only if replaced) and remove the chunk's temporary file.
+        """
+        with self._lock:
+            self.errors[chunk.source] = error
+            self.files[chunk.source] = dict(
+                self.files.get(chunk.source, {}),
+                **(chunk.identity or {}),
+                finished=True,
+                error=error,
+                updated=time.time()
+            )
+            self._save_checkpoint()
+        self.discard(chunk)
+
+    def record_error(self, source: str, error: str):
+        """Report a problem with a file without changing its progress."""
+        with self._lock:
+            self.errors[source] = error
+
+    def discard(self, chunk: CaptureChunk):
+        """Remove a chunk's temporary file without recording progress."""
+        try:
+            chunk.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def info(self) -> Dict[str, Any]:
+        """Progress summary for the API."""
+        with self._lock:
+            return {
+                'directory': str(self.directory),
+                'pattern': self.pattern,
+                'checkpoint': str(self.checkpoint_path),
+                'files_tracked': len(self.files),
+                'files_finished': sum(1 for state in self.files.values() if state.get('finished')),
+                'chunks_analyzed': self.chunks_committed,
+                'packets_analyzed': self.packets_committed,
+                'bytes_analyzed': self.bytes_committed,
+                'errors': dict(self.errors),
+            }
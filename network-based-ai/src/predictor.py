@@ -5,12 +5,43 @@ Loads trained models and makes predictions on network flow data.
 Updated to use the new multiclass CICIDS2017 model as primary.
 """
 
+import os
+import threading
+import time
 import joblib
 import pandas as pd
 import numpy as np
+from collections import deque
+from datetime import datetime
 from pathlib import Path
 from typing import Union, List, Tuple, Optional
 
+try:
+    from .metrics import ALIGNMENT_SECONDS, BATCH_SIZE, INFERENCE_SECONDS, INFERENCE_ROWS
+    from .profiling import record_stage
+    from .prefilter import BenignPrefilter
+    from .forest import EarlyExitForest, supports_early_exit
+    from .model_versions import (ModelVersion, artifact_digest, artifact_paths, load_model_version,
+                                 prepare_model_version, read_model_info)
+    from .model_telemetry import ModelTelemetry
+    from .feature_extractor import NFSTREAM_ATTRIBUTES
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import ALIGNMENT_SECONDS, BATCH_SIZE, INFERENCE_SECONDS, INFERENCE_ROWS
+    from src.profiling import record_stage
+    from src.prefilter import BenignPrefilter
+    from src.forest import EarlyExitForest, supports_early_exit
+    from src.model_versions import (ModelVersion, artifact_digest, artifact_paths, load_model_version,
+                                    prepare_model_version, read_model_info)
+    from src.model_telemetry import ModelTelemetry
+    from src.feature_extractor import NFSTREAM_ATTRIBUTES
+
+
+# Models that may use early-exit tree evaluation (binary forests)
+EARLY_EXIT_MODELS = ('nfstream', 'robust_binary')
 
 # CICIDS2017 Feature Names (78 features used by our model)
 CICIDS2017_FEATURES = [
@@ -44,13 +75,16 @@ class NetworkThreatPredictor:
     Classes: BENIGN, DDoS, DoS, PortScan, Brute Force, Web Attack, Infiltration, Other
     """
     
-    def __init__(self, models_dir: Union[str, Path] = None):
+    def __init__(self, models_dir: Union[str, Path] = None,
+                 prefilter: Optional[BenignPrefilter] = None):
         """
         Initialize the predictor.
         
         Args:
             models_dir: Path to directory containing trained models.
                        Defaults to 'models/' in project root.
+            prefilter: Benign short-circuit stage for predict_nfstream.
+                       Defaults to BenignPrefilter.from_env() (off unless configured).
         """
         if models_dir is None:
             self.models_dir = Path(__file__).parent.parent / 'models'
@@ -62,49 +96,77 @@ class NetworkThreatPredictor:
         self.feature_names = None
         self.class_names = None
         
-        # Legacy model (NFStream binary) for backward compatibility
-        self.nfstream_model = None
-        self.feature_names_nfstream = None
-        self.class_names_nfstream = None
+        # Primary NFStream binary model, hot-swappable (see reload_nfstream)
+        self._nfstream: Optional[ModelVersion] = None
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self.reload_status = {'state': 'idle'}
+        self.model_history = deque(maxlen=10)
+        
+        # Live inference telemetry per model version, and artifacts of the other models
+        self.telemetry = ModelTelemetry()
+        self._artifacts: dict = {}
+        
+        # Cheap benign pre-filter ahead of the NFStream forest
+        self.prefilter = prefilter if prefilter is not None else BenignPrefilter.from_env()
+        
+        # Early-exit forest evaluation (off unless configured; see configure_early_exit)
+        self.early_exit_config = None
+        self._early_exit: dict = {}
+        if os.getenv("NETWORK_AI_EARLY_EXIT", "").lower() in ("1", "true", "yes", "on"):
+            delta = os.getenv("NETWORK_AI_EARLY_EXIT_DELTA")
+            self.configure_early_exit(delta=float(delta) if delta else None)
         
         self._load_models()
     
+    @staticmethod
+    def _nfstream_artifacts(models_dir: Path) -> Tuple[Path, Path, Path]:
+        """Model, feature names and class names files of the NFStream binary model."""
+        # NFStream Robust Binary is the primary model; fall back to the legacy model
+        paths = artifact_paths(models_dir, 'nfstream_robust_binary')
+        return paths if paths[0].exists() else artifact_paths(models_dir, 'nfstream_from_scratch')
+    
+    @property
+    def nfstream_version(self) -> Optional[ModelVersion]:
+        """Current NFStream model bundle; take it once per batch for a consistent model."""
+        return self._nfstream
+    
+    @property
+    def nfstream_model(self):
+        return self._nfstream.model if self._nfstream is not None else None
+    
+    @property
+    def feature_names_nfstream(self) -> Optional[List[str]]:
+        return self._nfstream.feature_names if self._nfstream is not None else None
+    
+    @property
+    def class_names_nfstream(self) -> Optional[List[str]]:
+        return self._nfstream.class_names if self._nfstream is not None else None
+    
     def _load_models(self):
         """Load trained models and associated metadata."""
         # Load NFStream Robust Binary model FIRST (this is the primary model now)
         # 77.10% accuracy, 6.38% FPR - BENIGN vs ATTACK
-        nfstream_model_path = self.models_dir / 'random_forest_nfstream_robust_binary.joblib'
-        if not nfstream_model_path.exists():
-            # Fallback to legacy model
-            nfstream_model_path = self.models_dir / 'random_forest_nfstream_from_scratch.joblib'
+        nfstream_model_path, nfstream_features_path, nfstream_class_names_path = \
+            self._nfstream_artifacts(self.models_dir)
         
         if nfstream_model_path.exists():
             try:
-                self.nfstream_model = joblib.load(nfstream_model_path)
-                
-                # Silence verbose output from Random Forest (prevents [Parallel] spam)
-                if hasattr(self.nfstream_model, 'verbose'):
-                    self.nfstream_model.verbose = 0
-                if hasattr(self.nfstream_model, 'n_jobs'):
-                    self.nfstream_model.n_jobs = 1  # Single-threaded = no parallel logs
-                
-                # Load matching feature names and class names
+                self._nfstream = load_model_version(
+                    'nfstream', nfstream_model_path, nfstream_features_path, nfstream_class_names_path
+                )
                 if 'robust_binary' in str(nfstream_model_path):
-                    nfstream_features_path = self.models_dir / 'feature_names_nfstream_robust_binary.joblib'
-                    nfstream_class_names_path = self.models_dir / 'class_names_nfstream_robust_binary.joblib'
-                    print(f"Loaded primary model: NFStream Robust Binary (77.10% acc, 6.38% FPR)")
+                    info = read_model_info(nfstream_model_path) or {}
+                    accuracy, fpr = info.get('accuracy'), info.get('fpr')
+                    metrics = (f" ({accuracy:.2%} acc, {fpr:.2%} FPR)"
+                               if isinstance(accuracy, float) and isinstance(fpr, float) else "")
+                    print(f"Loaded primary model: NFStream Robust Binary{metrics}")
                 else:
-                    nfstream_features_path = self.models_dir / 'feature_names_nfstream_from_scratch.joblib'
-                    nfstream_class_names_path = self.models_dir / 'class_names_nfstream_from_scratch.joblib'
                     print(f"Loaded primary model: NFStream Legacy")
                 
-                if nfstream_features_path.exists():
-                    self.feature_names_nfstream = joblib.load(nfstream_features_path)
-                if nfstream_class_names_path.exists():
-                    self.class_names_nfstream = joblib.load(nfstream_class_names_path)
-                
                 print(f"  Classes: {self.class_names_nfstream}")
                 print(f"  Features: {len(self.feature_names_nfstream) if self.feature_names_nfstream else 'default'}")
+                print(f"  Version: {self._nfstream.version}")
             except Exception as e:
                 raise RuntimeError(f"Failed to load NFStream model: {e}")
         else:
@@ -114,6 +176,7 @@ class NetworkThreatPredictor:
         model_path = self.models_dir / 'random_forest_multiclass_cicids.joblib'
         if model_path.exists():
             self.model = joblib.load(model_path)
+            self._record_artifact('multiclass', model_path)
             print(f"  Also loaded: Multiclass CICIDS2017 model")
             
             # Load feature names
@@ -140,6 +203,7 @@ class NetworkThreatPredictor:
         if cf_model_path.exists():
             try:
                 self.cicflowmeter_model = joblib.load(cf_model_path)
+                self._record_artifact('cicflowmeter', cf_model_path)
                 cf_features_path = self.models_dir / 'feature_names_cicflowmeter.joblib'
                 if cf_features_path.exists():
                     self.feature_names_cicflowmeter = joblib.load(cf_features_path)
@@ -159,6 +223,7 @@ class NetworkThreatPredictor:
         if rb_model_path.exists():
             try:
                 self.robust_binary_model = joblib.load(rb_model_path)
+                self._record_artifact('robust_binary', rb_model_path)
                 rb_features_path = self.models_dir / 'feature_names_robust_binary.joblib'
                 if rb_features_path.exists():
                     self.feature_names_robust_binary = joblib.load(rb_features_path)
@@ -170,6 +235,98 @@ class NetworkThreatPredictor:
                 print(f"  Warning: Could not load Robust Binary model: {e}")
 
     
+    def _record_artifact(self, model_key: str, model_path: Path):
+        """Remember the artifact, version and load time of a (non hot-swappable) model."""
+        self._artifacts[model_key] = {
+            'artifact': str(model_path),
+            'version': artifact_digest(model_path),
+            'loaded_at': datetime.now().isoformat(),
+        }
+    
+    def model_version(self, model_key: str) -> Optional[str]:
+        """Artifact version of a loaded model ('nfstream', 'robust_binary', ...), or None."""
+        if model_key == 'nfstream':
+            return self._nfstream.version if self._nfstream is not None else None
+        return self._artifacts.get(model_key, {}).get('version')
+    
+    def model_stats(self) -> List[dict]:
+        """
+        Loaded models with their artifact, offline metrics and live telemetry.
+        
+        Returns:
+            One entry per model, the NFStream model first. `telemetry` holds the
+            counters of every version of the model that has scored rows, keyed
+            by version, so a hot-swapped model's numbers start from zero.
+        """
+        model = self._nfstream
+        artifacts = {}
+        if model is not None:
+            artifacts['nfstream'] = {'artifact': model.artifact, 'version': model.version,
+                                     'loaded_at': model.loaded_at}
+        artifacts.update(self._artifacts)
+        
+        entries = []
+        for key, artifact in artifacts.items():
+            entries.append({
+                'key': key,
+                'version': artifact['version'],
+                'artifact': Path(artifact['artifact']).name,
+                'loaded_at': artifact['loaded_at'],
+                'offline': read_model_info(Path(artifact['artifact'])),
+                'telemetry': self.telemetry.snapshot(key),
+            })
+        return entries
+    
+    def _run_reload(self, models_dir: Path):
+        """Load, validate and warm up a candidate, then swap it in (reload thread)."""
+        try:
+            candidate = prepare_model_version('nfstream', *self._nfstream_artifacts(models_dir),
+                                              available_features=NFSTREAM_ATTRIBUTES)
+            
+            previous = self._nfstream
+            # Atomic swap: in-flight batches keep the bundle they already took
+            self._nfstream = candidate
+            if previous is not None:
+                self.model_history.appendleft(dict(previous.info(), replaced_at=datetime.now().isoformat()))
+            status = {'state': 'swapped', 'version': candidate.version, 'previous_version':
+                      previous.version if previous is not None else None}
+            print(f"🔁 NFStream model swapped: {status['previous_version']} → {candidate.version}")
+        except Exception as e:
+            status = {'state': 'failed', 'error': str(e)}
+            print(f"❌ NFStream model reload failed: {e}")
+        with self._reload_lock:
+            self.reload_status = dict(status, started_at=self.reload_status.get('started_at'),
+                                      finished_at=datetime.now().isoformat(), models_dir=str(models_dir))
+            self._reload_thread = None
+    
+    def reload_nfstream(self, models_dir: Union[str, Path, None] = None, wait: bool = False) -> dict:
+        """
+        Replace the NFStream model without stopping capture.
+        
+        The candidate is loaded, validated and warmed up on a background thread;
+        the current model keeps serving until the swap, and stays if any step fails.
+        
+        Args:
+            models_dir: Directory with the new artifact (default: the predictor's models_dir)
+            wait: Block until the reload finishes
+        
+        Returns:
+            Reload status ('loading', 'swapped' or 'failed')
+        """
+        models_dir = Path(models_dir) if models_dir else self.models_dir
+        with self._reload_lock:
+            thread = self._reload_thread
+            if thread is None:
+                self.reload_status = {'state': 'loading', 'started_at': datetime.now().isoformat(),
+                                      'models_dir': str(models_dir)}
+                thread = threading.Thread(target=self._run_reload, args=(models_dir,),
+                                          name="model-reload", daemon=True)
+                self._reload_thread = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return dict(self.reload_status)
+    
     def get_required_features(self) -> List[str]:
         """Get list of required feature names for the model."""
         return self.feature_names.copy() if self.feature_names else CICIDS2017_FEATURES.copy()
@@ -224,33 +381,45 @@ class NetworkThreatPredictor:
             raise RuntimeError("Model not loaded")
         
         # Preprocess
+        align_start = time.perf_counter()
         X = self.preprocess_features(df)
+        self._observe_alignment('multiclass', align_start)
         
         # Predict
-        predictions = self.model.predict(X)
-        
-        if return_proba:
-            probabilities = self.model.predict_proba(X)
-            return predictions, probabilities
-        
-        return predictions
+        return self._run_model(self.model, X, return_proba, 'multiclass')
     
-    def predict_nfstream(self, df: pd.DataFrame, return_proba: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    def predict_nfstream(self, df: pd.DataFrame, return_proba: bool = False,
+                         model: Optional[ModelVersion] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
         """
         Make predictions using legacy NFStream model (backward compatibility).
         
         Args:
             df: DataFrame with NFStream-extracted features
             return_proba: If True, also return prediction probabilities
+            model: Model bundle to use (default: the current nfstream_version)
         
         Returns:
             Array of predicted class labels ('BENIGN' or 'DDoS').
         """
-        if self.nfstream_model is None:
+        model = model or self._nfstream
+        if model is None:
             raise RuntimeError("NFStream model not loaded")
         
+        # Short-circuit clear-benign flows before aligning for the forest
+        if self.prefilter is not None and self.prefilter.enabled:
+            mask, rule_index = self.prefilter.screen(df)
+            if mask.any():
+                return self._predict_prefiltered(df, mask, rule_index, return_proba, model)
+        
+        return self._predict_nfstream_model(df, return_proba, model)
+    
+    def _predict_nfstream_model(self, df: pd.DataFrame, return_proba: bool = False,
+                                model: Optional[ModelVersion] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """Align NFStream features to the training order and run the forest."""
+        model = model or self._nfstream
         # Get required feature names (in exact training order)
-        required = self.feature_names_nfstream if self.feature_names_nfstream else []
+        align_start = time.perf_counter()
+        required = model.feature_names if model.feature_names else []
         
         # Create a clean feature dataframe with only the required columns
         X = pd.DataFrame()
@@ -262,14 +431,9 @@ class NetworkThreatPredictor:
         
         # Clean up values
         X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
+        self._observe_alignment('nfstream', align_start)
         
-        predictions = self.nfstream_model.predict(X)
-        
-        if return_proba:
-            probabilities = self.nfstream_model.predict_proba(X)
-            return predictions, probabilities
-        
-        return predictions
+        return self._run_model(model.model, X, return_proba, 'nfstream', version=model.version)
     
     def predict_cicflowmeter(self, df: pd.DataFrame, return_proba: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
         """
@@ -289,6 +453,7 @@ class NetworkThreatPredictor:
             raise RuntimeError("CICFlowMeter model not loaded")
         
         # Preprocess for CICFlowMeter model
+        align_start = time.perf_counter()
         required = self.feature_names_cicflowmeter if self.feature_names_cicflowmeter else CICIDS2017_FEATURES
         df = df.copy()
         
@@ -301,14 +466,9 @@ class NetworkThreatPredictor:
         
         X = df[required].copy()
         X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
+        self._observe_alignment('cicflowmeter', align_start)
         
-        predictions = self.cicflowmeter_model.predict(X)
-        
-        if return_proba:
-            probabilities = self.cicflowmeter_model.predict_proba(X)
-            return predictions, probabilities
-        
-        return predictions
+        return self._run_model(self.cicflowmeter_model, X, return_proba, 'cicflowmeter')
 
     def predict_robust_binary(self, df: pd.DataFrame, return_proba: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
         """
@@ -328,6 +488,7 @@ class NetworkThreatPredictor:
             raise RuntimeError("Robust Binary model not loaded")
         
         # Preprocess for Robust Binary model
+        align_start = time.perf_counter()
         required = self.feature_names_robust_binary if self.feature_names_robust_binary else []
         df = df.copy()
         
@@ -337,15 +498,152 @@ class NetworkThreatPredictor:
         
         X = df[required].copy()
         X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
+        self._observe_alignment('robust_binary', align_start)
         
-        predictions = self.robust_binary_model.predict(X)
+        return self._run_model(self.robust_binary_model, X, return_proba, 'robust_binary')
+
+    def _predict_prefiltered(self, df: pd.DataFrame, mask: np.ndarray, rule_index: np.ndarray,
+                             return_proba: bool, model: ModelVersion) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Combine pre-filter verdicts with NFStream model predictions.
+        
+        Flows in `mask` are labelled BENIGN; the rest (plus a small audit sample of
+        the short-circuited flows) are scored by the forest.
+        
+        Args:
+            df: DataFrame with NFStream-extracted features
+            mask: Flows short-circuited by the pre-filter
+            rule_index: Matching rule per flow
+            return_proba: If True, also return prediction probabilities
+            model: NFStream model bundle
+        
+        Returns:
+            Array of predicted class labels (and probabilities if requested).
+        """
+        classes = list(model.model.classes_)
+        if 'BENIGN' not in classes:
+            return self._predict_nfstream_model(df, return_proba, model)
+        benign_index = classes.index('BENIGN')
+        
+        audit = self.prefilter.audit_sample(mask)
+        model_rows = np.flatnonzero(~mask)
+        scored = np.concatenate([model_rows, audit])
+        
+        predictions = np.full(len(df), 'BENIGN', dtype=object)
+        probabilities = np.zeros((len(df), len(classes)))
+        probabilities[mask, benign_index] = 1.0
+        
+        if len(scored):
+            result = self._predict_nfstream_model(df.iloc[scored], return_proba, model)
+            model_predictions, model_proba = result if return_proba else (result, None)
+            
+            n_model = len(model_rows)
+            predictions[model_rows] = model_predictions[:n_model]
+            if return_proba:
+                probabilities[model_rows] = model_proba[:n_model]
+            if len(audit):
+                self.prefilter.record_audit(rule_index[audit], model_predictions[n_model:] == 'BENIGN')
+        
+        predictions = predictions.astype(np.asarray(model.model.classes_).dtype)
+        if return_proba:
+            return predictions, probabilities
+        return predictions
+    
+    def configure_early_exit(self, enabled: bool = True, block_size: int = 8,
+                             delta: Optional[float] = None, min_trees: int = 0,
+                             models: Tuple[str, ...] = EARLY_EXIT_MODELS):
+        """
+        Configure early-exit tree evaluation for the binary forests.
+        
+        With delta=None rows only stop once the remaining trees cannot change the
+        decision, so predictions are identical to the full forest. A delta allows
+        stopping once the decision holds with probability >= 1 - delta.
+        
+        Args:
+            enabled: Turn early exit on or off
+            block_size: Trees evaluated between exit checks
+            delta: Confidence bound for bounded exit (None = exact only)
+            min_trees: Trees always evaluated before any exit check
+            models: Model keys that use early exit
+        """
+        self._early_exit = {}
+        self.early_exit_config = {
+            'block_size': block_size,
+            'delta': delta,
+            'min_trees': min_trees,
+            'models': tuple(models),
+        } if enabled else None
+    
+    def _early_exit_forest(self, model, model_key: str) -> Optional[EarlyExitForest]:
+        """Early-exit wrapper for a model, or None if disabled or unsupported."""
+        config = self.early_exit_config
+        if config is None or model_key not in config['models']:
+            return None
+        forest = self._early_exit.get(model_key)
+        if forest is None or forest.model is not model:
+            if not supports_early_exit(model):
+                return None
+            forest = EarlyExitForest(
+                model, block_size=config['block_size'], delta=config['delta'],
+                min_trees=config['min_trees'], model_key=model_key
+            )
+            self._early_exit[model_key] = forest
+        return forest
+    
+    def early_exit_stats(self) -> dict:
+        """Fraction of trees evaluated per model in early-exit mode."""
+        return {key: forest.stats() for key, forest in self._early_exit.items()}
+    
+    def _observe_alignment(self, model_key: str, start: float):
+        """Record feature alignment time for a model (metrics + active profiler)."""
+        elapsed = time.perf_counter() - start
+        ALIGNMENT_SECONDS.labels(model=model_key).observe(elapsed)
+        record_stage('alignment', elapsed)
+    
+    def _run_model(self, model, X: pd.DataFrame, return_proba: bool, model_key: str,
+                   version: Optional[str] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Run a loaded model on an aligned feature matrix and record inference metrics.
+        
+        Args:
+            model: Fitted scikit-learn estimator
+            X: Feature matrix in the model's training column order
+            return_proba: If True, also return prediction probabilities
+            model_key: Model name used as the metrics label
+            version: Artifact version for telemetry (default: the version recorded at load)
+        
+        Returns:
+            Array of predicted class labels (and probabilities if requested).
+        """
+        BATCH_SIZE.labels(model=model_key).observe(len(X))
+        
+        start = time.perf_counter()
+        early_exit = self._early_exit_forest(model, model_key)
+        if early_exit is not None:
+            predictions, probabilities = early_exit.predict(X, return_proba=True)
+        elif hasattr(model, 'classes_') and hasattr(model, 'predict_proba'):
+            # One pass: a forest's predict() is the argmax of its predict_proba(),
+            # so confidence telemetry costs nothing extra
+            probabilities = model.predict_proba(X)
+            predictions = np.asarray(model.classes_)[np.argmax(probabilities, axis=1)]
+        else:
+            predictions = model.predict(X)
+            probabilities = model.predict_proba(X) if return_proba else None
+        
+        elapsed = time.perf_counter() - start
+        INFERENCE_SECONDS.labels(model=model_key).observe(elapsed)
+        INFERENCE_ROWS.labels(model=model_key).inc(len(X))
+        record_stage('predict', elapsed)
+        
+        if version is None:
+            version = self._artifacts.get(model_key, {}).get('version')
+        self.telemetry.record(model_key, version, predictions, probabilities, elapsed)
         
         if return_proba:
-            probabilities = self.robust_binary_model.predict_proba(X)
             return predictions, probabilities
         
         return predictions
-
+    
     
     def get_summary(self, predictions: np.ndarray) -> dict:
         """
@@ -0,0 +1,330 @@
+"""
+Pre-filter Module
+Cheap rule-based stage that short-circuits clearly benign flows before the
+Random Forest.
+
+Each rule is a conjunction of threshold checks on NFStream features (plus a
+few derived rates), evaluated column-wise over the whole batch. A flow that
+matches any rule is labelled BENIGN without running the forest; everything
+else goes to the full model. Per-rule hit rates are tracked, and a small
+random share of short-circuited flows is also scored by the full model
+("audit") so agreement is measured continuously in production.
+
+Rules are only as good as their agreement with the model, so the stage is
+opt-in (NETWORK_AI_PREFILTER=1, or a JSON rules file via
+NETWORK_AI_PREFILTER_RULES). Check a rule set offline first with:
+
+    python src/prefilter.py capture.pcap [rules.json]
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .metrics import PREFILTER_FLOWS
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.metrics import PREFILTER_FLOWS
+
+
+PREFILTER_ENV_VAR = "NETWORK_AI_PREFILTER"
+PREFILTER_RULES_ENV_VAR = "NETWORK_AI_PREFILTER_RULES"
+
+# Well-known client/server services whose normal sessions dominate live traffic
+SERVICE_PORTS = [53, 80, 123, 443, 853, 993, 995, 587, 5353]
+
+# Rates derived from NFStream columns (usable in rule conditions)
+DERIVED_FEATURES: Dict[str, Callable[[pd.DataFrame], np.ndarray]] = {
+    'packets_per_second': lambda df: _column(df, 'bidirectional_packets')
+        / np.maximum(_column(df, 'bidirectional_duration_ms') / 1000.0, 1e-3),
+    'bytes_per_second': lambda df: _column(df, 'bidirectional_bytes')
+        / np.maximum(_column(df, 'bidirectional_duration_ms') / 1000.0, 1e-3),
+    'rst_packets': lambda df: _column(df, 'src2dst_rst_packets') + _column(df, 'dst2src_rst_packets'),
+}
+
+_OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    'in': lambda values, options: np.isin(values, options),
+    'not in': lambda values, options: ~np.isin(values, options),
+}
+
+
+def _column(df: pd.DataFrame, name: str) -> Optional[np.ndarray]:
+    """Numeric column as float array, or None if the frame lacks it."""
+    if name in DERIVED_FEATURES:
+        try:
+            return DERIVED_FEATURES[name](df)
+        except TypeError:
+            return None
+    if name not in df.columns:
+        return None
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+
+
+@dataclass
+class PrefilterRule:
+    """A named conjunction of (feature, operator, value) conditions."""
+    name: str
+    conditions: List[Tuple[str, str, Any]] = field(default_factory=list)
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of flows matching every condition (False if a feature is missing)."""
+        mask = np.ones(len(df), dtype=bool)
+        for feature, op, value in self.conditions:
+            values = _column(df, feature)
+            if values is None:
+                return np.zeros(len(df), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                mask &= _OPERATORS[op](values, value)
+        return mask
+
+
+DEFAULT_RULES = [
+    # Single request/response exchanges with DNS/NTP/mDNS
+    PrefilterRule('short_udp_service', [
+        ('dst_port', 'in', [53, 123, 5353]),
+        ('bidirectional_packets', '<=', 4),
+        ('dst2src_packets', '>=', 1),
+        ('src2dst_bytes', '<=', 512),
+    ]),
+    # Completed, low-rate TCP sessions to well-known services
+    PrefilterRule('established_low_rate', [
+        ('dst_port', 'in', SERVICE_PORTS),
+        ('src2dst_syn_packets', '<=', 1),
+        ('rst_packets', '==', 0),
+        ('src2dst_packets', '>=', 3),
+        ('dst2src_packets', '>=', 3),
+        ('dst2src_ack_packets', '>=', 1),
+        ('bidirectional_duration_ms', '>=', 1000),
+        ('packets_per_second', '<=', 50),
+    ]),
+]
+
+
+class BenignPrefilter:
+    """
+    Vectorized benign short-circuit stage with hit-rate and agreement tracking.
+
+    Usage:
+        prefilter = BenignPrefilter(enabled=True)
+        mask, rule_index = prefilter.screen(df)   # mask = short-circuited flows
+        prefilter.stats()
+    """
+
+    def __init__(self, rules: Optional[List[PrefilterRule]] = None, enabled: bool = False,
+                 audit_fraction: float = 0.01, seed: Optional[int] = None):
+        """
+        Initialize the pre-filter.
+
+        Args:
+            rules: Rules to apply in order (defaults to DEFAULT_RULES)
+            enabled: Whether screen() short-circuits anything
+            audit_fraction: Share of short-circuited flows also scored by the model
+            seed: Random seed for audit sampling
+        """
+        self.rules = list(rules) if rules is not None else list(DEFAULT_RULES)
+        self.enabled = enabled
+        self.audit_fraction = audit_fraction
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @classmethod
+    def from_env(cls) -> "BenignPrefilter":
+        """Build from NETWORK_AI_PREFILTER / NETWORK_AI_PREFILTER_RULES."""
+        rules_path = os.getenv(PREFILTER_RULES_ENV_VAR)
+        flag = os.getenv(PREFILTER_ENV_VAR)
+        # A rules file enables the stage unless the flag explicitly turns it off
+        enabled = flag.lower() in ("1", "true", "yes", "on") if flag else bool(rules_path)
+        prefilter = cls.from_file(rules_path) if rules_path else cls()
+        prefilter.enabled = enabled
+        return prefilter
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], **kwargs) -> "BenignPrefilter":
+        """
+        Load rules from JSON:
+            {"rules": [{"name": "...", "conditions": [["dst_port", "in", [53]], ...]}],
+             "audit_fraction": 0.01}
+        """
+        with open(path) as f:
+            config = json.load(f)
+        rules = [
+            PrefilterRule(rule['name'], [tuple(c) for c in rule['conditions']])
+            for rule in config.get('rules', [])
+        ]
+        for rule in rules:
+            for _, op, _ in rule.conditions:
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unknown operator '{op}' in rule '{rule.name}'")
+        kwargs.setdefault('audit_fraction', config.get('audit_fraction', 0.01))
+        return cls(rules, enabled=True, **kwargs)
+
+    def reset_stats(self):
+        with self._lock:
+            self.flows_seen = 0
+            self.flows_to_model = 0
+            self.rule_hits = {rule.name: 0 for rule in self.rules}
+            self.audited = {rule.name: 0 for rule in self.rules}
+            self.audit_disagreements = {rule.name: 0 for rule in self.rules}
+
+    def match(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Index of the first matching rule per flow (-1 if none), regardless of `enabled`.
+
+        Args:
+            df: Raw NFStream feature frame
+        """
+        rule_index = np.full(len(df), -1, dtype=np.int16)
+        for i, rule in enumerate(self.rules):
+            unassigned = rule_index < 0
+            if not unassigned.any():
+                break
+            rule_index[unassigned & rule.evaluate(df)] = i
+        return rule_index
+
+    def screen(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decide which flows skip the model and record hit counts.
+
+        Returns:
+            (short-circuit mask, rule index per flow)
+        """
+        if not self.enabled or not self.rules or len(df) == 0:
+            return np.zeros(len(df), dtype=bool), np.full(len(df), -1, dtype=np.int16)
+
+        rule_index = self.match(df)
+        mask = rule_index >= 0
+        hits = np.bincount(rule_index[mask], minlength=len(self.rules))
+        with self._lock:
+            self.flows_seen += len(df)
+            self.flows_to_model += int((~mask).sum())
+            for rule, count in zip(self.rules, hits):
+                self.rule_hits[rule.name] += int(count)
+        for rule, count in zip(self.rules, hits):
+            if count:
+                PREFILTER_FLOWS.labels(stage=rule.name).inc(int(count))
+        PREFILTER_FLOWS.labels(stage='model').inc(int((~mask).sum()))
+        return mask, rule_index
+
+    def audit_sample(self, mask: np.ndarray) -> np.ndarray:
+        """Positions of short-circuited flows to also score with the model."""
+        positions = np.flatnonzero(mask)
+        if self.audit_fraction <= 0 or len(positions) == 0:
+            return positions[:0]
+        keep = self._rng.random(len(positions)) < self.audit_fraction
+        return positions[keep]
+
+    def record_audit(self, rule_index: np.ndarray, model_benign: np.ndarray):
+        """Record model verdicts for audited flows (rule index and model==BENIGN per flow)."""
+        with self._lock:
+            for i, rule in enumerate(self.rules):
+                selected = rule_index == i
+                n = int(selected.sum())
+                if n:
+                    self.audited[rule.name] += n
+                    self.audit_disagreements[rule.name] += int((~model_benign[selected]).sum())
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage hit rates and audit agreement."""
+        with self._lock:
+            seen = max(self.flows_seen, 1)
+            stages = {}
+            for rule in self.rules:
+                audited = self.audited[rule.name]
+                stages[rule.name] = {
+                    'hits': self.rule_hits[rule.name],
+                    'hit_rate': round(self.rule_hits[rule.name] / seen, 4),
+                    'audited': audited,
+                    'agreement': round(1 - self.audit_disagreements[rule.name] / audited, 4) if audited else None,
+                }
+            stages['model'] = {
+                'hits': self.flows_to_model,
+                'hit_rate': round(self.flows_to_model / seen, 4),
+            }
+            return {
+                'enabled': self.enabled,
+                'flows_seen': self.flows_seen,
+                'short_circuit_rate': round(1 - self.flows_to_model / seen, 4) if self.flows_seen else 0.0,
+                'audit_fraction': self.audit_fraction,
+                'stages': stages,
+            }
+
+
+def validate_prefilter(prefilter: BenignPrefilter, predict_fn: Callable[[pd.DataFrame], np.ndarray],
+                       df: pd.DataFrame, benign_label: str = 'BENIGN') -> Dict[str, Any]:
+    """
+    Measure agreement between the pre-filter and the full model on a labelled-by-model frame.
+
+    Every flow is scored by the model; for each rule, reports how many flows it
+    would short-circuit and how many of those the model flags as attacks.
+
+    Args:
+        prefilter: Pre-filter to check (its `enabled` flag is ignored)
+        predict_fn: Full-model prediction function (e.g. predictor.predict_nfstream)
+        df: NFStream feature frame
+        benign_label: Label the pre-filter assigns
+
+    Returns:
+        Dictionary with per-rule hit rates, agreement and missed attacks.
+    """
+    predictions = np.asarray(predict_fn(df))
+    model_benign = predictions == benign_label
+    rule_index = prefilter.match(df)
+    n = max(len(df), 1)
+
+    rules = {}
+    for i, rule in enumerate(prefilter.rules):
+        selected = rule_index == i
+        hits = int(selected.sum())
+        missed = predictions[selected & ~model_benign]
+        labels, counts = np.unique(missed, return_counts=True)
+        rules[rule.name] = {
+            'hits': hits,
+            'hit_rate': round(hits / n, 4),
+            'agreement': round(float(model_benign[selected].mean()), 4) if hits else None,
+            'missed_attacks': {str(label): int(count) for label, count in zip(labels, counts)},
+        }
+
+    short_circuited = rule_index >= 0
+    return {
+        'flows': len(df),
+        'model_benign_rate': round(float(model_benign.mean()), 4) if len(df) else 0.0,
+        'short_circuit_rate': round(float(short_circuited.mean()), 4) if len(df) else 0.0,
+        'agreement': round(float(model_benign[short_circuited].mean()), 4) if short_circuited.any() else None,
+        'rules': rules,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python src/prefilter.py <capture.pcap> [rules.json]")
+        sys.exit(1)
+
+    from src.feature_extractor import PCAPFeatureExtractor
+    from src.predictor import NetworkThreatPredictor
+
+    prefilter = BenignPrefilter.from_file(sys.argv[2]) if len(sys.argv) > 2 else BenignPrefilter()
+    predictor = NetworkThreatPredictor()
+    predictor.prefilter = None  # Score every flow with the full model
+
+    flows = PCAPFeatureExtractor().extract_nfstream_features(sys.argv[1])
+    report = validate_prefilter(prefilter, predictor.predict_nfstream, flows)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,222 @@
+"""
+Prefix Index Module
+Longest-prefix-match lookups of IP addresses against CIDR lists.
+
+Prefixes are flattened into sorted, non-overlapping address ranges, each
+owned by the longest prefix covering it, so a lookup is one binary search
+(np.searchsorted) regardless of how many prefixes are loaded or how they nest.
+IPv4 and IPv6 are kept in separate tables; IPv4 lookups over packed uint32
+columns (see flow_table.py) are fully vectorized, string and categorical
+columns are resolved once per distinct address.
+
+Storage is numpy arrays only - about 35 bytes per IPv4 prefix - so lists of
+hundreds of thousands of CIDRs stay small, and IPv4 CIDR text is parsed in
+bulk rather than one ipaddress object at a time.
+
+Usage:
+    index = PrefixIndex(['10.0.0.0/8', ('10.1.0.0/16', 'lab')])
+    index.lookup('10.1.2.3')                    # 'lab'
+    index.contains_many(df['src_ip'])           # bool array
+"""
+
+import ipaddress
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+PrefixEntry = Union[str, Tuple[str, Any]]
+
+IPV4_MAX = 2**32 - 1
+
+
+class _RangeTable:
+    """Elementary address ranges of one IP family and the prefix owning each."""
+
+    def __init__(self, first, last, plen: np.ndarray, entries: np.ndarray, dtype, max_value: int):
+        """
+        Args:
+            first, last: First/last address of each prefix
+            plen: Prefix lengths
+            entries: Entry number of each prefix
+            dtype: np.uint32 for IPv4, object (Python ints) for IPv6
+            max_value: Largest address of the family
+        """
+        self.dtype = dtype
+        if len(entries) == 0:
+            self.points = np.zeros(0, dtype=dtype)
+            self.owner = np.zeros(0, dtype=np.int32)
+            return
+        first = np.asarray(first, dtype=dtype)
+        last = np.asarray(last, dtype=dtype)
+        # Range boundaries: each prefix start and the address after its end
+        ends = [value + 1 for value in last.tolist() if value < max_value]
+        self.points = np.unique(np.concatenate([first, np.array(ends, dtype=dtype)]))
+        self.owner = np.full(len(self.points), -1, dtype=np.int32)
+
+        lo = np.searchsorted(self.points, first)
+        hi = np.array([
+            len(self.points) if value == max_value else np.searchsorted(self.points, value + 1)
+            for value in last.tolist()
+        ], dtype=np.int64) if dtype is object else np.where(
+            last == max_value, len(self.points),
+            np.searchsorted(self.points, np.minimum(last.astype(np.uint64) + 1, max_value).astype(dtype))
+        )
+        # Paint shorter prefixes first; prefixes of one length never overlap,
+        # so each length is painted in one vectorized step
+        for length in np.unique(plen):
+            level = np.flatnonzero(plen == length)
+            counts = (hi[level] - lo[level]).astype(np.int64)
+            if counts.sum() == 0:
+                continue
+            starts = np.repeat(lo[level].astype(np.int64), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            self.owner[starts + offsets] = np.repeat(entries[level], counts)
+
+    def lookup(self, addresses: np.ndarray) -> np.ndarray:
+        if len(self.points) == 0:
+            return np.full(len(addresses), -1, dtype=np.int32)
+        positions = np.searchsorted(self.points, addresses, side='right') - 1
+        result = self.owner[np.maximum(positions, 0)]
+        result[positions < 0] = -1
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.points.nbytes + self.owner.nbytes) if self.dtype is not object else \
+            int(self.owner.nbytes + 36 * len(self.points))
+
+
+def _parse_ipv4_cidrs(cidrs: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized parse of 'a.b.c.d[/n]' strings -> (network, prefix length, valid mask)."""
+    address, _, length = cidrs.str.strip().str.partition('/').T.to_numpy()
+    octets = pd.Series(address).str.split('.', expand=True)
+    extra = octets.iloc[:, 4:].notna().any(axis=1)
+    numeric = octets.reindex(columns=range(4)).apply(pd.to_numeric, errors='coerce')
+    plen = pd.to_numeric(pd.Series(length).replace('', '32'), errors='coerce')
+    valid = (numeric.notna().all(axis=1) & ((numeric >= 0) & (numeric <= 255)).all(axis=1)
+             & plen.between(0, 32) & ~extra).to_numpy(copy=True)
+    parts = numeric.fillna(0).clip(0, 255).to_numpy(dtype=np.int64)
+    plen = plen.where(valid, 32).to_numpy(dtype=np.int64)
+    network = (parts[:, 0] << 24) | (parts[:, 1] << 16) | (parts[:, 2] << 8) | parts[:, 3]
+    mask = np.where(plen == 0, 0, (IPV4_MAX << (32 - plen)) & IPV4_MAX)
+    return (network & mask).astype(np.uint32), plen.astype(np.uint8), valid
+
+
+class PrefixIndex:
+    """
+    CIDR set with an optional value per prefix.
+
+    Entries are CIDR strings ('10.0.0.0/8', '2001:db8::/32', or a bare address
+    for a /32 or /128) or (cidr, value) pairs. Invalid entries raise ValueError
+    (or are skipped and counted in `invalid` with strict=False).
+    """
+
+    def __init__(self, entries: Iterable[PrefixEntry] = (), strict: bool = True):
+        cidrs, values = [], []
+        for entry in entries:
+            cidr, value = entry if isinstance(entry, tuple) else (entry, None)
+            cidrs.append(str(cidr))
+            values.append(value)
+        self.values: Optional[List[Any]] = values if any(v is not None for v in values) else None
+        self.invalid = 0
+
+        n = len(cidrs)
+        self._is_v6 = np.zeros(n, dtype=bool)
+        self._plen = np.zeros(n, dtype=np.uint8)
+        self._v4_network = np.zeros(n, dtype=np.uint32)
+        self._v6_network = {}  # entry -> int (IPv6 entries only)
+        valid = np.zeros(n, dtype=bool)
+
+        if n:
+            network, plen, valid = _parse_ipv4_cidrs(pd.Series(cidrs, dtype=object))
+            self._v4_network[valid] = network[valid]
+            self._plen[valid] = plen[valid]
+            for i in np.flatnonzero(~valid):
+                try:
+                    parsed = ipaddress.ip_network(cidrs[i].strip(), strict=False)
+                except ValueError:
+                    if strict:
+                        raise ValueError(f"Invalid address or CIDR '{cidrs[i]}'")
+                    self.invalid += 1
+                    continue
+                valid[i] = True
+                self._plen[i] = parsed.prefixlen
+                if parsed.version == 4:
+                    self._v4_network[i] = int(parsed.network_address)
+                else:
+                    self._is_v6[i] = True
+                    self._v6_network[int(i)] = int(parsed.network_address)
+        self._valid = valid
+
+        v4 = np.flatnonzero(valid & ~self._is_v6)
+        v4_plen = self._plen[v4].astype(np.int64)
+        v4_first = self._v4_network[v4]
+        v4_last = (v4_first.astype(np.int64) | ((1 << (32 - v4_plen)) - 1)).astype(np.uint32)
+        self._v4 = _RangeTable(v4_first, v4_last, v4_plen, v4.astype(np.int32), np.uint32, IPV4_MAX)
+
+        v6 = sorted(self._v6_network)
+        v6_first = [self._v6_network[i] for i in v6]
+        v6_last = [first | ((1 << (128 - int(self._plen[i]))) - 1) for first, i in zip(v6_first, v6)]
+        self._v6 = _RangeTable(v6_first, v6_last, self._plen[v6], np.array(v6, dtype=np.int32),
+                               object, 2**128 - 1)
+
+    def __len__(self) -> int:
+        return int(self._valid.sum())
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index arrays."""
+        per_entry = self._is_v6.nbytes + self._plen.nbytes + self._v4_network.nbytes + self._valid.nbytes
+        return int(per_entry + self._v4.nbytes + self._v6.nbytes + 64 * len(self._v6_network))
+
+    def prefix(self, entry: int) -> str:
+        """CIDR text of an entry."""
+        if self._is_v6[entry]:
+            return f"{ipaddress.IPv6Address(self._v6_network[entry])}/{self._plen[entry]}"
+        return f"{ipaddress.IPv4Address(int(self._v4_network[entry]))}/{self._plen[entry]}"
+
+    def value(self, entry: int) -> Optional[Any]:
+        return self.values[entry] if self.values is not None and entry >= 0 else None
+
+    def _entry_of(self, address: str) -> int:
+        try:
+            ip = ipaddress.ip_address(str(address).strip())
+        except ValueError:
+            return -1
+        if ip.version == 4:
+            return int(self._v4.lookup(np.array([int(ip)], dtype=np.uint32))[0])
+        return int(self._v6.lookup(np.array([int(ip)], dtype=object))[0])
+
+    def lookup_entries(self, addresses) -> np.ndarray:
+        """
+        Entry number of the longest matching prefix per address (-1 = no match).
+
+        Args:
+            addresses: Packed uint32 IPv4 column, categorical column, or
+                       any sequence of address strings
+        """
+        if isinstance(addresses, pd.Series) and isinstance(addresses.dtype, pd.CategoricalDtype):
+            per_category = np.array([self._entry_of(c) for c in addresses.cat.categories] + [-1], dtype=np.int32)
+            return per_category[addresses.cat.codes.to_numpy()]  # code -1 (missing) hits the trailing -1
+
+        values = addresses.to_numpy() if isinstance(addresses, pd.Series) else np.asarray(addresses)
+        if values.dtype == np.uint32:
+            return self._v4.lookup(values)
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int32)
+        codes, uniques = pd.factorize(values)
+        per_unique = np.array([self._entry_of(u) for u in uniques] + [-1], dtype=np.int32)
+        return per_unique[codes]
+
+    def contains_many(self, addresses) -> np.ndarray:
+        """Whether each address falls in any prefix."""
+        return self.lookup_entries(addresses) >= 0
+
+    def lookup(self, address: str) -> Optional[Any]:
+        """Value of the longest prefix containing `address` (None if none match)."""
+        return self.value(self._entry_of(address))
+
+    def __contains__(self, address: str) -> bool:
+        return self._entry_of(address) >= 0
@@ -0,0 +1,245 @@
+"""
+Profiling Module
+Opt-in profiling hooks for PCAP analysis runs.
+
+A PipelineProfiler records per-stage wall time (extraction, mapping, alignment,
+inference, summary, serialization), a sampling CPU profile of the analysing
+thread and the top tracemalloc allocations. Pipeline code reports stages through
+the module-level `stage()` / `record_stage()` helpers, which are no-ops unless a
+profiler is active, so the hooks cost nothing when profiling is off.
+
+Enable per call (`analyze_pcap(..., profile=True)`), per API request
+(`"profile": true`) or globally with NETWORK_AI_PROFILE=1.
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+
+PROFILE_ENV_VAR = "NETWORK_AI_PROFILE"
+
+_active_profiler: contextvars.ContextVar = contextvars.ContextVar("active_profiler", default=None)
+
+
+def profiling_enabled(requested: Optional[bool] = None) -> bool:
+    """Resolve whether profiling is on for a run (explicit flag wins over env var)."""
+    if requested is not None:
+        return bool(requested)
+    return os.getenv(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+
+def active_profiler() -> Optional["PipelineProfiler"]:
+    """Get the profiler active in the current context, if any."""
+    return _active_profiler.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage on the active profiler (no-op when profiling is off)."""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def record_stage(name: str, seconds: float):
+    """Record an already-measured stage duration on the active profiler."""
+    profiler = _active_profiler.get()
+    if profiler is not None:
+        profiler.record(name, seconds)
+
+
+class _SamplingProfiler:
+    """
+    Statistical CPU profiler for one thread.
+
+    A daemon thread snapshots the target thread's stack every `interval` seconds
+    via sys._current_frames() and counts leaf ("self") and on-stack
+    ("cumulative") functions. Overhead is proportional to the sample rate,
+    not to the amount of work being profiled.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.cumulative_counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="pipeline-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{Path(code.co_filename).name}:{code.co_name}:{code.co_firstlineno}"
+                if leaf:
+                    self.self_counts[key] += 1
+                    leaf = False
+                if key not in seen:
+                    self.cumulative_counts[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+
+    def report(self, top_n: int) -> Dict:
+        def _top(counts: Counter) -> List[Dict]:
+            return [
+                {
+                    'function': key,
+                    'samples': count,
+                    'percentage': round(count / self.samples * 100, 2) if self.samples else 0.0,
+                }
+                for key, count in counts.most_common(top_n)
+            ]
+
+        return {
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'self': _top(self.self_counts),
+            'cumulative': _top(self.cumulative_counts),
+        }
+
+
+class PipelineProfiler:
+    """
+    Collects stage timings, a sampling CPU profile and allocation statistics
+    for one analysis run.
+
+    Usage:
+        with PipelineProfiler() as profiler:
+            with profiler.stage('extraction'):
+                ...
+        report = profiler.report()
+    """
+
+    def __init__(self, sample_interval: float = 0.005, top_n: int = 20,
+                 trace_memory: bool = True):
+        """
+        Initialize the profiler.
+
+        Args:
+            sample_interval: Seconds between CPU stack samples
+            top_n: Number of functions / allocation sites to report
+            trace_memory: Whether to record tracemalloc allocation statistics
+        """
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.trace_memory = trace_memory
+
+        self.stages: Dict[str, float] = {}
+        self._stack: List[str] = []
+        self._sampler: Optional[_SamplingProfiler] = None
+        self._token = None
+        self._started_tracemalloc = False
+        self._start_time = None
+        self._total_seconds = None
+        self._allocations: List[Dict] = []
+        self._peak_memory_mb = None
+
+    def __enter__(self) -> "PipelineProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Activate the profiler for the current context and start sampling."""
+        self._token = _active_profiler.set(self)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._sampler = _SamplingProfiler(threading.get_ident(), self.sample_interval)
+        self._sampler.start()
+        self._start_time = time.perf_counter()
+
+    def stop(self):
+        """Stop sampling, snapshot allocations and deactivate the profiler."""
+        if self._start_time is None or self._total_seconds is not None:
+            return
+        self._total_seconds = time.perf_counter() - self._start_time
+        if self._sampler is not None:
+            self._sampler.stop()
+
+        if self.trace_memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            self._peak_memory_mb = round(peak / 1024**2, 2)
+            self._allocations = [
+                {
+                    'location': f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+                    'size_mb': round(stat.size / 1024**2, 3),
+                    'count': stat.count,
+                }
+                for stat in snapshot.statistics('lineno')[:self.top_n]
+            ]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+        if self._token is not None:
+            _active_profiler.reset(self._token)
+            self._token = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a (possibly nested) stage; nested stages are reported as 'outer/inner'."""
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self.stages[path] = self.stages.get(path, 0.0) + time.perf_counter() - start
+
+    def record(self, name: str, seconds: float):
+        """Add a measured duration under the current stage."""
+        path = "/".join(self._stack + [name])
+        self.stages[path] = self.stages.get(path, 0.0) + seconds
+
+    def report(self) -> Dict:
+        """Build the profile report (stops the profiler if still running)."""
+        self.stop()
+        return {
+            'total_seconds': round(self._total_seconds or 0.0, 4),
+            'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'cpu': self._sampler.report(self.top_n) if self._sampler else None,
+            'memory': {
+                'peak_traced_mb': self._peak_memory_mb,
+                'top_allocations': self._allocations,
+            } if self.trace_memory else None,
+        }
+
+    def save(self, path: Union[str, Path]) -> str:
+        """Write the report as JSON."""
+        path = Path(path)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return str(path)
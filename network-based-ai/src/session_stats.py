@@ -0,0 +1,165 @@
+"""
+Session Stats Module
+Flow counters for a monitoring session, updated once per batch.
+
+The capture thread records each classified batch with vectorized counts
+(np.unique over the predicted labels) instead of one dict update per flow.
+After every update a new immutable snapshot is built and swapped in with a
+single reference assignment, so API handlers read consistent totals (total =
+benign + attack + shed, class counts matching attack_flows) without taking
+the writer's lock.
+
+Rates are windowed: `flows_per_second` and `attacks_per_second` cover the last
+`rate_window` seconds rather than the lifetime average, so they drop back when
+traffic does.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+
+# A snapshot older than this is refreshed on read so idle rates decay
+SNAPSHOT_MAX_AGE = 1.0
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "total_flows": 0,
+        "benign_flows": 0,
+        "attack_flows": 0,
+        "shed_flows": 0,
+        "excluded_flows": 0,
+        "flows_per_second": 0.0,
+        "attacks_per_second": 0.0,
+        "class_counts": {},
+    }
+
+
+class SessionStats:
+    """
+    Batch-updated counters with snapshot reads.
+
+    Usage:
+        stats = SessionStats(rate_window=60)
+        first_index = stats.record_batch(predictions, shed=3)   # capture thread
+        stats.snapshot()["attack_flows"]                        # any thread
+    """
+
+    def __init__(self, rate_window: int = 60, benign_label: str = 'BENIGN'):
+        """
+        Initialize counters.
+
+        Args:
+            rate_window: Seconds covered by the flows/attacks per second rates
+            benign_label: Prediction label counted as benign
+        """
+        self.rate_window = rate_window
+        self.benign_label = benign_label
+
+        self._lock = threading.Lock()
+        self._total = 0
+        self._benign = 0
+        self._attack = 0
+        self._shed = 0
+        self._excluded = 0
+        self._class_counts: Dict[str, int] = {}
+        # (second, flows, attacks) for the rate window, oldest first
+        self._seconds: "deque[list]" = deque()
+        self._started: Optional[float] = None
+
+        self._snapshot: Dict[str, Any] = dict(empty_stats(), rate_window_seconds=rate_window)
+        self._published_at = time.monotonic()
+
+    def record_batch(self, predictions: Iterable[str], shed: int = 0, excluded: int = 0,
+                     now: Optional[float] = None) -> int:
+        """
+        Count a batch of classified flows plus flows skipped by overload control.
+
+        Args:
+            predictions: Predicted label per classified flow
+            shed: Flows in the batch that were not classified
+            excluded: Flows dropped by the traffic policy (not part of total_flows)
+            now: Time of the batch on the time.monotonic() clock (default: now)
+
+        Returns:
+            Running flow number of the batch's first classified flow (1-based,
+            shed flows counted first), for numbering threats
+        """
+        labels = np.asarray(predictions if predictions is not None else [], dtype=object)
+        if len(labels):
+            classes, counts = np.unique(labels.astype(str), return_counts=True)
+        else:
+            classes, counts = np.array([], dtype=str), np.array([], dtype=np.int64)
+        n_benign = int(counts[classes == self.benign_label].sum())
+        n_classified = int(counts.sum())
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            first_index = self._total + shed + 1
+            self._total += n_classified + shed
+            self._shed += shed
+            self._excluded += excluded
+            self._benign += n_benign
+            self._attack += n_classified - n_benign
+            for label, count in zip(classes.tolist(), counts.tolist()):
+                self._class_counts[label] = self._class_counts.get(label, 0) + count
+
+            if self._started is None:
+                self._started = now
+            second = int(now)
+            if self._seconds and self._seconds[-1][0] == second:
+                self._seconds[-1][1] += n_classified + shed
+                self._seconds[-1][2] += n_classified - n_benign
+            else:
+                self._seconds.append([second, n_classified + shed, n_classified - n_benign])
+            self._publish(now)
+        return first_index
+
+    def _publish(self, now: float):
+        """Build and swap in a new snapshot (caller holds the lock)."""
+        while self._seconds and self._seconds[0][0] <= now - self.rate_window:
+            self._seconds.popleft()
+        span = min(self.rate_window, max(now - self._started, 1.0)) if self._started is not None else 1.0
+        flows = sum(entry[1] for entry in self._seconds)
+        attacks = sum(entry[2] for entry in self._seconds)
+        self._snapshot = {
+            "total_flows": self._total,
+            "benign_flows": self._benign,
+            "attack_flows": self._attack,
+            "shed_flows": self._shed,
+            "excluded_flows": self._excluded,
+            "flows_per_second": round(flows / span, 2),
+            "attacks_per_second": round(attacks / span, 2),
+            "class_counts": dict(self._class_counts),
+            "rate_window_seconds": self.rate_window,
+        }
+        self._published_at = now
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the counters (refreshed if no batch arrived recently)."""
+        now = time.monotonic()
+        if now - self._published_at > SNAPSHOT_MAX_AGE and self._started is not None:
+            with self._lock:
+                if now - self._published_at > SNAPSHOT_MAX_AGE:
+                    self._publish(now)
+        snapshot = self._snapshot
+        return dict(snapshot, class_counts=dict(snapshot["class_counts"]))
+
+
+def merge_stats(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum of several sessions' snapshots."""
+    totals = empty_stats()
+    for snapshot in snapshots:
+        for key, value in snapshot.items():
+            if key == "class_counts":
+                for label, count in value.items():
+                    totals["class_counts"][label] = totals["class_counts"].get(label, 0) + count
+            elif key in totals:
+                totals[key] += value
+    totals["flows_per_second"] = round(totals["flows_per_second"], 2)
+    totals["attacks_per_second"] = round(totals["attacks_per_second"], 2)
+    return totals
@@ -0,0 +1,287 @@
+"""
+Monitoring Sessions Module
+Registry of concurrent real-time monitoring sessions.
+
+Each MonitoringSession owns its capture thread, stop flag, statistics, threat
+store and traffic summaries, so several interfaces can be monitored at once.
+The SessionManager tracks sessions by session_id and provides a shared
+inference worker pool used by all capture threads. Each session also has an
+OverloadController that sheds or samples flows when inference falls behind.
+"""
+
+import heapq
+import itertools
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .traffic_stats import TrafficStatsEngine, SessionSummary
+    from .time_buckets import TimeBucketAccumulator
+    from .overload import OverloadController
+    from .session_stats import SessionStats, merge_stats
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.traffic_stats import TrafficStatsEngine, SessionSummary
+    from src.time_buckets import TimeBucketAccumulator
+    from src.overload import OverloadController
+    from src.session_stats import SessionStats, merge_stats
+
+
+class MonitoringSession:
+    """State of one capture session on one interface (or one followed capture directory)."""
+
+    def __init__(self, session_id: str, interface: str, display_name: str, duration: int,
+                 traffic_window: int = 300, heavy_hitter_capacity: int = 1000,
+                 overload_options: Optional[Dict[str, Any]] = None, replay: bool = False):
+        """
+        Initialize a session.
+
+        Args:
+            session_id: Short unique id used by the API
+            interface: Capture device passed to NFStreamer, or the directory
+                       of an ingest session
+            display_name: Human-readable interface name
+            duration: Maximum capture duration in seconds (0 = until stopped)
+            traffic_window: Sliding window for per-source statistics (seconds)
+            heavy_hitter_capacity: Keys tracked by the session's top-K summaries
+            overload_options: OverloadController keyword arguments
+            replay: The session reads capture files (e.g. a followed capture
+                    directory) rather than a live interface; shedding is then
+                    disabled unless overload_options enables it
+        """
+        self.session_id = session_id
+        self.interface = interface
+        self.display_name = display_name
+        self.duration = duration
+
+        self.active = False
+        self.start_time: Optional[str] = None
+        self.end_time: Optional[str] = None
+        self.results_file: Optional[str] = None
+
+        self.counters = SessionStats()
+        self.threats: List[Dict[str, Any]] = []
+        # Threat IDs only go up (not reused after clear_threats)
+        self._threat_numbers = itertools.count(1)
+        self.traffic_stats = TrafficStatsEngine(window_seconds=traffic_window)
+        self.summary = SessionSummary(capacity=heavy_hitter_capacity)
+        self.timeline = TimeBucketAccumulator()
+        overload_options = dict(overload_options or {})
+        overload_options.setdefault("enabled", not replay)
+        self.overload = OverloadController(**overload_options)
+        # PcapTailer for ingest sessions (set by the caller before start)
+        self.ingest = None
+        # CaptureProfile for the capture thread (None = the thread's default)
+        self.capture_profile = None
+        # TrafficPolicy whose flow-stage rules filter this session's flows
+        self.traffic_policy = None
+
+        self.stop_flag = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Consistent snapshot of the session's flow counters."""
+        return self.counters.snapshot()
+
+    def start(self, target: Callable[["MonitoringSession"], None]):
+        """Start the capture thread running target(session)."""
+        self.active = True
+        self.start_time = datetime.now().isoformat()
+        self.end_time = None
+        self.stop_flag.clear()
+        self.thread = threading.Thread(
+            target=target,
+            args=(self,),
+            name=f"monitor-{self.session_id}",
+            daemon=True
+        )
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Signal the capture thread to stop and wait briefly for it."""
+        self.stop_flag.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        self.mark_finished()
+
+    def mark_finished(self):
+        with self.lock:
+            if self.active or self.end_time is None:
+                self.active = False
+                self.end_time = datetime.now().isoformat()
+
+    def add_threat(self, threat: Dict[str, Any]):
+        with self.lock:
+            self.threats.append(threat)
+
+    def next_threat_number(self) -> int:
+        with self.lock:
+            return next(self._threat_numbers)
+
+    def clear_threats(self) -> int:
+        with self.lock:
+            count = len(self.threats)
+            self.threats = []
+        return count
+
+    def status(self, top: int = 10) -> Dict[str, Any]:
+        """Status document for the API."""
+        return {
+            "session_id": self.session_id,
+            "active": self.active,
+            "interface": self.display_name,
+            "device": self.interface,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "stats": self.stats,
+            "threats_count": len(self.threats),
+            "results_file": self.results_file,
+            "overload": self.overload.info(),
+            "ingest": self.ingest.info() if self.ingest is not None else None,
+            "capture_profile": self.capture_profile.name if self.capture_profile is not None else None,
+            "summary": self.summary.snapshot(top)
+        }
+
+
+class SessionManager:
+    """
+    Registry of monitoring sessions with a shared inference worker pool.
+
+    Finished sessions are retained (up to `max_retained`) so their threats and
+    summaries stay queryable after capture ends.
+    """
+
+    def __init__(self, inference_workers: int = 2, max_retained: int = 20,
+                 traffic_window: int = 300, heavy_hitter_capacity: int = 1000,
+                 overload_options: Optional[Dict[str, Any]] = None):
+        self.max_retained = max_retained
+        self.traffic_window = traffic_window
+        self.heavy_hitter_capacity = heavy_hitter_capacity
+        self.overload_options = overload_options
+        self.inference_workers = inference_workers
+        self.inference_pool = ThreadPoolExecutor(
+            max_workers=inference_workers,
+            thread_name_prefix="inference"
+        )
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._sessions: "OrderedDict[str, MonitoringSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, interface: str, display_name: str, duration: int,
+               replay: bool = False) -> MonitoringSession:
+        """
+        Register a new session.
+
+        Args:
+            interface: Capture device, or the directory of an ingest session
+            display_name: Human-readable interface name
+            duration: Maximum capture duration in seconds (0 = until stopped)
+            replay: The session reads capture files instead of a live interface
+
+        Raises:
+            ValueError: If the interface is already being monitored.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                if session.active and session.interface == interface:
+                    raise ValueError(
+                        f"Monitoring is already active on {display_name} (session {session.session_id})"
+                    )
+
+            session_id = str(uuid.uuid4())[:8]
+            while session_id in self._sessions:
+                session_id = str(uuid.uuid4())[:8]
+
+            session = MonitoringSession(
+                session_id, interface, display_name, duration,
+                traffic_window=self.traffic_window,
+                heavy_hitter_capacity=self.heavy_hitter_capacity,
+                overload_options=self.overload_options,
+                replay=replay
+            )
+            self._sessions[session_id] = session
+            self._evict_finished()
+        return session
+
+    def _evict_finished(self):
+        """Drop the oldest finished sessions beyond the retention limit (caller holds lock)."""
+        finished = [sid for sid, s in self._sessions.items() if not s.active]
+        excess = len(self._sessions) - self.max_retained
+        for sid in finished[:max(0, excess)]:
+            del self._sessions[sid]
+
+    def get(self, session_id: str) -> Optional[MonitoringSession]:
+        return self._sessions.get(session_id)
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def sessions(self) -> List[MonitoringSession]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def active_sessions(self) -> List[MonitoringSession]:
+        return [s for s in self.sessions() if s.active]
+
+    def any_active(self) -> bool:
+        return any(s.active for s in self.sessions())
+
+    def latest(self) -> Optional[MonitoringSession]:
+        """Most recently created session (the legacy single-session view)."""
+        sessions = self.sessions()
+        return sessions[-1] if sessions else None
+
+    def all_threats(self) -> List[Dict[str, Any]]:
+        """Threats from every retained session, merged in timestamp order."""
+        lists = [list(s.threats) for s in self.sessions()]
+        if len(lists) == 1:
+            return lists[0]
+        return list(heapq.merge(*lists, key=lambda t: t.get("timestamp", "")))
+
+    def threat_count(self) -> int:
+        return sum(len(s.threats) for s in self.sessions())
+
+    def clear_threats(self) -> int:
+        return sum(s.clear_threats() for s in self.sessions())
+
+    def aggregate_stats(self) -> Dict[str, Any]:
+        """Sum of statistics over active sessions (or the latest one if none are active)."""
+        sessions = self.active_sessions()
+        if not sessions:
+            latest = self.latest()
+            sessions = [latest] if latest else []
+        return merge_stats(session.stats for session in sessions)
+
+    def infer(self, fn: Callable, *args, **kwargs):
+        """Run an inference call on the shared worker pool and wait for its result."""
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            future = self.inference_pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._inference_done(None)
+            raise
+        future.add_done_callback(self._inference_done)
+        return future.result()
+
+    def _inference_done(self, _future):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    def pending_inference(self) -> int:
+        """Inference tasks queued but not yet picked up by a worker."""
+        with self._in_flight_lock:
+            return max(self._in_flight - self.inference_workers, 0)
@@ -0,0 +1,120 @@
+"""
+Severity Module
+Severity scoring and alert thresholds for live threats.
+
+A threat's score in [0, 1] is a weighted sum of three signals, computed for a
+whole batch with numpy:
+
+- probability: the model's attack probability (1 - P(BENIGN))
+- volume:      flow bytes and packets on a log scale, saturating at
+               `volume_bytes` / `volume_packets`
+- history:     the source's activity in the traffic-stats window - flows,
+               distinct destination ports and distinct destinations - on a
+               log scale saturating at `history_flows` / `history_fanout`
+
+plus an optional bonus per attack class (matched exactly, or as the first
+word of a variant label such as 'DoS Hulk'). The score is mapped to
+low / medium / high / critical with fixed cut-offs.
+
+Every threat is stored and streamed; AlertThresholds only decides which ones
+are sent to the backend webhook, so webhook volume can be tuned without
+losing detections.
+"""
+
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+SEVERITY_LEVELS = ('low', 'medium', 'high', 'critical')
+
+
+@dataclass
+class SeverityScorer:
+    """Vectorized severity model."""
+    probability_weight: float = 0.6
+    volume_weight: float = 0.15
+    history_weight: float = 0.25
+    volume_bytes: float = 1e6
+    volume_packets: float = 1000
+    history_flows: float = 1000
+    history_fanout: float = 100
+    # Score cut-offs for medium, high and critical
+    cutoffs: tuple = (0.45, 0.65, 0.85)
+    class_bonus: Dict[str, float] = field(default_factory=lambda: {'DDoS': 0.1, 'DoS': 0.05, 'PortScan': 0.05})
+
+    @staticmethod
+    def _log_scale(values, saturation: float) -> np.ndarray:
+        values = np.maximum(np.asarray(values, dtype=np.float64), 0)
+        return np.minimum(np.log1p(values) / np.log1p(saturation), 1.0)
+
+    def score(self, probability, flow_bytes, flow_packets, history: Optional[Dict[str, np.ndarray]] = None,
+              labels=None) -> np.ndarray:
+        """
+        Severity scores for a batch of threats.
+
+        Args:
+            probability: Attack probability per threat
+            flow_bytes: Bidirectional bytes per threat
+            flow_packets: Bidirectional packets per threat
+            history: TrafficStatsEngine.estimate() of the threats' sources
+            labels: Predicted class per threat (for class_bonus)
+
+        Returns:
+            Scores in [0, 1]
+        """
+        probability = np.asarray(probability, dtype=np.float64)
+        volume = np.maximum(self._log_scale(flow_bytes, self.volume_bytes),
+                            self._log_scale(flow_packets, self.volume_packets))
+        if history is not None:
+            fanout = np.maximum(history['ports'], history['destinations'])
+            source = np.maximum(self._log_scale(history['flows'], self.history_flows),
+                                self._log_scale(fanout, self.history_fanout))
+        else:
+            source = np.zeros(len(probability))
+
+        scores = (self.probability_weight * probability
+                  + self.volume_weight * volume
+                  + self.history_weight * source)
+        if labels is not None and self.class_bonus:
+            labels = np.asarray(labels, dtype=str)
+            for name, bonus in self.class_bonus.items():
+                # Exact class or its CICIDS variants ('DoS' and 'DoS Hulk', not 'DDoS')
+                scores += bonus * ((labels == name) | np.char.startswith(labels, name + ' '))
+        return np.clip(scores, 0.0, 1.0)
+
+    def severity(self, scores) -> np.ndarray:
+        """Severity level per score."""
+        return np.asarray(SEVERITY_LEVELS, dtype=object)[np.searchsorted(self.cutoffs, scores, side='right')]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class AlertThresholds:
+    """Which threats are sent to the webhook."""
+    min_severity: str = 'low'
+    min_confidence: float = 0.0
+
+    def __post_init__(self):
+        if self.min_severity not in SEVERITY_LEVELS:
+            raise ValueError(f"min_severity must be one of {', '.join(SEVERITY_LEVELS)}")
+        if not 0.0 <= self.min_confidence <= 1.0:
+            raise ValueError("min_confidence must be between 0 and 1")
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "AlertThresholds":
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"Unknown alert threshold fields: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    def should_alert(self, severity: str, confidence: float) -> bool:
+        return (SEVERITY_LEVELS.index(severity) >= SEVERITY_LEVELS.index(self.min_severity)
+                and confidence >= self.min_confidence)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
@@ -0,0 +1,270 @@
+"""
+Shadow Module
+Scores live batches with a candidate model alongside production, for comparison only.
+
+The capture thread hands each sampled batch (the feature frame it already
+built plus the production labels and probabilities) to a bounded queue and
+returns immediately; a dedicated worker thread scores it with the candidate
+and updates the comparison counters. If the worker falls behind, batches are
+dropped and counted rather than queued, so the production path never waits
+on the shadow model. Shadow predictions never reach threats, alerts or stats.
+
+Comparison is at the attack/benign level (candidate class names may differ
+from production's), with exact label agreement reported separately:
+
+    both_attack     production and candidate flag the flow
+    both_benign     neither flags it
+    production_only only production flags it (candidate would miss it)
+    candidate_only  only the candidate flags it (candidate would add an alert)
+
+Usage:
+    shadow = ShadowEvaluator(candidate, sample_rate=0.25)
+    shadow.submit(feature_df, predictions, probabilities, classes, metadata)
+    shadow.report()
+    shadow.stop()
+"""
+
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .model_versions import ModelVersion
+    from .metrics import SHADOW_BATCHES, SHADOW_FLOWS, SHADOW_INFERENCE_SECONDS
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.model_versions import ModelVersion
+    from src.metrics import SHADOW_BATCHES, SHADOW_FLOWS, SHADOW_INFERENCE_SECONDS
+
+
+OUTCOMES = ('both_attack', 'both_benign', 'production_only', 'candidate_only')
+
+
+def attack_probability(probabilities: np.ndarray, classes: Sequence[str]) -> np.ndarray:
+    """1 - P(BENIGN) per row (max class probability if there is no BENIGN class)."""
+    classes = [str(c) for c in classes]
+    if 'BENIGN' in classes:
+        return 1.0 - probabilities[:, classes.index('BENIGN')]
+    return probabilities.max(axis=1)
+
+
+class ShadowEvaluator:
+    """Candidate model scored on a worker thread, compared with production."""
+
+    def __init__(self, candidate: ModelVersion, sample_rate: float = 1.0, max_pending: int = 2,
+                 latency_window: int = 1000, max_examples: int = 50, seed: Optional[int] = None):
+        """
+        Start the shadow worker.
+
+        Args:
+            candidate: Validated, warmed-up model bundle
+            sample_rate: Fraction of batches scored (0-1]
+            max_pending: Batches queued for the worker before new ones are dropped
+            latency_window: Recent batches kept for latency percentiles
+            max_examples: Recent disagreements kept for the report
+            seed: Sampling seed (for reproducible trials)
+        """
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.started_at = datetime.now().isoformat()
+        self.stopped_at: Optional[str] = None
+
+        self._random = random.Random(seed)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._batches = {'scored': 0, 'sampled_out': 0, 'dropped': 0, 'failed': 0}
+        self._outcomes = dict.fromkeys(OUTCOMES, 0)
+        self._label_agreement = 0
+        self._flows = 0
+        self._probability_gap = 0.0
+        self._production_seconds = 0.0
+        self._candidate_seconds = 0.0
+        self._production_latency: "deque[float]" = deque(maxlen=latency_window)
+        self._candidate_latency: "deque[float]" = deque(maxlen=latency_window)
+        self._production_versions: Dict[str, int] = {}
+        self._examples: "deque[Dict[str, Any]]" = deque(maxlen=max_examples)
+        self.last_error: Optional[str] = None
+
+        self._worker = threading.Thread(target=self._run, name="shadow-worker", daemon=True)
+        self._worker.start()
+
+    @property
+    def active(self) -> bool:
+        return not self._stop.is_set()
+
+    def submit(self, feature_df: pd.DataFrame, predictions: Sequence[str], probabilities: np.ndarray,
+               classes: Sequence[str], metadata: Optional[pd.DataFrame] = None,
+               production_seconds: float = 0.0, production_version: Optional[str] = None) -> bool:
+        """
+        Offer a scored production batch (never blocks).
+
+        Args:
+            feature_df: Features the production model scored (not modified)
+            predictions: Production labels
+            probabilities: Production predict_proba rows
+            classes: Production class order of `probabilities`
+            metadata: Flow metadata (_src_ip, _dst_ip, _dst_port) for disagreement examples
+            production_seconds: Production inference time for the batch
+            production_version: Production model version
+
+        Returns:
+            True if the batch was queued for shadow scoring
+        """
+        if self._stop.is_set() or len(feature_df) == 0:
+            return False
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            self._count_batch('sampled_out')
+            return False
+        try:
+            self._queue.put_nowait((feature_df, np.asarray(predictions), probabilities, list(classes),
+                                    metadata, production_seconds, production_version))
+        except queue.Full:
+            self._count_batch('dropped')
+            return False
+        return True
+
+    def _count_batch(self, outcome: str):
+        with self._lock:
+            self._batches[outcome] += 1
+        SHADOW_BATCHES.labels(outcome=outcome).inc()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._score(*item)
+            except Exception as e:
+                self.last_error = str(e)
+                self._count_batch('failed')
+
+    def _score(self, feature_df, predictions, probabilities, classes, metadata,
+               production_seconds, production_version):
+        candidate = self.candidate
+        X = feature_df.reindex(columns=candidate.feature_names, fill_value=0)
+        X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
+        start = time.perf_counter()
+        candidate_proba = np.asarray(candidate.model.predict_proba(X))
+        elapsed = time.perf_counter() - start
+        candidate_labels = np.asarray(candidate.classes, dtype=object)[np.argmax(candidate_proba, axis=1)]
+
+        production_attack = predictions != 'BENIGN'
+        candidate_attack = candidate_labels != 'BENIGN'
+        gap = np.abs(attack_probability(probabilities, classes)
+                     - attack_probability(candidate_proba, candidate.classes))
+        counts = {
+            'both_attack': int((production_attack & candidate_attack).sum()),
+            'both_benign': int((~production_attack & ~candidate_attack).sum()),
+            'production_only': int((production_attack & ~candidate_attack).sum()),
+            'candidate_only': int((~production_attack & candidate_attack).sum()),
+        }
+        label_agreement = int((predictions.astype(str) == candidate_labels.astype(str)).sum())
+
+        examples = []
+        disagree = np.flatnonzero(production_attack != candidate_attack)
+        for i in disagree[-self._examples.maxlen:] if self._examples.maxlen else []:
+            example = {
+                'production': str(predictions[i]),
+                'candidate': str(candidate_labels[i]),
+                'probability_gap': round(float(gap[i]), 4),
+            }
+            if metadata is not None:
+                row = metadata.iloc[i]
+                example.update({'source_ip': str(row['_src_ip']), 'destination_ip': str(row['_dst_ip']),
+                                'destination_port': int(row['_dst_port'])})
+            examples.append(example)
+
+        with self._lock:
+            self._batches['scored'] += 1
+            self._flows += len(predictions)
+            for outcome, count in counts.items():
+                self._outcomes[outcome] += count
+            self._label_agreement += label_agreement
+            self._probability_gap += float(gap.sum())
+            self._candidate_seconds += elapsed
+            self._production_seconds += production_seconds
+            self._candidate_latency.append(elapsed)
+            self._production_latency.append(production_seconds)
+            if production_version:
+                self._production_versions[production_version] = \
+                    self._production_versions.get(production_version, 0) + len(predictions)
+            self._examples.extend(examples)
+
+        SHADOW_BATCHES.labels(outcome='scored').inc()
+        SHADOW_FLOWS.labels(result='agree').inc(counts['both_attack'] + counts['both_benign'])
+        SHADOW_FLOWS.labels(result='disagree').inc(counts['production_only'] + counts['candidate_only'])
+        SHADOW_INFERENCE_SECONDS.observe(elapsed)
+
+    @staticmethod
+    def _latency(values: List[float], total: float, flows: int) -> Dict[str, Any]:
+        if not values:
+            return {'p50_ms': None, 'p95_ms': None, 'per_1k_flows_ms': None}
+        return {
+            'p50_ms': round(float(np.percentile(values, 50)) * 1000, 3),
+            'p95_ms': round(float(np.percentile(values, 95)) * 1000, 3),
+            'per_1k_flows_ms': round(total / flows * 1e6, 3) if flows else None,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Comparison so far."""
+        with self._lock:
+            flows = self._flows
+            outcomes = dict(self._outcomes)
+            agree = outcomes['both_attack'] + outcomes['both_benign']
+            production_attacks = outcomes['both_attack'] + outcomes['production_only']
+            candidate_attacks = outcomes['both_attack'] + outcomes['candidate_only']
+            report = {
+                'active': self.active,
+                'candidate': self.candidate.info(),
+                'production_versions': dict(self._production_versions),
+                'sample_rate': self.sample_rate,
+                'started_at': self.started_at,
+                'stopped_at': self.stopped_at,
+                'batches': dict(self._batches, pending=self._queue.qsize()),
+                'flows': flows,
+                'outcomes': outcomes,
+                'agreement_rate': round(agree / flows, 4) if flows else None,
+                'label_agreement_rate': round(self._label_agreement / flows, 4) if flows else None,
+                'production_attack_rate': round(production_attacks / flows, 4) if flows else None,
+                'candidate_attack_rate': round(candidate_attacks / flows, 4) if flows else None,
+                # Share of production detections the candidate also makes, and vice versa
+                'candidate_recall_of_production': (round(outcomes['both_attack'] / production_attacks, 4)
+                                                   if production_attacks else None),
+                'production_recall_of_candidate': (round(outcomes['both_attack'] / candidate_attacks, 4)
+                                                   if candidate_attacks else None),
+                'mean_probability_gap': round(self._probability_gap / flows, 4) if flows else None,
+                'latency': {
+                    'production': self._latency(list(self._production_latency), self._production_seconds, flows),
+                    'candidate': self._latency(list(self._candidate_latency), self._candidate_seconds, flows),
+                },
+                'recent_disagreements': list(self._examples),
+                'last_error': self.last_error,
+            }
+        return report
+
+    def stop(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """Finish queued batches, stop the worker and return the final report."""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        self._worker.join(timeout=max(deadline - time.monotonic(), 0.1))
+        self.stopped_at = datetime.now().isoformat()
+        return self.report()
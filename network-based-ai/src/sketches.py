@@ -0,0 +1,280 @@
+"""
+Sketches Module
+Memory-bounded probabilistic data structures for streaming traffic statistics.
+
+- CountMinSketch: approximate per-key counts/sums (never underestimates)
+- HyperLogLog: approximate distinct counts
+- CountMinHLL: per-key distinct counts (a Count-Min grid of small HyperLogLogs)
+- SpaceSaving: top-K heavy hitters with O(1) unit updates
+
+All updates are vectorized over batches of pre-hashed keys (see hash_keys),
+so a batch of flows costs a handful of numpy operations regardless of how many
+distinct hosts have been seen.
+"""
+
+import hashlib
+import heapq
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def hash_key(value) -> int:
+    """Stable 64-bit hash of a value (independent of PYTHONHASHSEED)."""
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'little')
+
+
+def hash_keys(values: Iterable) -> np.ndarray:
+    """Hash a batch of values to a uint64 array."""
+    return np.fromiter((hash_key(v) for v in values), dtype=np.uint64)
+
+
+def _row_columns(hashes: np.ndarray, depth: int, width: int) -> np.ndarray:
+    """Column index per sketch row for each hash (double hashing), shape (depth, n)."""
+    h1 = hashes & _MASK32
+    h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    rows = np.arange(depth, dtype=np.uint64)[:, None]
+    return ((h1[None, :] + rows * h2[None, :]) % np.uint64(width)).astype(np.intp)
+
+
+def _hll_rank(hashes: np.ndarray, p: int):
+    """Register index and rank (position of the lowest set bit) for HLL updates."""
+    index = (hashes & np.uint64((1 << p) - 1)).astype(np.intp)
+    rest = hashes >> np.uint64(p)
+    lowest_bit = rest & (~rest + np.uint64(1))
+    rank = np.full(len(hashes), 64 - p + 1, dtype=np.uint8)
+    nonzero = rest != 0
+    rank[nonzero] = (np.log2(lowest_bit[nonzero].astype(np.float64)) + 1).astype(np.uint8)
+    return index, rank
+
+
+def _hll_alpha(m: int) -> float:
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """
+    Cardinality estimate for HLL registers along the last axis.
+
+    Applies the linear-counting correction for small cardinalities.
+    """
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    harmonic = np.sum(np.power(2.0, -registers.astype(np.float64)), axis=-1)
+    raw = _hll_alpha(m) * m * m / harmonic
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class CountMinSketch:
+    """Count-Min sketch over 64-bit key hashes."""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def add(self, key_hashes: np.ndarray, weights=1):
+        """Add weights (scalar or per-key array) for a batch of key hashes."""
+        if len(key_hashes) == 0:
+            return
+        columns = _row_columns(key_hashes, self.depth, self.width)
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.int64), (len(key_hashes),))
+        rows = np.repeat(np.arange(self.depth), len(key_hashes))
+        np.add.at(self.table, (rows, columns.ravel()), np.tile(weights, self.depth))
+
+    def estimate(self, key_hashes: np.ndarray) -> np.ndarray:
+        """Upper-bound estimates for a batch of key hashes."""
+        if len(key_hashes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        columns = _row_columns(key_hashes, self.depth, self.width)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def clear(self):
+        self.table.fill(0)
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**p registers."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, item_hashes: np.ndarray):
+        if len(item_hashes) == 0:
+            return
+        index, rank = _hll_rank(item_hashes, self.p)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        return float(hll_estimate(self.registers))
+
+    def clear(self):
+        self.registers.fill(0)
+
+
+class CountMinHLL:
+    """
+    Per-key distinct counting in bounded memory.
+
+    A depth x width grid of small HyperLogLogs: each key hashes to one cell per
+    row and its items are added to those cells. The estimate for a key is the
+    minimum over its cells, which limits the inflation caused by other keys
+    sharing a cell (the same argument as Count-Min).
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 3, p: int = 6):
+        self.width = width
+        self.depth = depth
+        self.p = p
+        self.registers = np.zeros((depth, width, 1 << p), dtype=np.uint8)
+
+    def add(self, key_hashes: np.ndarray, item_hashes: np.ndarray):
+        """Record (key, item) pairs for a batch."""
+        if len(key_hashes) == 0:
+            return
+        columns = _row_columns(key_hashes, self.depth, self.width)
+        index, rank = _hll_rank(item_hashes, self.p)
+        rows = np.repeat(np.arange(self.depth), len(key_hashes))
+        np.maximum.at(
+            self.registers,
+            (rows, columns.ravel(), np.tile(index, self.depth)),
+            np.tile(rank, self.depth),
+        )
+
+    def cell_registers(self, key_hashes: np.ndarray) -> np.ndarray:
+        """Registers of each key's cells, shape (depth, n, 2**p)."""
+        columns = _row_columns(key_hashes, self.depth, self.width)
+        return self.registers[np.arange(self.depth)[:, None], columns]
+
+    def estimate(self, key_hashes: np.ndarray) -> np.ndarray:
+        """Distinct-item estimates for a batch of key hashes."""
+        if len(key_hashes) == 0:
+            return np.zeros(0)
+        return hll_estimate(self.cell_registers(key_hashes)).min(axis=0)
+
+    def clear(self):
+        self.registers.fill(0)
+
+    @property
+    def nbytes(self) -> int:
+        return self.registers.nbytes
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary (Metwally et al.) with a stream-summary layout.
+
+    Tracks at most `capacity` keys. Keys are grouped by count, so a unit
+    increment or an eviction of the minimum key is O(1). Any key whose true
+    frequency exceeds total / capacity is guaranteed to be tracked, and each
+    reported count overestimates the true count by at most its `error`.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, Dict[Hashable, None]] = {}
+        self._min = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key) -> bool:
+        return key in self._counts
+
+    def _bucket_add(self, key, count: int):
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+        bucket[key] = None
+
+    def _bucket_remove(self, key, count: int):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+    def offer(self, key, weight: int = 1):
+        """Count one occurrence (or `weight` occurrences) of a key."""
+        self.total += weight
+        count = self._counts.get(key)
+
+        if count is not None:
+            new_count = count + weight
+            self._counts[key] = new_count
+            self._bucket_remove(key, count)
+            self._bucket_add(key, new_count)
+            if count == self._min and count not in self._buckets:
+                self._min = new_count if weight == 1 else min(self._buckets)
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[key] = weight
+            self._errors[key] = 0
+            self._bucket_add(key, weight)
+            self._min = weight if len(self._counts) == 1 else min(self._min, weight)
+            return
+
+        # Replace a key with the minimum count; the newcomer inherits it as error
+        min_count = self._min
+        victim = next(iter(self._buckets[min_count]))
+        self._bucket_remove(victim, min_count)
+        del self._counts[victim]
+        del self._errors[victim]
+
+        new_count = min_count + weight
+        self._counts[key] = new_count
+        self._errors[key] = min_count
+        self._bucket_add(key, new_count)
+        if min_count not in self._buckets:
+            self._min = new_count if weight == 1 else min(self._buckets)
+
+    def offer_many(self, keys: Iterable):
+        """Count one occurrence of each key in a batch."""
+        for key in keys:
+            self.offer(key)
+
+    def count(self, key) -> int:
+        """Estimated count for a key (0 if not tracked)."""
+        return self._counts.get(key, 0)
+
+    def keys(self) -> List[Hashable]:
+        return list(self._counts)
+
+    def top(self, k: int = 10) -> List[Tuple[Hashable, int, int]]:
+        """Top-k (key, count, error) tuples, highest count first."""
+        top_keys = heapq.nlargest(k, self._counts.items(), key=lambda x: x[1])
+        return [(key, count, self._errors[key]) for key, count in top_keys]
+
+    def top_dict(self, k: int = 10) -> Dict[str, int]:
+        """Top-k as an ordered {key: count} dict."""
+        return {str(key): count for key, count, _ in self.top(k)}
+
+    def clear(self):
+        self.total = 0
+        self._counts.clear()
+        self._errors.clear()
+        self._buckets.clear()
+        self._min = 0
@@ -0,0 +1,307 @@
+"""
+Threat Intelligence Module
+Tags and severity adjustments for threats from local IP lists.
+
+Each list (internal ranges, known-bad feeds, partner networks...) is compiled
+into a PrefixIndex, and a batch of threats is matched with one vectorized
+longest-prefix lookup per list and side, so lists of hundreds of thousands of
+CIDRs cost the detection path a few binary searches per batch.
+
+Lists are read from a directory and reloaded when a file changes: the new
+index is built on a background thread and swapped in with a single reference
+assignment, so enrichment keeps using the previous lists until the new ones
+are ready and detection never waits on a reload.
+
+Directory layout (THREAT_INTEL_DIR):
+    lists.json     optional manifest
+    *.txt          one address or CIDR per line, '#' starts a comment
+    *.csv          address or CIDR in the first column (header rows are skipped)
+
+Manifest:
+    {"lists": [
+        {"file": "internal.txt", "tag": "internal", "severity": -1},
+        {"file": "feodo.csv", "tag": "botnet-c2", "severity": 2},
+        {"file": "scanners.txt", "tag": "known-scanner", "severity": 1, "match": "src"}
+    ]}
+
+`severity` moves a threat that far along low < medium < high < critical
+(deltas of all matching lists are added), `match` picks the side checked
+("any", "src" or "dst"). Files without a manifest entry are tagged with their
+file name and leave severity unchanged.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from .prefix_index import PrefixIndex
+    from .flow_table import encode_ips
+    from .metrics import THREAT_INTEL_MATCHES, THREAT_INTEL_RELOADS
+    from .severity import SEVERITY_LEVELS
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.prefix_index import PrefixIndex
+    from src.flow_table import encode_ips
+    from src.metrics import THREAT_INTEL_MATCHES, THREAT_INTEL_RELOADS
+    from src.severity import SEVERITY_LEVELS
+
+
+LIST_SUFFIXES = ('.txt', '.csv', '.lst')
+MANIFEST_FILE = 'lists.json'
+MATCH_SIDES = {'any': ('source', 'destination'), 'src': ('source',), 'dst': ('destination',)}
+
+
+def _read_prefixes(path: Path) -> List[str]:
+    """Addresses/CIDRs of a list file (comments, blank lines and extra CSV columns dropped)."""
+    prefixes = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if ',' in line or ';' in line:
+                line = line.replace(';', ',').split(',', 1)[0].strip().strip('"')
+            prefixes.append(line)
+    return prefixes
+
+
+@dataclass
+class IntelList:
+    """One compiled list."""
+    tag: str
+    file: str
+    severity: int
+    match: str
+    index: PrefixIndex
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'tag': self.tag,
+            'file': self.file,
+            'severity': self.severity,
+            'match': self.match,
+            'prefixes': len(self.index),
+            'invalid_lines': self.index.invalid,
+            'bytes': self.index.nbytes,
+        }
+
+
+class ThreatIntelIndex:
+    """Immutable set of compiled lists (one reload = one new instance)."""
+
+    def __init__(self, lists: Optional[List[IntelList]] = None, signature: Tuple = (),
+                 load_seconds: float = 0.0):
+        self.lists = lists or []
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+    @classmethod
+    def build(cls, directory: Union[str, Path, None]) -> "ThreatIntelIndex":
+        """
+        Compile every list in a directory.
+
+        Raises:
+            ValueError: Invalid manifest
+        """
+        start = time.perf_counter()
+        signature = directory_signature(directory)
+        if not signature:
+            return cls(signature=signature)
+        directory = Path(directory)
+
+        manifest = {}
+        if (directory / MANIFEST_FILE).exists():
+            with open(directory / MANIFEST_FILE) as f:
+                document = json.load(f)
+            entries = document.get('lists', []) if isinstance(document, dict) else document
+            for entry in entries:
+                if 'file' not in entry:
+                    raise ValueError(f"{MANIFEST_FILE}: every list needs a 'file'")
+                if entry.get('match', 'any') not in MATCH_SIDES:
+                    raise ValueError(f"{MANIFEST_FILE}: match must be one of {', '.join(MATCH_SIDES)}")
+                manifest[entry['file']] = entry
+
+        lists = []
+        for name, _, _ in signature:
+            if name == MANIFEST_FILE:
+                continue
+            entry = manifest.get(name, {})
+            index = PrefixIndex(_read_prefixes(directory / name), strict=False)
+            lists.append(IntelList(
+                tag=str(entry.get('tag', Path(name).stem)),
+                file=name,
+                severity=int(entry.get('severity', 0)),
+                match=entry.get('match', 'any'),
+                index=index,
+            ))
+        return cls(lists, signature, time.perf_counter() - start)
+
+    def annotate(self, threats: List[Dict[str, Any]], source: str = 'live') -> int:
+        """
+        Add tags, matches and adjusted severity to threats in place.
+
+        Args:
+            threats: Threat dicts with source_ip / destination_ip / severity
+            source: Metrics label ('live', 'ingest', 'pcap')
+
+        Returns:
+            Number of threats matched by at least one list
+        """
+        if not threats or not self.lists:
+            return 0
+        addresses = {
+            'source': encode_ips([threat.get('source_ip') for threat in threats]),
+            'destination': encode_ips([threat.get('destination_ip') for threat in threats]),
+        }
+        # entry arrays per (list, side), computed once per batch
+        lookups = {}
+        for position, intel in enumerate(self.lists):
+            for side in MATCH_SIDES[intel.match]:
+                entries = intel.index.lookup_entries(addresses[side])
+                hits = int((entries >= 0).sum())
+                if hits:
+                    lookups[(position, side)] = entries
+                    THREAT_INTEL_MATCHES.labels(list=intel.tag, source=source).inc(hits)
+
+        matched = np.zeros(len(threats), dtype=bool)
+        for entries in lookups.values():
+            matched |= entries >= 0
+        for i in np.flatnonzero(matched):
+            threat = threats[i]
+            tags, matches, delta = [], [], 0
+            for (position, side), entries in lookups.items():
+                if entries[i] < 0:
+                    continue
+                intel = self.lists[position]
+                if intel.tag not in tags:
+                    tags.append(intel.tag)
+                    delta += intel.severity
+                matches.append({'list': intel.tag, 'side': side, 'prefix': intel.index.prefix(int(entries[i]))})
+            threat['tags'] = sorted(set(threat.get('tags', [])) | set(tags))
+            threat.setdefault('details', {})['intel'] = matches
+            severity = threat.get('severity')
+            if delta and severity in SEVERITY_LEVELS:
+                level = SEVERITY_LEVELS.index(severity) + delta
+                threat['severity'] = SEVERITY_LEVELS[min(max(level, 0), len(SEVERITY_LEVELS) - 1)]
+                threat['details']['base_severity'] = severity
+        return int(matched.sum())
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'lists': [intel.info() for intel in self.lists],
+            'prefixes': sum(len(intel.index) for intel in self.lists),
+            'bytes': sum(intel.index.nbytes for intel in self.lists),
+            'loaded_at': datetime.fromtimestamp(self.loaded_at).isoformat(),
+            'load_seconds': round(self.load_seconds, 3),
+        }
+
+
+def directory_signature(directory: Union[str, Path, None]) -> Tuple:
+    """(name, size, mtime) of the manifest and list files; empty if the directory is missing."""
+    if not directory or not os.path.isdir(directory):
+        return ()
+    signature = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_file() and (entry.name == MANIFEST_FILE or entry.name.lower().endswith(LIST_SUFFIXES)):
+            stat = entry.stat()
+            signature.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class ThreatIntel:
+    """
+    Hot-reloaded threat intel lists.
+
+    Usage:
+        intel = ThreatIntel('threat_intel/', check_interval=30)
+        intel.reload(wait=True)                 # initial load
+        intel.enrich(threats, source='live')    # detection path; never blocks on reloads
+    """
+
+    def __init__(self, directory: Union[str, Path, None], check_interval: float = 30.0):
+        """
+        Initialize the lists.
+
+        Args:
+            directory: Directory of list files (None disables enrichment)
+            check_interval: Minimum seconds between checks for changed files
+        """
+        self.directory = Path(directory) if directory else None
+        self.check_interval = check_interval
+        self.index = ThreatIntelIndex()
+        self.last_error: Optional[str] = None
+        self.reloads = 0
+
+        self._lock = threading.Lock()
+        self._reloading: Optional[threading.Thread] = None
+        self._last_check = 0.0
+
+    def _run_reload(self, force: bool):
+        try:
+            if force or directory_signature(self.directory) != self.index.signature:
+                index = ThreatIntelIndex.build(self.directory)
+                self.index = index
+                self.reloads += 1
+                self.last_error = None
+                THREAT_INTEL_RELOADS.labels(status='success').inc()
+                print(f"🛡️ Threat intel loaded: {len(index.lists)} list(s), "
+                      f"{sum(len(i.index) for i in index.lists):,} prefixes in {index.load_seconds:.2f}s")
+        except Exception as e:
+            # Keep serving the previous lists
+            self.last_error = str(e)
+            THREAT_INTEL_RELOADS.labels(status='error').inc()
+            print(f"❌ Threat intel reload failed: {e}")
+        finally:
+            with self._lock:
+                self._reloading = None
+
+    def reload(self, wait: bool = False, force: bool = True):
+        """
+        Rebuild the lists on a background thread unless a reload is running.
+
+        Args:
+            wait: Block until the reload finishes
+            force: Rebuild even if no file changed
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            thread = self._reloading
+            if thread is None:
+                thread = threading.Thread(target=self._run_reload, args=(force,),
+                                          name="threat-intel-reload", daemon=True)
+                self._reloading = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def maybe_reload(self):
+        """Check for changed files in the background, at most every check_interval seconds."""
+        if self.directory is not None and time.monotonic() - self._last_check >= self.check_interval:
+            self.reload(force=False)
+
+    def enrich(self, threats: List[Dict[str, Any]], source: str = 'live') -> int:
+        """Annotate threats with the current lists (see ThreatIntelIndex.annotate)."""
+        self.maybe_reload()
+        return self.index.annotate(threats, source=source)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'directory': str(self.directory) if self.directory else None,
+            'check_interval_seconds': self.check_interval,
+            'reloads': self.reloads,
+            'reloading': self._reloading is not None,
+            'last_error': self.last_error,
+            **self.index.info(),
+        }
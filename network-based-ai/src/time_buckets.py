@@ -0,0 +1,207 @@
+"""
+Time Buckets Module
+Vectorized breakdowns of classified flows, by time and by flow count.
+
+- time_breakdown(): attack/benign counts and bytes per second, minute or hour,
+  bucketed on each flow's first-seen timestamp (one np.unique + bincount pass)
+- batch_breakdown(): the fixed flow-count ranges used by PCAP summaries
+  (one np.add.reduceat pass)
+- TimeBucketAccumulator: the streaming equivalent for live sessions; keeps
+  per-second buckets and rolls them up to coarser resolutions on request
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+RESOLUTIONS = {
+    'second': 1000,
+    'minute': 60 * 1000,
+    'hour': 60 * 60 * 1000,
+}
+
+
+def bucket_width(resolution: str) -> int:
+    """Bucket width in milliseconds (raises ValueError for unknown resolutions)."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {tuple(RESOLUTIONS)}")
+    return RESOLUTIONS[resolution]
+
+
+def _aggregate(bucket_ids: np.ndarray, flows: np.ndarray, attacks: np.ndarray,
+               benign: np.ndarray, bytes_: np.ndarray):
+    """Sum per-row counts into unique buckets (sorted by bucket id)."""
+    buckets, inverse = np.unique(bucket_ids, return_inverse=True)
+    size = len(buckets)
+    return (
+        buckets,
+        np.bincount(inverse, weights=flows, minlength=size),
+        np.bincount(inverse, weights=attacks, minlength=size),
+        np.bincount(inverse, weights=benign, minlength=size),
+        np.bincount(inverse, weights=bytes_, minlength=size),
+    )
+
+
+def _format(buckets, flows, attacks, benign, bytes_, width_ms: int) -> List[Dict[str, Any]]:
+    breakdown = []
+    for bucket, total, attack, ok, volume in zip(buckets.tolist(), flows.tolist(), attacks.tolist(),
+                                                 benign.tolist(), bytes_.tolist()):
+        start_ms = bucket * width_ms
+        entry = {
+            'bucket_start': datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).isoformat(),
+            'bucket_start_ms': start_ms,
+            'total': int(total),
+            'benign': int(ok),
+            'attack': int(attack),
+            'bytes': int(volume),
+            'bytes_per_second': round(volume / (width_ms / 1000), 2),
+            'attack_percentage': round(attack / (attack + ok) * 100, 2) if attack + ok else 0.0,
+        }
+        # Live sessions count shed flows without a verdict
+        if total > attack + ok:
+            entry['unclassified'] = int(total - attack - ok)
+        breakdown.append(entry)
+    return breakdown
+
+
+def time_breakdown(first_seen_ms, is_attack, bytes_=None,
+                   resolution: str = 'minute') -> List[Dict[str, Any]]:
+    """
+    Per-time-bucket flow, attack and byte counts.
+
+    Args:
+        first_seen_ms: Flow start timestamps (epoch milliseconds)
+        is_attack: Boolean per flow (True = attack)
+        bytes_: Bytes per flow (optional)
+        resolution: 'second', 'minute' or 'hour'
+
+    Returns:
+        List of buckets in time order, empty if no timestamps are available.
+    """
+    width = bucket_width(resolution)
+    if first_seen_ms is None:
+        return []
+    timestamps = np.asarray(first_seen_ms, dtype=np.int64)
+    if not len(timestamps):
+        return []
+
+    attacks = np.asarray(is_attack, dtype=bool)
+    volume = np.zeros(len(timestamps)) if bytes_ is None else np.asarray(bytes_, dtype=np.float64)
+    aggregated = _aggregate(timestamps // width, np.ones(len(timestamps)),
+                            attacks.astype(np.float64), (~attacks).astype(np.float64), volume)
+    return _format(*aggregated, width)
+
+
+def batch_breakdown(is_attack, batch_size: int) -> List[Dict[str, Any]]:
+    """
+    Benign/attack counts for consecutive ranges of `batch_size` flows.
+
+    Args:
+        is_attack: Boolean per flow, in capture order
+        batch_size: Flows per range
+
+    Returns:
+        List of ranges (1-indexed, inclusive) with their counts.
+    """
+    attacks = np.asarray(is_attack, dtype=np.int64)
+    total = len(attacks)
+    if total == 0:
+        return []
+
+    batch_size = max(1, int(batch_size))
+    starts = np.arange(0, total, batch_size)
+    ends = np.minimum(starts + batch_size, total)
+    attack_counts = np.add.reduceat(attacks, starts)
+    sizes = ends - starts
+
+    breakdown = []
+    for start, end, size, attack in zip(starts.tolist(), ends.tolist(), sizes.tolist(), attack_counts.tolist()):
+        breakdown.append({
+            'range_start': start + 1,  # 1-indexed for display
+            'range_end': end,
+            'total': size,
+            'benign': size - attack,
+            'attack': attack,
+            'attack_percentage': round(attack / size * 100, 2) if size > 0 else 0.0
+        })
+    return breakdown
+
+
+class TimeBucketAccumulator:
+    """
+    Streaming per-second flow counts for a live session.
+
+    Usage:
+        timeline = TimeBucketAccumulator()
+        timeline.add(first_seen_ms, is_attack, bytes_, classified)  # per batch
+        timeline.breakdown('minute')
+    """
+
+    def __init__(self, max_buckets: int = 6 * 3600):
+        """
+        Initialize the accumulator.
+
+        Args:
+            max_buckets: Per-second buckets kept (oldest are dropped first)
+        """
+        self.max_buckets = max_buckets
+        self._buckets: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, first_seen_ms, is_attack, bytes_=None, classified=None):
+        """
+        Add a batch of flows.
+
+        Args:
+            first_seen_ms: Flow start timestamps (epoch milliseconds)
+            is_attack: Boolean per flow (ignored where classified is False)
+            bytes_: Bytes per flow (optional)
+            classified: Boolean per flow, False for flows shed without a verdict
+        """
+        timestamps = np.asarray(first_seen_ms, dtype=np.int64)
+        if not len(timestamps):
+            return
+        attacks = np.asarray(is_attack, dtype=bool)
+        verdict = np.ones(len(timestamps), dtype=bool) if classified is None else np.asarray(classified, dtype=bool)
+        volume = np.zeros(len(timestamps)) if bytes_ is None else np.asarray(bytes_, dtype=np.float64)
+
+        buckets, flows, attack_counts, benign_counts, byte_counts = _aggregate(
+            timestamps // RESOLUTIONS['second'], np.ones(len(timestamps)),
+            (attacks & verdict).astype(np.float64), (~attacks & verdict).astype(np.float64), volume
+        )
+
+        with self._lock:
+            for bucket, *counts in zip(buckets.tolist(), flows.tolist(), attack_counts.tolist(),
+                                       benign_counts.tolist(), byte_counts.tolist()):
+                current = self._buckets.get(bucket)
+                if current is None:
+                    self._buckets[bucket] = counts
+                else:
+                    for i, value in enumerate(counts):
+                        current[i] += value
+            if len(self._buckets) > self.max_buckets:
+                for bucket in sorted(self._buckets)[:len(self._buckets) - self.max_buckets]:
+                    del self._buckets[bucket]
+
+    def breakdown(self, resolution: str = 'minute', limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Buckets at the requested resolution, in time order.
+
+        Args:
+            resolution: 'second', 'minute' or 'hour'
+            limit: Return only the most recent N buckets
+        """
+        width = bucket_width(resolution)
+        with self._lock:
+            if not self._buckets:
+                return []
+            seconds = np.fromiter(self._buckets.keys(), dtype=np.int64, count=len(self._buckets))
+            counts = np.array(list(self._buckets.values()), dtype=np.float64)
+
+        aggregated = _aggregate(seconds * RESOLUTIONS['second'] // width,
+                                counts[:, 0], counts[:, 1], counts[:, 2], counts[:, 3])
+        breakdown = _format(*aggregated, width)
+        return breakdown[-limit:] if limit else breakdown
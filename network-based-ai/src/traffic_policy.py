@@ -0,0 +1,330 @@
+"""
+Traffic Policy Module
+Allow/deny rules for traffic that should never be scored.
+
+Rules are compiled into a BPF filter for NFStreamer where possible, so the
+packets are dropped in the kernel (live) or by libpcap (capture files) before
+any flow is built. Rules that BPF cannot express well - large address lists,
+or rules explicitly marked `"stage": "flow"` - are applied after flow
+expiry by a vectorized CIDR filter backed by PrefixIndex.
+
+Rules are flow-level: `src` is the side that opened the flow and `ports` are
+its destination (service) ports. BPF filters packets, so each rule is
+compiled for both directions; otherwise only half of a connection would be
+dropped and the other half would still be scored.
+
+A flow is excluded when a deny rule matches it, or when allow rules exist and
+none of them matches it.
+
+Policy file (JSON):
+    {"rules": [
+        {"name": "backup", "action": "deny", "hosts": ["10.20.0.0/16"], "ports": [873, "8000-8100"]},
+        {"name": "scanners", "action": "deny", "src": ["198.51.100.0/24", ...]},
+        {"name": "monitoring", "action": "deny", "src": ["10.0.0.5"], "protocol": "icmp"}
+    ]}
+
+Caveat: BPF matches outer headers. With tunnel decoding, a rule about the
+inner addresses must use `"stage": "flow"`.
+"""
+
+import ipaddress
+import json
+import threading
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .prefix_index import PrefixIndex
+    from .metrics import POLICY_EXCLUDED_FLOWS, POLICY_EXCLUDED_BYTES
+except ImportError:
+    import sys
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.prefix_index import PrefixIndex
+    from src.metrics import POLICY_EXCLUDED_FLOWS, POLICY_EXCLUDED_BYTES
+
+
+PROTOCOLS = {'icmp': 1, 'tcp': 6, 'udp': 17, 'icmp6': 58, 'sctp': 132}
+RULE_STAGES = ('auto', 'bpf', 'flow')
+
+# Rules with more addresses than this are filtered after flow expiry in 'auto'
+# mode; large BPF programs slow every packet and can exceed kernel limits
+BPF_MAX_ADDRESSES_PER_RULE = 16
+BPF_MAX_ADDRESSES = 64
+
+
+def _parse_ports(ports: Iterable[Union[int, str]]) -> List[Tuple[int, int]]:
+    ranges = []
+    for port in ports:
+        text = str(port).strip()
+        low, _, high = text.partition('-')
+        low, high = int(low), int(high or low)
+        if not 0 <= low <= high <= 65535:
+            raise ValueError(f"Invalid port or range: {port}")
+        ranges.append((low, high))
+    return ranges
+
+
+def _parse_protocol(protocol: Union[str, int, None]) -> Optional[int]:
+    if protocol is None:
+        return None
+    if isinstance(protocol, str) and not protocol.isdigit():
+        if protocol.lower() not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol '{protocol}' (use {', '.join(PROTOCOLS)} or a number)")
+        return PROTOCOLS[protocol.lower()]
+    number = int(protocol)
+    if not 0 <= number <= 255:
+        raise ValueError(f"Invalid protocol number {protocol}")
+    return number
+
+
+@dataclass
+class PolicyRule:
+    """One allow/deny rule. Unset fields match anything."""
+    name: str
+    action: str = 'deny'
+    hosts: List[str] = field(default_factory=list)   # either side of the flow
+    src: List[str] = field(default_factory=list)     # side that opened the flow
+    dst: List[str] = field(default_factory=list)
+    ports: List[Union[int, str]] = field(default_factory=list)  # destination ports / 'a-b' ranges
+    protocol: Union[str, int, None] = None
+    stage: str = 'auto'
+
+    def __post_init__(self):
+        if self.action not in ('allow', 'deny'):
+            raise ValueError(f"Rule '{self.name}': action must be 'allow' or 'deny'")
+        if self.stage not in RULE_STAGES:
+            raise ValueError(f"Rule '{self.name}': stage must be one of {RULE_STAGES}")
+        for cidr in self.hosts + self.src + self.dst:
+            try:
+                ipaddress.ip_network(str(cidr), strict=False)
+            except ValueError:
+                raise ValueError(f"Rule '{self.name}': invalid address or CIDR '{cidr}'")
+        self.port_ranges = _parse_ports(self.ports)
+        self.protocol_number = _parse_protocol(self.protocol)
+        self.address_count = len(self.hosts) + len(self.src) + len(self.dst)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    # -- BPF ------------------------------------------------------------------
+
+    @staticmethod
+    def _nets(direction: str, cidrs: List[str]) -> str:
+        terms = [f"{direction}net {ipaddress.ip_network(str(c), strict=False)}" for c in cidrs]
+        return terms[0] if len(terms) == 1 else "(" + " or ".join(terms) + ")"
+
+    def _ports(self, direction: str) -> str:
+        terms = [f"{direction} port {low}" if low == high else f"{direction} portrange {low}-{high}"
+                 for low, high in self.port_ranges]
+        return terms[0] if len(terms) == 1 else "(" + " or ".join(terms) + ")"
+
+    def _one_direction(self, forward: bool) -> List[str]:
+        src_side, dst_side = ('src ', 'dst ') if forward else ('dst ', 'src ')
+        terms = []
+        if self.src:
+            terms.append(self._nets(src_side, self.src))
+        if self.dst:
+            terms.append(self._nets(dst_side, self.dst))
+        if self.port_ranges:
+            terms.append(self._ports(dst_side.strip()))
+        return terms
+
+    def to_bpf(self) -> str:
+        """BPF expression matching packets of either direction of matching flows."""
+        common = []
+        if self.protocol_number is not None:
+            name = {v: k for k, v in PROTOCOLS.items()}.get(self.protocol_number)
+            common.append(name if name is not None else f"ip proto {self.protocol_number}")
+        if self.hosts:
+            common.append(self._nets('', self.hosts))
+        forward, backward = self._one_direction(True), self._one_direction(False)
+        if forward:
+            common.append(f"(({' and '.join(forward)}) or ({' and '.join(backward)}))")
+        return " and ".join(common) if common else "ip or ip6"
+
+    # -- Flow filter ----------------------------------------------------------
+
+    def compile_flow_matcher(self):
+        self._hosts = PrefixIndex(self.hosts) if self.hosts else None
+        self._src = PrefixIndex(self.src) if self.src else None
+        self._dst = PrefixIndex(self.dst) if self.dst else None
+
+    def matches(self, src_ip, dst_ip, dst_port: np.ndarray, protocol: np.ndarray) -> np.ndarray:
+        """Vectorized flow-level match."""
+        mask = np.ones(len(dst_port), dtype=bool)
+        if self._hosts is not None:
+            mask &= self._hosts.contains_many(src_ip) | self._hosts.contains_many(dst_ip)
+        if self._src is not None:
+            mask &= self._src.contains_many(src_ip)
+        if self._dst is not None:
+            mask &= self._dst.contains_many(dst_ip)
+        if self.port_ranges:
+            port_mask = np.zeros(len(dst_port), dtype=bool)
+            for low, high in self.port_ranges:
+                port_mask |= (dst_port >= low) & (dst_port <= high)
+            mask &= port_mask
+        if self.protocol_number is not None:
+            mask &= protocol == self.protocol_number
+        return mask
+
+
+class TrafficPolicy:
+    """
+    Compiled allow/deny rules.
+
+    Usage:
+        policy = TrafficPolicy.load('policy.json')
+        profile = policy.apply_to_profile(profile)        # BPF part
+        keep = policy.flow_mask(src_ip, dst_ip, dst_port, protocol, bytes_, source='live')
+    """
+
+    def __init__(self, rules: Iterable[Union[PolicyRule, Dict[str, Any]]] = ()):
+        self.rules: List[PolicyRule] = [
+            rule if isinstance(rule, PolicyRule) else PolicyRule(**rule) for rule in rules
+        ]
+        names = [rule.name for rule in self.rules]
+        if len(names) != len(set(names)):
+            raise ValueError("Rule names must be unique")
+        self._assign_stages()
+        for rule in self.flow_rules:
+            rule.compile_flow_matcher()
+        self._lock = threading.Lock()
+        self.excluded_flows: Dict[str, int] = {rule.name: 0 for rule in self.rules}
+        self.excluded_bytes: Dict[str, int] = {rule.name: 0 for rule in self.rules}
+
+    @classmethod
+    def load(cls, path: Union[str, Path, None]) -> "TrafficPolicy":
+        """Policy from a JSON file ({"rules": [...]}); an empty policy when path is None."""
+        if not path:
+            return cls()
+        with open(path) as f:
+            document = json.load(f)
+        return cls(document.get('rules', []) if isinstance(document, dict) else document)
+
+    def _assign_stages(self):
+        """Decide which rules go into BPF (`compiled_stage` per rule)."""
+        budget = BPF_MAX_ADDRESSES
+        allows = [rule for rule in self.rules if rule.action == 'allow']
+        # The allow list is one disjunction: either all of it is BPF or none
+        allow_bpf = all(
+            rule.stage == 'bpf' or (rule.stage == 'auto' and rule.address_count <= BPF_MAX_ADDRESSES_PER_RULE)
+            for rule in allows
+        ) and sum(rule.address_count for rule in allows) <= budget
+        for rule in allows:
+            rule.compiled_stage = 'bpf' if allow_bpf else 'flow'
+            budget -= rule.address_count if allow_bpf else 0
+        for rule in self.rules:
+            if rule.action != 'deny':
+                continue
+            fits = rule.address_count <= BPF_MAX_ADDRESSES_PER_RULE and rule.address_count <= budget
+            rule.compiled_stage = 'bpf' if rule.stage == 'bpf' or (rule.stage == 'auto' and fits) else 'flow'
+            if rule.compiled_stage == 'bpf':
+                budget -= rule.address_count
+
+    @property
+    def bpf_rules(self) -> List[PolicyRule]:
+        return [rule for rule in self.rules if rule.compiled_stage == 'bpf']
+
+    @property
+    def flow_rules(self) -> List[PolicyRule]:
+        return [rule for rule in self.rules if rule.compiled_stage == 'flow']
+
+    def to_bpf(self) -> Optional[str]:
+        """BPF filter for the BPF-stage rules (None if there are none)."""
+        terms = []
+        allows = [rule for rule in self.bpf_rules if rule.action == 'allow']
+        if allows:
+            terms.append("(" + " or ".join(f"({rule.to_bpf()})" for rule in allows) + ")")
+        terms += [f"not ({rule.to_bpf()})" for rule in self.bpf_rules if rule.action == 'deny']
+        return " and ".join(terms) if terms else None
+
+    def combine_bpf(self, bpf_filter: Optional[str]) -> Optional[str]:
+        """A caller's own BPF filter AND the policy's."""
+        policy_bpf = self.to_bpf()
+        if not policy_bpf:
+            return bpf_filter
+        if not bpf_filter:
+            return policy_bpf
+        return f"({bpf_filter}) and {policy_bpf}"
+
+    def apply_to_profile(self, profile):
+        """CaptureProfile with the policy's BPF filter added."""
+        combined = self.combine_bpf(profile.bpf_filter)
+        return profile if combined == profile.bpf_filter else replace(profile, bpf_filter=combined)
+
+    def flow_mask(self, src_ip, dst_ip, dst_port, protocol, bytes_=None,
+                  source: str = 'pcap') -> np.ndarray:
+        """
+        Apply the flow-stage rules.
+
+        Args:
+            src_ip, dst_ip: Address columns (packed uint32, categorical or strings)
+            dst_port, protocol: Numeric columns
+            bytes_: Per-flow byte totals (for the excluded-bytes counters)
+            source: Metrics label ('live', 'ingest', 'pcap')
+
+        Returns:
+            Boolean array, True for flows to keep.
+        """
+        dst_port = np.asarray(dst_port, dtype=np.int64)
+        keep = np.ones(len(dst_port), dtype=bool)
+        flow_rules = self.flow_rules
+        if not flow_rules or len(dst_port) == 0:
+            return keep
+        protocol = np.asarray(protocol, dtype=np.int64)
+        bytes_ = np.zeros(len(dst_port), dtype=np.int64) if bytes_ is None else np.asarray(bytes_, dtype=np.int64)
+
+        allows = [rule for rule in flow_rules if rule.action == 'allow']
+        # Attribute each excluded flow to the first rule that excluded it
+        excluded_by = []
+        if allows:
+            allowed = np.zeros(len(keep), dtype=bool)
+            for rule in allows:
+                allowed |= rule.matches(src_ip, dst_ip, dst_port, protocol)
+            excluded_by.append(('not-allowed', ~allowed))
+            keep &= allowed
+        for rule in flow_rules:
+            if rule.action == 'deny':
+                hit = rule.matches(src_ip, dst_ip, dst_port, protocol) & keep
+                excluded_by.append((rule.name, hit))
+                keep &= ~hit
+
+        with self._lock:
+            for name, hit in excluded_by:
+                flows = int(hit.sum())
+                if not flows:
+                    continue
+                flow_bytes = int(bytes_[hit].sum())
+                self.excluded_flows[name] = self.excluded_flows.get(name, 0) + flows
+                self.excluded_bytes[name] = self.excluded_bytes.get(name, 0) + flow_bytes
+                POLICY_EXCLUDED_FLOWS.labels(rule=name, source=source).inc(flows)
+                POLICY_EXCLUDED_BYTES.labels(rule=name, source=source).inc(flow_bytes)
+        return keep
+
+    def frame_mask(self, df: pd.DataFrame, source: str = 'pcap') -> np.ndarray:
+        """flow_mask() over a flow frame with metadata columns."""
+        return self.flow_mask(
+            df['src_ip'], df['dst_ip'], df['dst_port'], df['protocol'],
+            df['total_bytes'] if 'total_bytes' in df.columns else None, source=source
+        )
+
+    def info(self) -> Dict[str, Any]:
+        """Rules, where each one runs, and exclusion counters (flow stage only)."""
+        with self._lock:
+            return {
+                'bpf_filter': self.to_bpf(),
+                'rules': [
+                    dict(rule.to_dict(), compiled_stage=rule.compiled_stage,
+                         excluded_flows=self.excluded_flows.get(rule.name, 0) if rule.compiled_stage == 'flow' else None,
+                         excluded_bytes=self.excluded_bytes.get(rule.name, 0) if rule.compiled_stage == 'flow' else None)
+                    for rule in self.rules
+                ],
+                'excluded_not_allowed': self.excluded_flows.get('not-allowed', 0),
+                'note': "Traffic dropped by the BPF filter never reaches user space and is not counted",
+            }
@@ -0,0 +1,295 @@
+"""
+Traffic Statistics Module
+Streaming per-source traffic statistics over a sliding time window.
+
+Every flow seen by the live monitor updates, per source IP:
+- flow count and byte count (Count-Min sketches)
+- distinct destination ports and distinct destinations (Count-Min grids of HyperLogLogs)
+
+The window is split into fixed buckets that rotate as time advances, so memory
+is bounded by (buckets x sketch size) no matter how many hosts are seen. A
+Space-Saving candidate set of heavy sources per bucket makes top-talker and
+fan-out queries possible without keeping every flow.
+
+SessionSummary keeps the online top-K source/destination summaries of a
+monitoring session for all flows and for threats.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    from .sketches import CountMinSketch, CountMinHLL, SpaceSaving, hash_keys, hll_estimate
+except ImportError:
+    import sys
+    from pathlib import Path
+    parent_dir = Path(__file__).parent.parent
+    if str(parent_dir) not in sys.path:
+        sys.path.insert(0, str(parent_dir))
+    from src.sketches import CountMinSketch, CountMinHLL, SpaceSaving, hash_keys, hll_estimate
+
+
+class _WindowBucket:
+    """Sketches for one time slice of the sliding window."""
+
+    def __init__(self, start: float, width: int, depth: int, hll_p: int, max_candidates: int):
+        self.start = start
+        self.flows = CountMinSketch(width, depth)
+        self.bytes = CountMinSketch(width, depth)
+        self.ports = CountMinHLL(width, depth, hll_p)
+        self.destinations = CountMinHLL(width, depth, hll_p)
+        self.candidates = SpaceSaving(max_candidates)
+
+    def reset(self, start: float):
+        self.start = start
+        self.flows.clear()
+        self.bytes.clear()
+        self.ports.clear()
+        self.destinations.clear()
+        self.candidates.clear()
+
+    def track(self, src_ips: List[str]):
+        """Keep a bounded set of candidate heavy sources for top-K queries."""
+        self.candidates.offer_many(src_ips)
+
+
+class TrafficStatsEngine:
+    """
+    Sliding-window per-source statistics backed by memory-bounded sketches.
+
+    Usage:
+        engine = TrafficStatsEngine(window_seconds=300, bucket_seconds=60)
+        engine.update(src_ips, dst_ips, dst_ports, byte_counts)
+        engine.top_talkers(10, by='bytes')
+        engine.fan_out(10, by='ports')
+    """
+
+    def __init__(self, window_seconds: int = 300, bucket_seconds: int = 60,
+                 width: int = 4096, depth: int = 3, hll_p: int = 6,
+                 max_candidates: int = 2048):
+        """
+        Initialize the engine.
+
+        Args:
+            window_seconds: Length of the sliding window
+            bucket_seconds: Granularity at which old data expires
+            width: Columns per sketch row (more = fewer collisions)
+            depth: Rows per sketch (more = tighter estimates)
+            hll_p: HyperLogLog precision per cell (2**p registers)
+            max_candidates: Candidate heavy sources tracked per bucket
+        """
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = max(1, int(np.ceil(window_seconds / bucket_seconds)))
+        self._params = (width, depth, hll_p, max_candidates)
+        self._buckets: List[_WindowBucket] = []
+        self._spare: List[_WindowBucket] = []
+        self._lock = threading.Lock()
+        self.total_flows = 0
+
+    def _current_bucket(self, now: float) -> _WindowBucket:
+        """Get the bucket for `now`, rotating out expired buckets."""
+        bucket_start = now - (now % self.bucket_seconds)
+        if self._buckets and self._buckets[-1].start == bucket_start:
+            return self._buckets[-1]
+
+        # Expire buckets that fell out of the window (reuse their arrays)
+        cutoff = bucket_start - (self.n_buckets - 1) * self.bucket_seconds
+        while self._buckets and self._buckets[0].start < cutoff:
+            self._spare.append(self._buckets.pop(0))
+
+        if self._spare:
+            bucket = self._spare.pop()
+            bucket.reset(bucket_start)
+        else:
+            bucket = _WindowBucket(bucket_start, *self._params)
+        self._buckets.append(bucket)
+        return bucket
+
+    def update(self, src_ips: Iterable, dst_ips: Iterable, dst_ports: Iterable,
+               byte_counts: Iterable, timestamp: Optional[float] = None):
+        """
+        Feed a batch of flows.
+
+        Args:
+            src_ips: Source IP per flow
+            dst_ips: Destination IP per flow
+            dst_ports: Destination port per flow
+            byte_counts: Bidirectional bytes per flow
+            timestamp: Observation time (defaults to now)
+        """
+        src_ips = [str(ip) for ip in src_ips]
+        if not src_ips:
+            return
+        src_hashes = hash_keys(src_ips)
+        dst_hashes = hash_keys(dst_ips)
+        port_hashes = hash_keys(dst_ports)
+        weights = np.asarray(list(byte_counts), dtype=np.int64)
+
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            bucket = self._current_bucket(now)
+            bucket.flows.add(src_hashes, 1)
+            bucket.bytes.add(src_hashes, weights)
+            bucket.ports.add(src_hashes, port_hashes)
+            bucket.destinations.add(src_hashes, dst_hashes)
+            bucket.track(src_ips)
+            self.total_flows += len(src_ips)
+
+    def _live_buckets(self, now: float) -> List[_WindowBucket]:
+        cutoff = now - self.window_seconds
+        return [b for b in self._buckets if b.start + self.bucket_seconds > cutoff]
+
+    def _estimate(self, ips: List[str], now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Window estimates for a list of source IPs (caller holds the lock)."""
+        now = time.time() if now is None else now
+        buckets = self._live_buckets(now)
+        n = len(ips)
+        flows = np.zeros(n, dtype=np.int64)
+        byte_totals = np.zeros(n, dtype=np.int64)
+        if not buckets or n == 0:
+            return {'flows': flows, 'bytes': byte_totals, 'ports': np.zeros(n), 'destinations': np.zeros(n)}
+
+        hashes = hash_keys(ips)
+        port_registers = None
+        dst_registers = None
+        for bucket in buckets:
+            flows += bucket.flows.estimate(hashes)
+            byte_totals += bucket.bytes.estimate(hashes)
+            # HLL registers merge by element-wise max across time buckets
+            p_regs = bucket.ports.cell_registers(hashes)
+            d_regs = bucket.destinations.cell_registers(hashes)
+            port_registers = p_regs if port_registers is None else np.maximum(port_registers, p_regs)
+            dst_registers = d_regs if dst_registers is None else np.maximum(dst_registers, d_regs)
+
+        return {
+            'flows': flows,
+            'bytes': byte_totals,
+            'ports': hll_estimate(port_registers).min(axis=0),
+            'destinations': hll_estimate(dst_registers).min(axis=0),
+        }
+
+    def _candidates(self, now: float) -> List[str]:
+        seen = set()
+        for bucket in self._live_buckets(now):
+            seen.update(bucket.candidates.keys())
+        return list(seen)
+
+    def _ranked(self, limit: int, by: str) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            ips = self._candidates(now)
+            estimates = self._estimate(ips, now)
+        if not ips:
+            return []
+        order = np.argsort(-estimates[by], kind='stable')[:limit]
+        return [
+            {
+                'source_ip': ips[i],
+                'flows': int(estimates['flows'][i]),
+                'bytes': int(estimates['bytes'][i]),
+                'distinct_ports': int(round(estimates['ports'][i])),
+                'distinct_destinations': int(round(estimates['destinations'][i])),
+            }
+            for i in order
+        ]
+
+    def top_talkers(self, limit: int = 10, by: str = 'flows') -> List[Dict]:
+        """Heaviest sources in the window by 'flows' or 'bytes'."""
+        if by not in ('flows', 'bytes'):
+            raise ValueError("by must be 'flows' or 'bytes'")
+        return self._ranked(limit, by)
+
+    def fan_out(self, limit: int = 10, by: str = 'ports') -> List[Dict]:
+        """Sources contacting the most distinct 'ports' or 'destinations' (scan context)."""
+        if by not in ('ports', 'destinations'):
+            raise ValueError("by must be 'ports' or 'destinations'")
+        return self._ranked(limit, by)
+
+    def host_stats(self, ip: str) -> Dict:
+        """Window statistics for a single source IP."""
+        with self._lock:
+            estimates = self._estimate([str(ip)])
+        return {
+            'source_ip': str(ip),
+            'window_seconds': self.window_seconds,
+            'flows': int(estimates['flows'][0]),
+            'bytes': int(estimates['bytes'][0]),
+            'distinct_ports': int(round(estimates['ports'][0])),
+            'distinct_destinations': int(round(estimates['destinations'][0])),
+        }
+
+    def estimate(self, ips: Iterable) -> Dict[str, np.ndarray]:
+        """Window flows, bytes, distinct ports and distinct destinations for many source IPs at once."""
+        ips = [str(ip) for ip in ips]
+        with self._lock:
+            return self._estimate(ips)
+
+    def info(self) -> Dict:
+        """Engine configuration and memory footprint."""
+        with self._lock:
+            n_live = len(self._buckets)
+            memory = sum(
+                b.flows.nbytes + b.bytes.nbytes + b.ports.nbytes + b.destinations.nbytes
+                for b in self._buckets + self._spare
+            )
+        return {
+            'window_seconds': self.window_seconds,
+            'bucket_seconds': self.bucket_seconds,
+            'buckets': n_live,
+            'total_flows': self.total_flows,
+            'memory_mb': round(memory / 1024**2, 2),
+        }
+
+
+class SessionSummary:
+    """
+    Online top-K summaries for a monitoring session.
+
+    Heavy-hitter (Space-Saving) structures over all flows and over threats are
+    updated in O(1) per flow, so the session summary is available at any time
+    without re-counting the threat list.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Args:
+            capacity: Keys tracked per heavy-hitter structure; any IP seen in more
+                      than 1/capacity of the updates is guaranteed to be reported
+        """
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self.flow_sources = SpaceSaving(capacity)
+        self.flow_destinations = SpaceSaving(capacity)
+        self.threat_sources = SpaceSaving(capacity)
+        self.threat_destinations = SpaceSaving(capacity)
+        self.threat_types: Dict[str, int] = {}
+
+    def add_flows(self, src_ips: Iterable, dst_ips: Iterable):
+        """Record a batch of flows."""
+        with self._lock:
+            for ip in src_ips:
+                self.flow_sources.offer(str(ip))
+            for ip in dst_ips:
+                self.flow_destinations.offer(str(ip))
+
+    def add_threat(self, threat_type: str, src_ip, dst_ip):
+        """Record one detected threat."""
+        with self._lock:
+            self.threat_types[threat_type] = self.threat_types.get(threat_type, 0) + 1
+            self.threat_sources.offer(str(src_ip))
+            self.threat_destinations.offer(str(dst_ip))
+
+    def snapshot(self, k: int = 10) -> Dict[str, Any]:
+        """Current top-k summaries (same shape as the saved session summary)."""
+        with self._lock:
+            return {
+                "threat_types": dict(self.threat_types),
+                "top_source_ips": self.threat_sources.top_dict(k),
+                "top_destination_ips": self.threat_destinations.top_dict(k),
+                "top_talkers": self.flow_sources.top_dict(k),
+                "top_destinations": self.flow_destinations.top_dict(k),
+            }
@@ -0,0 +1,78 @@
+"""
+Early-exit forest exactness check.
+
+In exact mode (delta=None) EarlyExitForest must return the same labels as
+the full forest: a row only exits once the remaining trees cannot change its
+leading class. Run from network-based-ai/:
+
+    python -m pytest tests/test_forest.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.forest import EarlyExitForest, supports_early_exit
+
+
+CLASSES = np.array(['BENIGN', 'DDoS', 'PortScan', 'Web Attack'])
+
+
+def _sample(n: int = 2000, seed: int = 0):
+    """
+    Fixed multi-class sample: overlapping Gaussian clusters, so part of the
+    rows are close calls where the trees disagree and exits come late.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, len(CLASSES), n)
+    centers = rng.normal(0, 1.5, (len(CLASSES), 12))
+    X = centers[labels] + rng.normal(0, 1.0, (n, 12))
+    return X.astype(np.float32), CLASSES[labels]
+
+
+@pytest.fixture(scope='module')
+def sample():
+    return _sample()
+
+
+@pytest.fixture(scope='module')
+def forests(sample):
+    """Forests of several sizes and leaf sizes, fitted on the sample."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = sample
+    fitted = {}
+    for n_estimators in (10, 50, 100):
+        for min_samples_leaf in (1, 5, 20):
+            model = RandomForestClassifier(n_estimators=n_estimators, min_samples_leaf=min_samples_leaf,
+                                           random_state=0, n_jobs=1)
+            fitted[n_estimators, min_samples_leaf] = model.fit(X, y)
+    return fitted
+
+
+@pytest.mark.parametrize('block_size', [1, 4, 8, 16])
+@pytest.mark.parametrize('min_samples_leaf', [1, 5, 20])
+@pytest.mark.parametrize('n_estimators', [10, 50, 100])
+def test_exact_mode_matches_full_forest(forests, sample, n_estimators, min_samples_leaf, block_size):
+    """Exact early exit returns the full forest's label on every row."""
+    model = forests[n_estimators, min_samples_leaf]
+    X, _ = sample
+    assert supports_early_exit(model)
+
+    forest = EarlyExitForest(model, block_size=block_size)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+
+def test_rows_without_exit_match_full_probabilities(forests, sample):
+    """Rows that ran through every tree get the forest's own probabilities."""
+    model = forests[50, 5]
+    X, _ = sample
+    probabilities, trees_used = EarlyExitForest(model, block_size=4).predict_proba(X)
+
+    full = trees_used == len(model.estimators_)
+    assert full.any() and (~full).any()
+    np.testing.assert_allclose(probabilities[full], model.predict_proba(X)[full])
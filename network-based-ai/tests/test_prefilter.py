@@ -0,0 +1,156 @@
+"""
+Pre-filter agreement harness.
+
+Runs the benign pre-filter and the full NFStream forest on a fixed flow
+sample and checks that every flow the pre-filter short-circuits is one the
+forest also labels BENIGN. Run from network-based-ai/:
+
+    python -m pytest tests/test_prefilter.py
+
+The agreement check against the shipped model is skipped when
+models/random_forest_nfstream_robust_binary.joblib is not present.
+"""
+
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.feature_extractor import NFSTREAM_ATTRIBUTES
+from src.predictor import NetworkThreatPredictor
+from src.prefilter import BenignPrefilter, validate_prefilter
+
+
+MODELS_DIR = Path(__file__).parent.parent / 'models'
+SHIPPED_MODEL = MODELS_DIR / 'random_forest_nfstream_robust_binary.joblib'
+
+# Short-circuited flows the forest may flag before a rule set is rejected
+MIN_AGREEMENT = 0.99
+
+
+def _flow_sample(n: int = 300, seed: int = 0) -> pd.DataFrame:
+    """
+    Fixed NFStream feature sample: DNS exchanges, low-rate HTTPS sessions
+    (both matched by the default rules) and SYN scans (never matched).
+    """
+    rng = np.random.default_rng(seed)
+    groups = []
+
+    def group(dst_port, src_packets, dst_packets, duration_ms, src_bytes, dst_bytes, syn, rst, ack):
+        df = pd.DataFrame(0.0, index=range(n), columns=NFSTREAM_ATTRIBUTES)
+        df['dst_port'] = dst_port
+        df['src2dst_packets'] = src_packets
+        df['dst2src_packets'] = dst_packets
+        df['bidirectional_packets'] = df['src2dst_packets'] + df['dst2src_packets']
+        df['bidirectional_duration_ms'] = duration_ms
+        df['src2dst_duration_ms'] = duration_ms
+        df['dst2src_duration_ms'] = np.where(df['dst2src_packets'] > 0, duration_ms, 0)
+        df['src2dst_bytes'] = src_bytes
+        df['dst2src_bytes'] = dst_bytes
+        df['bidirectional_bytes'] = df['src2dst_bytes'] + df['dst2src_bytes']
+        for side in ('src2dst', 'dst2src'):
+            packets = df[f'{side}_packets'].replace(0, 1)
+            df[f'{side}_mean_ps'] = df[f'{side}_bytes'] / packets
+            df[f'{side}_min_ps'] = df[f'{side}_mean_ps'] * 0.8
+            df[f'{side}_max_ps'] = df[f'{side}_mean_ps'] * 1.2
+        df['bidirectional_mean_ps'] = df['bidirectional_bytes'] / df['bidirectional_packets']
+        df['bidirectional_mean_piat_ms'] = df['bidirectional_duration_ms'] / df['bidirectional_packets']
+        df['src2dst_syn_packets'] = syn
+        df['dst2src_syn_packets'] = np.minimum(syn, df['dst2src_packets'])
+        df['src2dst_rst_packets'] = rst
+        df['src2dst_ack_packets'] = np.maximum(df['src2dst_packets'] - syn, 0)
+        df['dst2src_ack_packets'] = ack
+        groups.append(df)
+
+    # DNS request/response
+    group(53, 1, 1, rng.uniform(1, 50, n), rng.integers(40, 120, n), rng.integers(60, 400, n),
+          syn=0, rst=0, ack=0)
+    # Low-rate HTTPS sessions
+    packets = rng.integers(6, 40, n)
+    group(443, packets, packets + rng.integers(0, 10, n), rng.uniform(2000, 60000, n),
+          packets * rng.integers(80, 400, n), packets * rng.integers(400, 1400, n),
+          syn=1, rst=0, ack=packets)
+    # SYN scan to random ports
+    group(rng.integers(1, 1024, n), 1, rng.integers(0, 2, n), rng.uniform(0, 5, n),
+          60, rng.integers(0, 60, n), syn=1, rst=rng.integers(0, 2, n), ack=0)
+
+    return pd.concat(groups, ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def flows() -> pd.DataFrame:
+    return _flow_sample()
+
+
+@pytest.fixture(scope='module')
+def trial_models_dir(tmp_path_factory, flows) -> Path:
+    """Small forest in a temporary models/ directory, fitted on the sample."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    features = list(NFSTREAM_ATTRIBUTES)
+    labels = np.where(flows['src2dst_syn_packets'] > 0, 'ATTACK', 'BENIGN')
+    # Flip some labels so the forest disagrees with the rules on part of the sample
+    labels[::7] = 'ATTACK'
+    model = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0)
+    model.fit(flows[features], labels)
+
+    models_dir = tmp_path_factory.mktemp('models')
+    joblib.dump(model, models_dir / 'random_forest_nfstream_robust_binary.joblib')
+    joblib.dump(features, models_dir / 'feature_names_nfstream_robust_binary.joblib')
+    joblib.dump(list(model.classes_), models_dir / 'class_names_nfstream_robust_binary.joblib')
+    return models_dir
+
+
+def test_sample_exercises_every_rule(flows):
+    rule_index = BenignPrefilter().match(flows)
+    for i, rule in enumerate(BenignPrefilter().rules):
+        assert (rule_index == i).any(), f"sample never matches rule '{rule.name}'"
+    assert (rule_index < 0).any()
+
+
+def test_prefiltered_predictions_match_forest(trial_models_dir, flows):
+    """Flows the pre-filter passes on get exactly the forest's labels and probabilities."""
+    predictor = NetworkThreatPredictor(trial_models_dir, prefilter=BenignPrefilter(enabled=False))
+    full_labels, full_proba = predictor.predict_nfstream(flows, return_proba=True)
+
+    predictor.prefilter = BenignPrefilter(enabled=True, audit_fraction=0.0)
+    labels, proba = predictor.predict_nfstream(flows, return_proba=True)
+    mask = predictor.prefilter.match(flows) >= 0
+
+    assert mask.any() and (~mask).any()
+    np.testing.assert_array_equal(labels[~mask], full_labels[~mask])
+    np.testing.assert_allclose(proba[~mask], full_proba[~mask])
+    assert (labels[mask] == 'BENIGN').all()
+    benign = list(predictor.nfstream_version.classes).index('BENIGN')
+    assert (proba[mask, benign] == 1.0).all()
+
+
+def test_validate_prefilter_reports_disagreements(trial_models_dir, flows):
+    """validate_prefilter counts exactly the short-circuited flows the forest flags."""
+    predictor = NetworkThreatPredictor(trial_models_dir, prefilter=BenignPrefilter(enabled=False))
+    prefilter = BenignPrefilter()
+    report = validate_prefilter(prefilter, predictor.predict_nfstream, flows)
+
+    forest_labels = predictor.predict_nfstream(flows)
+    short_circuited = prefilter.match(flows) >= 0
+    expected = float((forest_labels[short_circuited] == 'BENIGN').mean())
+    assert report['agreement'] == round(expected, 4)
+    missed = sum(sum(rule['missed_attacks'].values()) for rule in report['rules'].values())
+    assert missed == int((forest_labels[short_circuited] != 'BENIGN').sum())
+
+
+@pytest.mark.skipif(not SHIPPED_MODEL.exists(), reason="shipped NFStream model not present")
+def test_default_rules_agree_with_shipped_model(flows):
+    """Short-circuited flows must be ones the shipped forest labels BENIGN."""
+    predictor = NetworkThreatPredictor(MODELS_DIR, prefilter=BenignPrefilter(enabled=False))
+    report = validate_prefilter(BenignPrefilter(), predictor.predict_nfstream, flows)
+
+    assert report['agreement'] is not None
+    for name, rule in report['rules'].items():
+        if rule['hits']:
+            assert rule['agreement'] >= MIN_AGREEMENT, f"rule '{name}' misses attacks: {rule['missed_attacks']}"